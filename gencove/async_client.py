@@ -0,0 +1,95 @@
+"""Asyncio interface to the Gencove API."""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from gencove.client import APIClient
+from gencove.constants import ASYNC_MAX_IN_FLIGHT
+
+
+# read-only endpoints of APIClient that can be awaited
+LOOKUP_METHODS = frozenset(
+    {
+        "get_batch",
+        "get_file_checksum",
+        "get_metadata",
+        "get_project",
+        "get_project_samples",
+        "get_sample_details",
+        "get_sample_manifest",
+        "get_sample_qc_metrics",
+        "get_sample_sheet",
+    }
+)
+
+
+class AsyncAPIClient:
+    """Gencove API client for coroutines.
+
+    The lookup endpoints of `APIClient`, listed in `LOOKUP_METHODS`, are
+    coroutines here, taking the same arguments and returning the same
+    models, with the same 401 refresh and 429 backoff. Requests are still
+    blocking, so they run on `max_in_flight` threads that share a pooled
+    API session, which is what bounds the requests in flight, while
+    thousands of lookups can be awaited at once from one event loop.
+
+    Logging in is done on `api_client`, which is created if not given, and
+    the lookups use its authentication.
+
+    Example:
+
+        api_client = APIClient()
+        login(api_client, credentials)
+        async with AsyncAPIClient(api_client=api_client) as async_client:
+            samples = await async_client.map(
+                "get_sample_details", [(sample_id,) for sample_id in ids]
+            )
+    """
+
+    def __init__(self, host=None, max_in_flight=ASYNC_MAX_IN_FLIGHT, api_client=None):
+        self.api_client = api_client or APIClient(host, pool_size=max_in_flight)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="gencove-api"
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def __getattr__(self, name):
+        if name not in LOOKUP_METHODS:
+            raise AttributeError(name)
+        method = getattr(self.api_client, name)
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(method, *args, **kwargs)
+            )
+
+        return call
+
+    async def map(self, name, arguments, return_exceptions=False):
+        """Call an endpoint concurrently for every set of arguments.
+
+        Args:
+            name (str): name of the lookup method
+            arguments (iterable of tuple): positional arguments of each call
+            return_exceptions (bool): return errors in place of results
+                instead of raising the first one
+
+        Returns:
+            list: results, in the order of the arguments
+        """
+        method = getattr(self, name)
+        return await asyncio.gather(
+            *(method(*args) for args in arguments),
+            return_exceptions=return_exceptions,
+        )
+
+    def close(self):
+        """Stop the threads, dropping calls that didn't start."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
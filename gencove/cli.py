@@ -1,4 +1,6 @@
 """Python library which enables you to use Gencoves' research backend."""
+import os
+
 import click
 
 from gencove import version
@@ -24,8 +26,17 @@ def announcements():
 
 @click.group()
 @click.version_option(version=version.version())
-def cli():
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Send every request instead of using cached responses of slow changing "
+    "resources, such as pipelines and file types. Same as setting "
+    "$GENCOVE_NO_CACHE.",
+)
+def cli(no_cache):
     """Gencove's command line interface."""
+    if no_cache:
+        os.environ["GENCOVE_NO_CACHE"] = "1"
 
 
 announcements()
@@ -43,4 +54,4 @@ cli.add_command(s3)
 cli.add_command(webhooks)
 
 if __name__ == "__main__":
-    cli()
+    cli()  # pylint: disable=no-value-for-parameter
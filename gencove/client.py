@@ -5,8 +5,11 @@ Exclude imports from linters due to install aliases breaking the rules.
 # pylint: disable=too-many-lines
 
 import datetime
+import functools
+import hashlib
 import json
 import os
+import threading
 import time
 from builtins import str as text  # noqa
 from urllib.parse import parse_qs, urljoin, urlparse
@@ -15,7 +18,7 @@ from uuid import UUID
 import backoff
 
 from pydantic import BaseModel, HttpUrl
-from requests import ConnectTimeout, ReadTimeout, delete, get, post  # noqa: I201
+from requests import ConnectTimeout, ReadTimeout  # noqa: I201
 
 from gencove import constants  # noqa: I100
 from gencove.collections_extras import LazyList
@@ -71,6 +74,9 @@ from gencove.models import (  # noqa: I101, I100
     UploadURLImport,
     UserDetails,
 )
+from gencove.response_cache import get_endpoint_ttl  # noqa: I100
+from gencove.sessions import create_session
+from gencove.token_cache import get_jwt_expiry, is_jwt_valid
 from gencove.version import version as cli_version
 
 
@@ -141,18 +147,50 @@ class APIClientTimeout(APIClientError):
     """
 
 
+@functools.lru_cache(maxsize=None)
+def _create_api_session(pool_size):
+    # the API is authenticated with headers, cookies it sets are dropped
+    return create_session(pool_size, headers={"Accept-Encoding": "gzip, deflate"})
+
+
+def get_api_session(pool_size=None):
+    """Session with keep-alive connections shared by all API clients.
+
+    Calls of every command and worker thread reuse pooled connections to
+    the API instead of connecting, and negotiating TLS, for each request.
+    Responses are sent compressed with gzip and decoded by requests.
+
+    Args:
+        pool_size (int): connections kept alive for each host, defaults to
+            GENCOVE_API_POOL_SIZE or `API_POOL_SIZE`
+
+    Returns:
+        requests.Session: session of the pool size, created on first use
+    """
+    pool_size = pool_size or int(
+        os.environ.get("GENCOVE_API_POOL_SIZE") or constants.API_POOL_SIZE
+    )
+    return _create_api_session(pool_size)
+
+
 # pylint: disable=too-many-public-methods
 class APIClient:
     """Gencove API client."""
 
     endpoints = constants.ApiEndpoints
 
-    def __init__(self, host=None):
+    def __init__(self, host=None, pool_size=None):
         """Initialize api client."""
         self._jwt_token = None
         self._jwt_refresh_token = None
         self._api_key = None
         self.host = host if host is not None else constants.HOST
+        self.session = get_api_session(pool_size)
+        self._refresh_lock = threading.Lock()
+        self.token_cache = None
+        self._token_cache_email = None
+        self.response_cache = None
+        self._cache_user = None
 
     @staticmethod
     def _serialize_post_payload(payload):
@@ -194,10 +232,12 @@ class APIClient:
 
         try:
             if method == "get":
-                response = get(url=url, params=params, headers=headers, timeout=timeout)
+                response = self.session.get(
+                    url=url, params=params, headers=headers, timeout=timeout
+                )
             elif method == "delete":
                 post_payload = APIClient._serialize_post_payload(params)
-                response = delete(
+                response = self.session.delete(
                     url=url,
                     data=post_payload,
                     headers=headers,
@@ -209,7 +249,7 @@ class APIClient:
                     # content-type is automatically set by requests library
                     del headers["content-type"]
                     post_payload = None
-                response = post(
+                response = self.session.post(
                     url=url,
                     data=post_payload,
                     headers=headers,
@@ -292,17 +332,50 @@ class APIClient:
         self._jwt_token = access_token
         if refresh_token is not None:
             self._jwt_refresh_token = refresh_token
+        if self.token_cache is not None:
+            self.token_cache.save(
+                self.host,
+                self._token_cache_email,
+                self._jwt_token,
+                self._jwt_refresh_token,
+            )
 
-    def _refresh_authentication(self):
-        echo_debug("Refreshing authentication")
-        jwt = self.refresh_token(self._jwt_refresh_token)
-        self._set_jwt(jwt.access)
+    def _refresh_authentication(self, expired_token=None):
+        with self._refresh_lock:
+            if expired_token is not None and self._jwt_token != expired_token:
+                # refreshed meanwhile by a concurrent request
+                return
+            echo_debug("Refreshing authentication")
+            try:
+                jwt = self.refresh_token(self._jwt_refresh_token)
+            except APIClientError as err:
+                if self.token_cache is not None and err.status_code == 401:
+                    # the next invocation logs in again
+                    self.token_cache.remove(self.host, self._token_cache_email)
+                raise
+            self._set_jwt(jwt.access)
 
     def _get_authorization(self):
         if self._api_key:
             return {"Authorization": f"Api-Key {self._api_key}"}
+        self._refresh_expiring_authentication()
         return {"Authorization": f"Bearer {self._jwt_token}"}
 
+    def _refresh_expiring_authentication(self):
+        """Refresh an access token that expires within the refresh margin.
+
+        Long running commands, and tokens loaded from the token cache, get a
+        fresh token before a request is rejected with it. Tokens that don't
+        tell their expiry are only refreshed once they are rejected.
+        """
+        token = self._jwt_token
+        if (
+            self._jwt_refresh_token
+            and get_jwt_expiry(token) is not None
+            and not is_jwt_valid(token)
+        ):
+            self._refresh_authentication(token)
+
     def _delete(
         self,
         endpoint,
@@ -314,6 +387,7 @@ class APIClient:
         model=None,
     ):
         headers = {} if not authorized else self._get_authorization()
+        token = self._jwt_token
         try:
             response = self._request(
                 endpoint,
@@ -327,8 +401,13 @@ class APIClient:
                 return model(**response)
             return response
         except APIClientError as err:
-            if not refreshed and self._jwt_refresh_token and err.status_code == 401:
-                self._refresh_authentication()
+            if (
+                authorized
+                and not refreshed
+                and self._jwt_refresh_token
+                and err.status_code == 401
+            ):
+                self._refresh_authentication(token)
                 return self._delete(
                     endpoint,
                     payload,
@@ -340,6 +419,9 @@ class APIClient:
                 )
 
             raise err
+        finally:
+            if self.response_cache is not None:
+                self.response_cache.invalidate(endpoint)
 
     def _post(
         self,
@@ -353,6 +435,7 @@ class APIClient:
         files=None,
     ):
         headers = {} if not authorized else self._get_authorization()
+        token = self._jwt_token
         try:
             response = self._request(
                 endpoint,
@@ -367,8 +450,13 @@ class APIClient:
                 return model(**response)
             return response
         except APIClientError as err:
-            if not refreshed and self._jwt_refresh_token and err.status_code == 401:
-                self._refresh_authentication()
+            if (
+                authorized
+                and not refreshed
+                and self._jwt_refresh_token
+                and err.status_code == 401
+            ):
+                self._refresh_authentication(token)
                 return self._post(
                     endpoint,
                     payload,
@@ -380,6 +468,9 @@ class APIClient:
                 )
 
             raise err
+        finally:
+            if self.response_cache is not None:
+                self.response_cache.invalidate(endpoint)
 
     def _get(
         self,
@@ -392,7 +483,15 @@ class APIClient:
         model=None,
         raw_response=False,
     ):
+        cache_key, ttl = self._get_cache_key(
+            endpoint, query_params, authorized, raw_response
+        )
+        if cache_key is not None:
+            response = self.response_cache.get(endpoint, cache_key)
+            if response is not None:
+                return model(**response) if model else response
         headers = {} if not authorized else self._get_authorization()
+        token = self._jwt_token
         try:
             response = self._request(
                 endpoint,
@@ -403,12 +502,14 @@ class APIClient:
                 sensitive=sensitive,
                 raw_response=raw_response,
             )
+            if cache_key is not None:
+                self.response_cache.set(endpoint, cache_key, response, ttl)
             if model:
                 return model(**response)
             return response
         except APIClientError as err:
-            if not refreshed and err.status_code and err.status_code == 401:
-                self._refresh_authentication()
+            if authorized and not refreshed and err.status_code == 401:
+                self._refresh_authentication(token)
                 return self._get(
                     endpoint,
                     query_params,
@@ -417,10 +518,36 @@ class APIClient:
                     sensitive,
                     True,
                     model,
+                    raw_response,
                 )
 
             raise err
 
+    def _get_cache_key(self, endpoint, query_params, authorized, raw_response):
+        """Key and TTL of a GET request whose response can be cached.
+
+        Responses are cached per host and user, so an authorized request
+        is only cached once the user is known.
+
+        Returns:
+            tuple: key and TTL in seconds, or (None, None) if the response
+                isn't cached
+        """
+        if self.response_cache is None or raw_response:
+            return None, None
+        if authorized and self._cache_user is None:
+            return None, None
+        ttl = get_endpoint_ttl(endpoint)
+        if ttl is None:
+            return None, None
+        key = [
+            self.host,
+            self._cache_user if authorized else None,
+            endpoint,
+            {name: str(value) for name, value in (query_params or {}).items()},
+        ]
+        return key, ttl
+
     @staticmethod
     def _add_query_params(next_link, query_params=None, limit=200):
         if not query_params:
@@ -430,9 +557,51 @@ class APIClient:
             query_params["offset"] = parse_qs(urlparse(next_link).query)["offset"]
         return query_params
 
+    def set_token_cache(self, token_cache, email):
+        """Keep the tokens of the user in a cache shared between runs.
+
+        Args:
+            token_cache (TokenCache): cache the tokens are saved to
+            email (str): email of the user logging in
+        """
+        self.token_cache = token_cache
+        self._token_cache_email = email
+
+    def login_from_token_cache(self):
+        """Log in with the cached tokens of the user, if they are still valid.
+
+        An access token that is about to expire is refreshed, and one that
+        is valid for longer is used without any request.
+
+        Returns:
+            bool: True if logged in
+        """
+        tokens = self.token_cache.load(self.host, self._token_cache_email)
+        if tokens is None:
+            return False
+        access_token, refresh_token = tokens
+        self._cache_user = self._token_cache_email.strip().lower()
+        if is_jwt_valid(access_token):
+            self._jwt_token = access_token
+            self._jwt_refresh_token = refresh_token
+            return True
+        if not is_jwt_valid(refresh_token):
+            return False
+        self._jwt_refresh_token = refresh_token
+        try:
+            self._refresh_authentication()
+        except APIClientError as err:
+            echo_debug(f"Failed to refresh cached tokens: {err}")
+            self._jwt_refresh_token = None
+            return False
+        return True
+
     def set_api_key(self, api_key):
         """Set api key on this instance."""
         self._api_key = api_key
+        self._cache_user = (
+            f"api-key {hashlib.sha256(api_key.encode('utf-8')).hexdigest()}"
+        )
 
     def refresh_token(self, refresh_token):
         """Refresh jwt token."""
@@ -440,6 +609,8 @@ class APIClient:
             self.endpoints.REFRESH_JWT.value,
             {"refresh": refresh_token},
             sensitive=True,
+            # a rejected refresh token can't be refreshed
+            refreshed=True,
             model=AccessJWT,
         )
 
@@ -458,6 +629,7 @@ class APIClient:
     def login(self, email, password, otp_token=None):
         """Log user in."""
         jwt = self.get_jwt(email, password, otp_token)
+        self._cache_user = email.strip().lower()
         self._set_jwt(jwt.access, jwt.refresh)
 
     def get_user_details(self):
@@ -11,6 +11,7 @@ from functools import wraps
 import click
 
 from gencove.client import APIClient, APIClientError
+from gencove.constants import RESPONSE_CACHE_DIR
 from gencove.exceptions import MaintenanceError, ValidationError
 from gencove.logger import (
     DEBUG,
@@ -22,7 +23,8 @@ from gencove.logger import (
     echo_info,
     echo_warning,
 )
-from gencove.utils import login, validate_credentials
+from gencove.response_cache import ResponseCache, is_response_cache_enabled
+from gencove.utils import get_local_state_dir, login, validate_credentials
 
 AWS_PROFILE = "AWS_PROFILE"
 AWS_CONFIG_FILE = "AWS_CONFIG_FILE"
@@ -109,6 +111,10 @@ class Command(object):  # pylint: disable=R0205
 
     def __init__(self, credentials, options):
         self.api_client = APIClient(options.host)
+        if is_response_cache_enabled():
+            self.api_client.response_cache = ResponseCache(
+                get_local_state_dir(RESPONSE_CACHE_DIR)
+            )
         self.is_logged_in = False
         self.credentials = credentials
         self.options = options
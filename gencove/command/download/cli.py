@@ -39,7 +39,11 @@ from .main import Download
 )
 @click.option(
     "--download-urls",
-    help="Output a list of file urls available for download in a JSON format.",
+    help=(
+        "Output a list of file urls available for download in a JSON format. "
+        "With --skip-existing, files downloaded to the directory of the list "
+        "are left out."
+    ),
     is_flag=True,
 )
 @click.option(
@@ -66,7 +70,24 @@ from .main import Download
     is_flag=True,
     help="If specified, an additional checksum file will be downloaded for each deliverable.",  # noqa: E501 line too long pylint: disable=line-too-long
 )
-def download(  # pylint: disable=E0012,C0330,R0913
+@click.option(
+    "--verify",
+    is_flag=True,
+    help=(
+        "If specified, each deliverable is checked against its sha256 checksum "
+        "while it is downloaded, and downloaded again if it doesn't match."
+    ),
+)
+@click.option(
+    "--max-connections",
+    type=click.IntRange(min=1),
+    default=None,
+    help=(
+        "Number of connections used at the same time, across all samples and "
+        "files. Tuned from the measured throughput by default."
+    ),
+)
+def download(  # pylint: disable=E0012,C0330,R0913,R0914
     destination,
     project_id,
     sample_ids,
@@ -80,6 +101,8 @@ def download(  # pylint: disable=E0012,C0330,R0913
     api_key,
     no_progress,
     checksums,
+    verify,
+    max_connections,
 ):  # noqa: D413,D301,D412 # pylint: disable=C0301
     """Download deliverables of a project.
 
@@ -123,6 +146,8 @@ def download(  # pylint: disable=E0012,C0330,R0913
             host=host,
             skip_existing=skip_existing,
             download_template=download_template,
+            max_connections=max_connections,
+            verify=verify,
         ),
         download_urls,
         no_progress,
@@ -40,6 +40,36 @@ KILOBYTE = 1024
 MEGABYTE = 1024 * KILOBYTE
 NUM_MB_IN_CHUNK = 3
 CHUNK_SIZE = NUM_MB_IN_CHUNK * MEGABYTE
+# connections kept alive for each host by sessions without a scheduler
+DEFAULT_POOL_SIZE = 8
+# number of samples whose files are downloaded at the same time
+DOWNLOAD_SAMPLE_WORKERS = 8
+# checksums fetched at the same time for files whose sample has none
+CHECKSUM_WORKERS = 4
+# bounds of the automatically tuned number of connections across all files
+AUTO_MIN_CONNECTIONS = 2
+AUTO_INITIAL_CONNECTIONS = 8
+AUTO_MAX_CONNECTIONS = 32
+# suffix of the file next to a partial download that records finished ranges
+RANGE_SIDECAR_SUFFIX = ".ranges.json"
+# size of the segments that large files are downloaded in
+DOWNLOAD_SEGMENT_SIZE = 64 * MEGABYTE
+# segments with less than twice this left are hedged instead of split
+MIN_SPLIT_SIZE = 2 * CHUNK_SIZE
+# bytes per second below which the tail of a segment gets a hedged request
+HEDGE_MIN_RATE = MEGABYTE
+# seconds a segment is measured before it can be hedged
+HEDGE_AFTER = 5
+# seconds before its expiry that a presigned download url is refreshed
+URL_REFRESH_MARGIN = 60
+# fresh urls requested for a single request rejected with 403
+URL_REFRESH_ATTEMPTS = 2
+# database of completed downloads in the destination directory
+DOWNLOAD_INDEX_FILE = ".gencove-downloads.sqlite3"
+# downloads of a file that doesn't match its checksum before giving up
+CHECKSUM_MISMATCH_TRIES = 3
+# seconds the hash of a file waits for more of its ranges to be written
+HASH_POLL_INTERVAL = 0.05
 
 
 # pylint: disable=too-few-public-methods
@@ -60,6 +90,8 @@ class DownloadOptions(Optionals):
 
     skip_existing: Optional[bool] = None
     download_template: Optional[str] = None
+    max_connections: Optional[int] = None
+    verify: Optional[bool] = None
 
 
 DEFAULT_FILENAME_TOKEN = f"{{{DownloadTemplateParts.DEFAULT_FILENAME.value}}}"
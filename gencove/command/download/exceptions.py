@@ -6,3 +6,11 @@ class DownloadTemplateError(Exception):
 
     Caused by download overwriting previously downloaded files.
     """
+
+
+class DownloadCancelled(Exception):
+    """Download was stopped because another download failed."""
+
+
+class ChecksumMismatch(Exception):
+    """Downloaded data doesn't match the checksum of the deliverable."""
@@ -0,0 +1,147 @@
+"""Index of the deliverables downloaded to a destination directory."""
+import datetime
+import os
+import sqlite3
+import threading
+
+from gencove.logger import echo_debug, echo_warning  # noqa: I100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    checksum_sha256 TEXT,
+    downloaded TEXT NOT NULL
+)
+"""
+
+
+class DownloadIndex:
+    """SQLite database of completed downloads, kept in the destination.
+
+    Every downloaded deliverable is recorded with its file id, checksum,
+    size and path, relative to the destination so it can be moved. A file
+    is skipped on later downloads without any request as long as the
+    sample still lists it with the same checksum and the local file has the
+    recorded size. Listings of download URLs leave out the files it has.
+    The index is shared by the threads processing samples, and a
+    destination where it can't be kept is downloaded without it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._directory = os.path.dirname(os.path.abspath(path))
+        self._connection = None
+        self._disabled = False
+        self._lock = threading.Lock()
+
+    def is_downloaded(self, file_id, path, checksum_sha256):
+        """Whether a deliverable was downloaded to the path and is unchanged.
+
+        Args:
+            file_id (str): id of the deliverable
+            path (str): path the deliverable is downloaded to
+            checksum_sha256 (str): checksum currently listed for it
+
+        Returns:
+            bool: True if the file can be skipped
+        """
+        recorded_path = self._find(file_id, checksum_sha256)
+        return recorded_path is not None and recorded_path == os.path.abspath(path)
+
+    def has_file(self, file_id, checksum_sha256):
+        """Whether a deliverable was downloaded anywhere in the destination
+        and is unchanged, for listings that don't know its path.
+
+        Args:
+            file_id (str): id of the deliverable
+            checksum_sha256 (str): checksum currently listed for it
+
+        Returns:
+            bool: True if the file doesn't need to be downloaded
+        """
+        return self._find(file_id, checksum_sha256) is not None
+
+    def _find(self, file_id, checksum_sha256):
+        """Path of an unchanged download of a deliverable.
+
+        Returns:
+            str: absolute path of the file, None if it wasn't downloaded,
+                its checksum changed or the file changed since
+        """
+        if not os.path.isfile(self.path):
+            return None
+        with self._lock:
+            row = self._execute(
+                "SELECT path, size, checksum_sha256 FROM files WHERE file_id = ?",
+                (str(file_id),),
+            )
+        if not row:
+            return None
+        recorded_path, size, recorded_checksum = row
+        path = os.path.normpath(os.path.join(self._directory, recorded_path))
+        if (
+            recorded_checksum == checksum_sha256
+            and os.path.isfile(path)
+            and os.path.getsize(path) == size
+        ):
+            return path
+        return None
+
+    def record(self, file_id, path, checksum_sha256):
+        """Record a completed download.
+
+        Args:
+            file_id (str): id of the deliverable
+            path (str): path the deliverable was downloaded to
+            checksum_sha256 (str): checksum listed for the deliverable
+        """
+        if not os.path.isfile(path):
+            return
+        with self._lock:
+            self._execute(
+                "INSERT OR REPLACE INTO files "
+                "(file_id, path, size, checksum_sha256, downloaded) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    str(file_id),
+                    self._relative(path),
+                    os.path.getsize(path),
+                    checksum_sha256,
+                    datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                ),
+            )
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            if self._connection:
+                self._connection.close()
+                self._connection = None
+
+    def _relative(self, path):
+        return os.path.relpath(os.path.abspath(path), self._directory)
+
+    def _execute(self, query, parameters):
+        """Run a query in its own transaction, the caller holds the lock.
+
+        Returns:
+            tuple: first row of the result, None if there is none or the
+                index can't be used
+        """
+        if self._disabled:
+            return None
+        try:
+            if self._connection is None:
+                os.makedirs(self._directory, exist_ok=True)
+                self._connection = sqlite3.connect(self.path, check_same_thread=False)
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute(SCHEMA)
+            with self._connection:
+                return self._connection.execute(query, parameters).fetchone()
+        except sqlite3.Error as err:
+            echo_warning(f"Download index {self.path} can't be used: {err}")
+            echo_debug("Downloading without the index")
+            self._disabled = True
+            return None
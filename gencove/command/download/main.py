@@ -1,6 +1,10 @@
 """Download command executor."""
+import functools
 import json
+import os
 import re
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 from pathlib import Path
 
 import backoff
@@ -13,18 +17,25 @@ from gencove.command.download.exceptions import DownloadTemplateError
 from gencove.command.utils import validate_file_types
 from gencove.constants import SampleArchiveStatus
 from gencove.exceptions import ValidationError
+from gencove.pagination import paginate
 
 from .constants import (
     ALLOWED_ARCHIVE_STATUSES_RE,
     ALLOWED_STATUSES_RE,
+    CHECKSUM_WORKERS,
+    DOWNLOAD_INDEX_FILE,
+    DOWNLOAD_SAMPLE_WORKERS,
     METADATA_FILE_TYPE,
     QC_FILE_TYPE,
 )
+from .index import DownloadIndex
+from .scheduler import DownloadScheduler
 from .utils import (
     build_file_path,
     download_file,
     fatal_process_sample_error,
     get_download_template_format_params,
+    is_sample_complete,
     save_metadata_file,
     save_qc_file,
 )
@@ -63,13 +74,30 @@ class Download(Command):
         self.filters = filters
         self.options = options
         self.sample_ids = set()
+        # project listing payloads that can be downloaded without a refetch
+        self.listed_samples = {}
         self.archived_samples_count = 0
         self.downloaded_files = set()
         self.download_urls = download_urls
         self.download_files = []
         self.no_progress = no_progress
         self.checksums = checksums
-        self.in_retry = False  # track whether we are in a retry
+        self.scheduler = None
+        self.download_index = None
+        self.checksum_executor = None
+        # samples are processed by several threads, each retrying on its own
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._downloading_files = set()
+
+    @property
+    def in_retry(self):
+        """Whether the sample of the current thread is being retried."""
+        return getattr(self._local, "in_retry", False)
+
+    @in_retry.setter
+    def in_retry(self, value):
+        self._local.in_retry = value
 
     def initialize(self):
         """Initialize download command."""
@@ -90,6 +118,8 @@ class Download(Command):
                         sample.archive_last_status.status
                     ):
                         self.sample_ids.add(sample.id)
+                        if is_sample_complete(sample):
+                            self.listed_samples[sample.id] = sample
                     else:
                         self.archived_samples_count += 1
             except client.APIClientError as err:
@@ -163,8 +193,23 @@ class Download(Command):
     def execute(self):
         if self.download_to != "-":
             self.echo_info("Processing samples")
-        for sample_id in self.sample_ids:
-            self.process_sample(sample_id)
+        self.scheduler = DownloadScheduler(
+            max_connections=self.options.max_connections,
+            no_progress=self.no_progress,
+        )
+        self.download_index = self.get_download_index()
+        if self.checksums:
+            self.checksum_executor = ThreadPoolExecutor(max_workers=CHECKSUM_WORKERS)
+        try:
+            self.process_samples()
+        finally:
+            self.scheduler.shutdown()
+            if self.download_index:
+                self.download_index.close()
+            if self.checksum_executor:
+                self.checksum_executor.shutdown(cancel_futures=True)
+        if self.scheduler.files_done:
+            self.echo_info(f"Downloaded {self.scheduler.files_done} files")
         if self.download_urls:
             self.output_list()
 
@@ -186,6 +231,49 @@ class Download(Command):
                 "restore before downloading."
             )
 
+    def get_download_index(self):
+        """Index of the downloads in the destination directory.
+
+        A list of download urls is written next to the downloads, so its
+        directory has the index.
+
+        Returns:
+            DownloadIndex: None when writing to stdout
+        """
+        if self.download_to == "-":
+            return None
+        index_directory = self.download_to
+        if self.download_urls:
+            index_directory = os.path.dirname(os.path.abspath(self.download_to))
+        return DownloadIndex(os.path.join(index_directory, DOWNLOAD_INDEX_FILE))
+
+    def process_samples(self):
+        """Process samples concurrently, sharing the scheduler connections.
+
+        Entries of the samples are added to the download list in the order
+        of the samples. The first failure cancels all other downloads.
+        """
+        sample_ids = list(self.sample_ids)
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(DOWNLOAD_SAMPLE_WORKERS, len(sample_ids)))
+        )
+        futures = [
+            executor.submit(self.process_sample, sample_id) for sample_id in sample_ids
+        ]
+        try:
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in futures:
+                if future in done and future.exception():
+                    raise future.exception()
+            for future in futures:
+                if future.result():
+                    self.download_files.append(future.result())
+        except BaseException:
+            self.scheduler.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     @backoff.on_exception(
         backoff.expo,
         requests.exceptions.HTTPError,
@@ -219,30 +307,20 @@ class Download(Command):
         Check if a sample is in appropriate state and if it is,
         get its files one by one.
 
-        If downloading and a download failed with error 403, reprocess the
-        sample in order to get fresh download url.
-        """
-        try:
-            sample = self.api_client.get_sample_details(sample_id)
-        except client.APIClientTooManyRequestsError:
-            self.echo_debug(
-                f"Request was throttled for sample {sample_id} "
-                "because of too many requests, trying again"
-            )
-            raise
-        except client.APIClientTimeout:
-            self.echo_debug(
-                f"Request was throttled for sample {sample_id} "
-                "because of timeout, trying again"
-            )
-            raise
-        except client.APIClientError as err:
-            self.echo_debug(
-                f"Sample with id {sample_id} not accessible due to "
-                f"API error, trying again. Error: {err}"
-            )
-            raise
+        A download url that expires while its file is downloaded is
+        replaced with a fresh one for that file. If downloading still failed
+        with error 403, reprocess the sample in order to get fresh download
+        urls.
 
+        Samples listed with the project are processed from the listing the
+        first time. Retries fetch the sample details, so an expired download
+        url is replaced.
+
+        Returns:
+            dict: sample and its deliverables for the download list, None if
+                the sample has no deliverables
+        """
+        sample = self.get_sample(sample_id)
         self.echo_debug(
             f"Processing sample id {sample.id}, status {sample.last_status.status}"
         )
@@ -255,7 +333,7 @@ class Download(Command):
 
         if not ALLOWED_STATUSES_RE.match(sample.last_status.status):
             self.echo_warning(f"Sample #{sample.id} has no deliverables.")
-            return
+            return None
 
         file_types_re = re.compile("|".join(self.filters.file_types), re.IGNORECASE)
 
@@ -281,25 +359,24 @@ class Download(Command):
         ):
             self.download_sample_metadata(file_with_prefix, sample_id)
 
-        self.download_files.append(
-            {
-                "gencove_id": sample.id,
-                "client_id": sample.client_id,
-                "last_status": {
-                    "id": sample.last_status.id,
-                    "status": sample.last_status.status,
-                    "created": sample.last_status.created,
-                },
-                "archive_last_status": {
-                    "id": sample.archive_last_status.id,
-                    "status": sample.archive_last_status.status,
-                    "created": sample.archive_last_status.created,
-                    "transition_cutoff": (sample.archive_last_status.transition_cutoff),
-                },
-                "files": {},
-            }
-        )
-
+        entry = {
+            "gencove_id": sample.id,
+            "client_id": sample.client_id,
+            "last_status": {
+                "id": sample.last_status.id,
+                "status": sample.last_status.status,
+                "created": sample.last_status.created,
+            },
+            "archive_last_status": {
+                "id": sample.archive_last_status.id,
+                "status": sample.archive_last_status.status,
+                "created": sample.archive_last_status.created,
+                "transition_cutoff": (sample.archive_last_status.transition_cutoff),
+            },
+            "files": {},
+        }
+
+        checksum_futures = []
         for sample_file in sample.files:
             # pylint: disable=E0012,C0330
             if self.filters.file_types and not file_types_re.match(
@@ -308,35 +385,178 @@ class Download(Command):
                 self.echo_debug("Deliverable file type is not in desired file types")
                 continue
 
+            if self.download_urls and self.is_indexed(sample_file):
+                self.echo_debug(f"Leaving out downloaded file {sample_file.id}")
+                continue
             if not self.download_urls:
                 file_path = build_file_path(
                     sample_file, file_with_prefix, self.download_to
                 )
-                self.validate_and_download(
-                    file_path,
-                    download_file,
-                    file_path,
-                    sample_file.download_url,
-                    self.options.skip_existing,
-                    self.no_progress,
-                )
+                indexed = self.download_sample_file(sample_id, sample_file, file_path)
                 if self.checksums:
-                    try:
-                        checksum = self.api_client.get_file_checksum(
-                            sample_file.id, filename=Path(file_path).name
-                        )
-                        self.create_checksum_file(file_path, checksum)
-                    except client.APIClientTooManyRequestsError:
-                        self.echo_debug(
-                            f"Request was throttled for file {sample_file}, "
-                            f"trying again"
-                        )
-                        raise
-            self.download_files[-1]["files"][sample_file.file_type] = {
+                    future = self.save_checksum(sample_file, file_path, indexed)
+                    if future:
+                        checksum_futures.append(future)
+            entry["files"][sample_file.file_type] = {
                 "id": sample_file.id,
                 "download_url": sample_file.download_url,
                 "checksum_sha256": sample_file.checksum_sha256,
             }
+        wait(checksum_futures)
+        for future in checksum_futures:
+            future.result()
+        return entry
+
+    def get_sample(self, sample_id):
+        """Sample from the project listing, or fetched from the API.
+
+        A listed sample is used only once, so that a retry fetches the sample
+        with fresh download urls.
+
+        Returns:
+            SampleDetails: sample with its files
+        """
+        sample = self.listed_samples.pop(sample_id, None)
+        if sample is not None:
+            return sample
+        try:
+            sample = self.api_client.get_sample_details(sample_id)
+        except client.APIClientTooManyRequestsError:
+            self.echo_debug(
+                f"Request was throttled for sample {sample_id} "
+                "because of too many requests, trying again"
+            )
+            raise
+        except client.APIClientTimeout:
+            self.echo_debug(
+                f"Request was throttled for sample {sample_id} "
+                "because of timeout, trying again"
+            )
+            raise
+        except client.APIClientError as err:
+            self.echo_debug(
+                f"Sample with id {sample_id} not accessible due to "
+                f"API error, trying again. Error: {err}"
+            )
+            raise
+        return sample
+
+    def download_sample_file(self, sample_id, sample_file, file_path):
+        """Download a deliverable, unless the download index has it.
+
+        Returns:
+            bool: True if the file was skipped because it is in the index
+        """
+        if (
+            self.options.skip_existing
+            and self.download_index
+            and self.download_index.is_downloaded(
+                sample_file.id, file_path, sample_file.checksum_sha256
+            )
+        ):
+            self.skip_indexed_file(file_path)
+            return True
+        if self.options.verify and not sample_file.checksum_sha256:
+            self.echo_warning(f"{file_path} has no checksum and won't be verified")
+        self.validate_and_download(
+            file_path,
+            download_file,
+            file_path,
+            sample_file.download_url,
+            self.options.skip_existing,
+            self.no_progress,
+            scheduler=self.scheduler,
+            refresh_url=functools.partial(
+                self.get_download_url, sample_id, sample_file.id
+            ),
+            checksum_sha256=(
+                sample_file.checksum_sha256 if self.options.verify else None
+            ),
+        )
+        if self.download_index:
+            self.download_index.record(
+                sample_file.id, file_path, sample_file.checksum_sha256
+            )
+        return False
+
+    def is_indexed(self, sample_file):
+        """Whether a deliverable is left out of the download urls because
+        the download index has it.
+
+        Returns:
+            bool: True if the file was downloaded and is unchanged
+        """
+        return bool(
+            self.options.skip_existing
+            and self.download_index
+            and self.download_index.has_file(
+                sample_file.id, sample_file.checksum_sha256
+            )
+        )
+
+    def skip_indexed_file(self, file_path):
+        """Account for a deliverable the download index has, without any
+        request.
+
+        Raises:
+            DownloadTemplateError: if another deliverable has the same path
+        """
+        with self._lock:
+            if self._claim_path(file_path):
+                self.downloaded_files.add(file_path)
+        self.echo_info(f"Skipping existing file: {file_path}")
+
+    def get_download_url(self, sample_id, file_id):
+        """Fresh download url of a sample file whose url expired.
+
+        Returns:
+            str: download url, None if the sample no longer has the file
+        """
+        sample = self.get_sample(sample_id)
+        for sample_file in sample.files:
+            if sample_file.id == file_id:
+                return sample_file.download_url
+        return None
+
+    def save_checksum(self, sample_file, file_path, indexed):
+        """Write the checksum file of a deliverable.
+
+        The checksum comes with the sample, and is fetched from the API only
+        for files that don't have it, in the background so the downloads
+        continue meanwhile.
+
+        Args:
+            sample_file (SampleFile): deliverable of a sample
+            file_path (str): file path the deliverable was downloaded to
+            indexed (bool): whether the download was skipped as indexed
+
+        Returns:
+            Future: of the checksum that is fetched, None if it was written
+        """
+        if sample_file.checksum_sha256:
+            self.create_checksum_file(
+                file_path,
+                f"{sample_file.checksum_sha256} *{Path(file_path).name}\n",
+            )
+            return None
+        if indexed and os.path.isfile(f"{file_path}.sha256"):
+            return None
+        return self.checksum_executor.submit(
+            self.fetch_checksum, sample_file, file_path
+        )
+
+    def fetch_checksum(self, sample_file, file_path):
+        """Fetch the checksum of a deliverable and write its checksum file."""
+        try:
+            checksum = self.api_client.get_file_checksum(
+                sample_file.id, filename=Path(file_path).name
+            )
+        except client.APIClientTooManyRequestsError:
+            self.echo_debug(
+                f"Request was throttled for file {sample_file}, trying again"
+            )
+            raise
+        self.create_checksum_file(file_path, checksum)
 
     def create_checksum_file(self, file_path, checksum_sha256):
         """Create checksum file.
@@ -344,7 +564,8 @@ class Download(Command):
         Args:
             file_path (str): File path of the original file,
                 will append .sha256
-            checksum_sha256 (str): Checksum (sha256) value for the file
+            checksum_sha256 (str): Checksum (sha256) of the file, in the
+                format of sha256sum
 
         Returns:
             None
@@ -371,24 +592,49 @@ class Download(Command):
              list
         """
 
+        with self._lock:
+            if not self._claim_path(download_to_path):
+                return
+            self._downloading_files.add(download_to_path)
+
+        try:
+            download_func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._downloading_files.discard(download_to_path)
+
+        self.echo_debug(f"Adding file path: {download_to_path}")
+        with self._lock:
+            self.downloaded_files.add(download_to_path)
+
+    def _claim_path(self, download_to_path):
+        """Check that no other deliverable uses a path, the caller holds the
+        lock.
+
+        Returns:
+            bool: False if the file was downloaded before a retry and is
+                skipped
+
+        Raises:
+            DownloadTemplateError: if the path is used by another deliverable
+        """
         if download_to_path in self.downloaded_files and self.in_retry:
             self.echo_debug(
                 f"file path: {download_to_path} already exists and code is "
                 "in retry status, skipping"
             )
-            return
+            return False
 
-        if download_to_path in self.downloaded_files:
+        if (
+            download_to_path in self.downloaded_files
+            or download_to_path in self._downloading_files
+        ):
             raise DownloadTemplateError(
                 f"Bad template: {download_to_path} file already exists. "
                 "Update your template to avoid files containing the same name "
                 "and try again."
             )
-
-        download_func(*args, **kwargs)
-
-        self.echo_debug(f"Adding file path: {download_to_path}")
-        self.downloaded_files.add(download_to_path)
+        return True
 
     def download_sample_qc_metrics(self, file_with_prefix, sample_id):
         """Download and save to file on user file system.
@@ -445,19 +691,17 @@ class Download(Command):
 
     def _get_paginated_samples(self):
         """Generate for project samples that traverses all pages."""
-        get_samples = True
-        next_page = None
-        while get_samples:
-            self.echo_debug(f"Getting page: {next_page or 1}")
-            req = self.api_client.get_project_samples(
-                self.filters.project_id,
-                next_page,
-                sample_archive_status=SampleArchiveStatus.ALL.value,
-            )
-            for sample in req.results:
-                yield sample
-            next_page = req.meta.next
-            get_samples = next_page is not None
+        for samples in paginate(self._get_samples):
+            yield from samples
+
+    def _get_samples(self, next_page=None):
+        """Get project samples page."""
+        self.echo_debug(f"Getting page: {next_page or 1}")
+        return self.api_client.get_project_samples(
+            self.filters.project_id,
+            next_page,
+            sample_archive_status=SampleArchiveStatus.ALL.value,
+        )
 
     def output_list(self):
         """Output reformatted JSON of each individual sample."""
@@ -0,0 +1,115 @@
+"""Presigned download urls that are replaced when they expire."""
+import datetime
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+from gencove.logger import echo_debug  # noqa: I100
+
+from .constants import URL_REFRESH_MARGIN
+
+AMZ_DATE_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+def get_url_expiry(url):
+    """Time at which a presigned url stops being accepted.
+
+    Both signature version 4 urls, which hold the signing time and the
+    number of seconds they are valid for, and urls with an `Expires`
+    timestamp, as signed by signature version 2 and CloudFront, are
+    understood.
+
+    Args:
+        url (str): presigned url
+
+    Returns:
+        datetime.datetime: expiry in UTC, None if the url doesn't tell
+    """
+    query = {
+        key.lower(): values[0] for key, values in parse_qs(urlparse(url).query).items()
+    }
+    try:
+        if "x-amz-date" in query and "x-amz-expires" in query:
+            signed = datetime.datetime.strptime(
+                query["x-amz-date"], AMZ_DATE_FORMAT
+            ).replace(tzinfo=datetime.timezone.utc)
+            return signed + datetime.timedelta(seconds=int(query["x-amz-expires"]))
+        if "expires" in query:
+            return datetime.datetime.fromtimestamp(
+                int(query["expires"]), tz=datetime.timezone.utc
+            )
+    except (ValueError, OverflowError):
+        pass
+    return None
+
+
+class PresignedUrl:
+    """Download url of a file shared by the requests of its ranges.
+
+    When the url expires, `refresh` gets a fresh one for the file alone,
+    so the ranges that are left continue with it instead of the whole
+    sample being processed again. Ranges that fail at the same time cause
+    a single refresh, since only a request that used the current url
+    replaces it. `refresh` returns None when there is no fresh url.
+    """
+
+    def __init__(self, url, refresh=None):
+        self.url = url
+        self._refresh = refresh
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Url to send a request to, refreshed if it is about to expire.
+
+        Returns:
+            str: presigned url
+        """
+        with self._lock:
+            if self._refresh and self._expires_soon():
+                try:
+                    self._replace()
+                except Exception as err:  # pylint: disable=broad-except
+                    # the url is still valid for a while
+                    echo_debug(f"Failed to refresh download url: {err}")
+            return self.url
+
+    def refresh(self, expired_url):
+        """Replace an url that was rejected as expired.
+
+        Args:
+            expired_url (str): url the rejected request was sent to
+
+        Returns:
+            bool: True if the request can be sent again to `current()`
+        """
+        with self._lock:
+            if self._refresh is None:
+                return False
+            if self.url == expired_url:
+                return self._replace()
+            return True
+
+    def _expires_soon(self):
+        """Whether the url expires within the refresh margin."""
+        if (
+            self._refreshed_at is not None
+            and time.monotonic() - self._refreshed_at < URL_REFRESH_MARGIN
+        ):
+            # a fresh url that is short lived is used until it is rejected
+            return False
+        expiry = get_url_expiry(self.url)
+        if expiry is None:
+            return False
+        margin = datetime.timedelta(seconds=URL_REFRESH_MARGIN)
+        return expiry - margin <= datetime.datetime.now(datetime.timezone.utc)
+
+    def _replace(self):
+        """Get a fresh url, keeping the current one if there is none."""
+        self._refreshed_at = time.monotonic()
+        url = self._refresh()
+        if not url:
+            return False
+        echo_debug("Download url expired, continuing with a fresh one")
+        self.url = str(url)
+        return True
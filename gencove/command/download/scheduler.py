@@ -0,0 +1,202 @@
+"""Scheduler that shares connections between all files of a download."""
+import contextlib
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+import requests
+
+from gencove.logger import echo_debug  # noqa: I100
+from gencove.sessions import create_session
+from gencove.tuning import ThroughputTuner
+from gencove.utils import get_progress_bar
+
+from .constants import (
+    AUTO_INITIAL_CONNECTIONS,
+    AUTO_MAX_CONNECTIONS,
+    AUTO_MIN_CONNECTIONS,
+)
+from .exceptions import DownloadCancelled
+
+
+def is_throttling_error(err):
+    """Whether an error means that too many requests are in flight.
+
+    Returns:
+        bool: True for 429, 5xx, timeouts and dropped connections
+    """
+    if isinstance(err, requests.exceptions.HTTPError):
+        if err.response is None:
+            return False
+        status_code = err.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(
+        err, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    )
+
+
+# pylint: disable=too-many-instance-attributes
+class DownloadScheduler:
+    """Connection budget, range workers and progress shared by all files.
+
+    Every request for file data holds one of the `connections` while its
+    body is streamed, whichever sample or file it belongs to. Small files
+    are downloaded whole by the threads that process samples, and the range
+    workers of large files run on a shared pool, so the budget is filled
+    with work from many samples and files at once.
+
+    Unless `max_connections` is given, the budget is tuned from the
+    throughput by a `ThroughputTuner`, and requests that get 429, a server
+    error or a timeout halve it.
+    """
+
+    def __init__(self, max_connections=None, no_progress=False):
+        self.adaptive = max_connections is None
+        self._tuner = None
+        if self.adaptive:
+            self._tuner = ThroughputTuner(
+                AUTO_INITIAL_CONNECTIONS,
+                AUTO_MIN_CONNECTIONS,
+                AUTO_MAX_CONNECTIONS,
+                "Download connections",
+            )
+            max_workers = AUTO_MAX_CONNECTIONS
+        else:
+            self._fixed_connections = max_workers = max_connections
+        # ranges of a large file can use every connection of the budget
+        self.max_ranges = max_workers
+        # keeps a connection alive for every request of the budget
+        self.session = create_session(pool_size=max_workers)
+        self.no_progress = no_progress
+        self.files_done = 0
+        self._range_executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._condition = threading.Condition()
+        self._active = 0
+        self._cancelled = threading.Event()
+        self._progress_bar = None
+        self._total = 0
+        self._progress = 0
+
+    @property
+    def connections(self):
+        """Number of requests for file data in flight at the same time."""
+        return self._tuner.value if self._tuner else self._fixed_connections
+
+    @property
+    def cancelled(self):
+        """Whether downloads should stop."""
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Stop requests that didn't start and ranges between chunks."""
+        self._cancelled.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Hold a connection of the budget while the block runs.
+
+        Yields:
+            callable: gives the connection back before the block ends
+
+        Raises:
+            DownloadCancelled: if downloads were cancelled
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._active < self.connections or self.cancelled
+            )
+            if self.cancelled:
+                raise DownloadCancelled
+            self._active += 1
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+        try:
+            yield release
+        except Exception as err:
+            if not released and is_throttling_error(err):
+                self.throttled()
+            raise
+        finally:
+            release()
+
+    def run_workers(self, worker, count):
+        """Run range workers of a file on the shared pool.
+
+        Args:
+            worker (callable): fetches ranges of the file until none are
+                left, it must hold a connection during each request
+            count (int): number of workers
+
+        Raises:
+            Exception: the first error of a worker, once the other workers
+                of the file that already started are done
+        """
+        futures = [self._range_executor.submit(worker) for _ in range(count)]
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception():
+                for other in not_done:
+                    other.cancel()
+                wait(not_done)
+                raise future.exception()
+
+    def add_file(self, size):
+        """Add the size of a file that is being downloaded to the progress."""
+        with self._condition:
+            self._total += size
+            if self.no_progress:
+                return
+            if not self._progress_bar:
+                self._progress_bar = get_progress_bar(self._total, "Downloading: ")
+                self._progress_bar.start()
+            else:
+                self._progress_bar.max_value = self._total
+
+    def file_done(self, file_path):
+        """Count a finished file."""
+        with self._condition:
+            self.files_done += 1
+        echo_debug(f"Download {self.files_done} finished: {file_path}")
+
+    def transferred(self, amount):
+        """Account for downloaded bytes in the progress and the throughput."""
+        with self._condition:
+            self._progress += amount
+            if self._progress_bar:
+                self._progress_bar.update(min(self._progress, self._total))
+            if self._tuner and self._tuner.transferred(amount):
+                self._condition.notify_all()
+
+    def tune(self, rate):
+        """Adjust the budget to the throughput of the last interval.
+
+        Args:
+            rate (float): bytes per second received during the last interval
+        """
+        if self._tuner:
+            self._tuner.tune(rate)
+
+    def throttled(self):
+        """Halve the budget after a request was throttled or failed."""
+        if not self._tuner:
+            return
+        with self._condition:
+            self._tuner.reset(self._tuner.value // 2, "requests throttled")
+
+    def shutdown(self):
+        """Wait for running ranges, close connections and finish progress."""
+        self._range_executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+        if self._progress_bar:
+            self._progress_bar.finish()
+            self._progress_bar = None
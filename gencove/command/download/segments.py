@@ -0,0 +1,143 @@
+"""Segments of a file shared by range workers, with work stealing."""
+import collections
+import itertools
+import threading
+import time
+
+from .constants import HEDGE_AFTER, HEDGE_MIN_RATE, MIN_SPLIT_SIZE
+
+
+class Segment:
+    """Byte range fetched by one request.
+
+    `end` shrinks when an idle worker takes over the tail of the segment,
+    and `position` is the first byte that wasn't written yet.
+    """
+
+    def __init__(self, start, end, partner=None):
+        self.start = start
+        self.end = end
+        self.position = start
+        self.partner = partner
+        self.started = time.monotonic()
+
+    @property
+    def remaining(self):
+        """Number of bytes left to write."""
+        return self.end - self.position + 1
+
+    def rate(self, now):
+        """Bytes written per second since the segment started."""
+        return (self.position - self.start) / max(now - self.started, 1e-9)
+
+
+class SegmentQueue:
+    """Segments handed out to the range workers of a file.
+
+    Workers take segments from the queue until it is empty. Then an idle
+    worker splits the segment with the most bytes left and takes its second
+    half, or sends a duplicate, hedged request for the rest of a segment too
+    small to split that is slower than `HEDGE_MIN_RATE`. Whichever request
+    of a hedged pair finishes first ends the other one. The download of a
+    file is therefore not held up by its slowest connection.
+    """
+
+    def __init__(self, ranges):
+        self._pending = collections.deque(Segment(start, end) for start, end in ranges)
+        self._active = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def next(self):
+        """Return the next segment to fetch, None when there is none."""
+        with self._lock:
+            if self._closed:
+                return None
+            if self._pending:
+                segment = self._pending.popleft()
+                segment.started = time.monotonic()
+            else:
+                segment = self._steal()
+            if segment:
+                self._active.add(segment)
+            return segment
+
+    def _steal(self):
+        candidates = [
+            segment
+            for segment in self._active
+            if segment.remaining > 0 and not segment.partner
+        ]
+        if not candidates:
+            return None
+        victim = max(candidates, key=lambda segment: segment.remaining)
+        if victim.remaining >= 2 * MIN_SPLIT_SIZE:
+            middle = victim.position + victim.remaining // 2
+            segment = Segment(middle, victim.end)
+            victim.end = middle - 1
+            return segment
+        now = time.monotonic()
+        if now - victim.started >= HEDGE_AFTER and victim.rate(now) < HEDGE_MIN_RATE:
+            segment = Segment(victim.position, victim.end, partner=victim)
+            victim.partner = segment
+            return segment
+        return None
+
+    def allowed(self, segment, size):
+        """Number of bytes of a chunk of `size` that are left to write."""
+        with self._lock:
+            return max(0, min(size, segment.remaining))
+
+    def advance(self, segment, size):
+        """Record bytes written to the file."""
+        with self._lock:
+            segment.position += size
+
+    def finish(self, segment):
+        """Remove a segment that is done, ending its hedged partner.
+
+        Returns:
+            tuple: inclusive byte range that was written, None if nothing
+                was written
+        """
+        with self._lock:
+            self._active.discard(segment)
+            partner = segment.partner
+            if partner and segment.remaining <= 0:
+                # the rest of the partner was written by this segment
+                partner.end = min(partner.end, partner.position - 1)
+            if segment.position == segment.start:
+                return None
+            return (segment.start, segment.position - 1)
+
+    def written_until(self, total):
+        """Offset below which every byte of the file was written.
+
+        Args:
+            total (int): size of the file
+
+        Returns:
+            int: position of the first segment with bytes left, `total`
+                when there is none
+        """
+        with self._lock:
+            return min(
+                (
+                    segment.position
+                    for segment in itertools.chain(self._pending, self._active)
+                    if segment.remaining > 0
+                ),
+                default=total,
+            )
+
+    def covered(self, segment):
+        """Whether the bytes left of a failed segment are fetched anyway."""
+        with self._lock:
+            return segment.remaining <= 0 or (
+                segment.partner is not None and segment.partner in self._active
+            )
+
+    def close(self):
+        """Hand out no more segments."""
+        with self._lock:
+            self._closed = True
@@ -0,0 +1,16 @@
+"""HTTP sessions that keep connections to deliverable storage alive."""
+import functools
+
+from gencove.sessions import create_session
+
+from .constants import DEFAULT_POOL_SIZE
+
+
+@functools.lru_cache(maxsize=None)
+def get_session():
+    """Session shared by downloads that don't bring their own.
+
+    Returns:
+        requests.Session: session created on first use
+    """
+    return create_session(DEFAULT_POOL_SIZE)
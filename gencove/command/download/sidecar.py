@@ -0,0 +1,98 @@
+"""Sidecar of partial downloads, used to resume interrupted downloads."""
+import json
+import os
+import threading
+
+from gencove.logger import echo_debug
+
+from .constants import RANGE_SIDECAR_SUFFIX
+
+
+class RangeSidecar:
+    """Byte ranges of a partial download that were written to its file.
+
+    The state is saved next to the temporary file of the download, holding
+    the size and ETag of the remote object and the byte ranges that were
+    written. The sidecar is replaced atomically, so an interrupted write
+    leaves the previous state in place.
+    """
+
+    def __init__(self, file_path_tmp):
+        self.file_path_tmp = file_path_tmp
+        self.path = f"{file_path_tmp}{RANGE_SIDECAR_SUFFIX}"
+        self.state = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the saved state, None if there is none."""
+        try:
+            with open(self.path, encoding="utf-8") as sidecar_file:
+                return json.load(sidecar_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as err:
+            echo_debug(f"Ignoring unreadable download sidecar {self.path}: {err}")
+            return None
+
+    def resume(self, size, etag):
+        """Return the ranges that are left of a partial download.
+
+        Args:
+            size (int): size of the remote object
+            etag (str): ETag of the remote object
+
+        Returns:
+            list of tuple: inclusive byte ranges that weren't written, None
+                if there is no partial download of the same object
+        """
+        state = self.load()
+        if (
+            not state
+            or state.get("size") != size
+            or state.get("etag") != etag
+            or not os.path.isfile(self.file_path_tmp)
+            or os.path.getsize(self.file_path_tmp) != size
+        ):
+            return None
+        self.state = state
+        missing = []
+        position = 0
+        for start, end in sorted(state["done"]):
+            if start > position:
+                missing.append((position, start - 1))
+            position = max(position, end + 1)
+        if position < size:
+            missing.append((position, size - 1))
+        return missing
+
+    def start(self, size, etag):
+        """Record a new partial download.
+
+        Args:
+            size (int): size of the remote object
+            etag (str): ETag of the remote object
+        """
+        with self._lock:
+            self.state = {"size": size, "etag": etag, "done": []}
+            self._save()
+
+    def add_range(self, start, end):
+        """Record a range that was completely written."""
+        with self._lock:
+            self.state["done"].append([start, end])
+            self._save()
+
+    def remove(self):
+        """Forget the partial download."""
+        with self._lock:
+            self.state = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as sidecar_file:
+            json.dump(self.state, sidecar_file)
+        os.replace(tmp_path, self.path)
@@ -1,4 +1,6 @@
 """Download command utilities."""
+import contextlib
+import hashlib
 import json
 import os
 import re
@@ -22,13 +24,22 @@ from gencove.models import SampleFile
 from gencove.utils import get_progress_bar
 
 from .constants import (
+    CHECKSUM_MISMATCH_TRIES,
     CHUNK_SIZE,
     DEFAULT_FILENAME_TOKEN,
+    DOWNLOAD_SEGMENT_SIZE,
     FILENAME_RE,
     FILE_TYPES_MAPPER,
     FilePrefix,
     MEGABYTE,
+    URL_REFRESH_ATTEMPTS,
 )
+from .exceptions import ChecksumMismatch, DownloadCancelled
+from .presigned import PresignedUrl
+from .segments import SegmentQueue
+from .session import get_session
+from .sidecar import RangeSidecar
+from .verify import TrailingHash, verify_checksum
 
 MAX_PARALLEL_DOWNLOADS = 8
 MIN_BYTES_PER_PART = 8 * MEGABYTE  # 8 MB
@@ -153,7 +164,7 @@ def fatal_request_error(err=None):
     Returns:
         bool: True if to giveup on backing off, False it to continue.
     """
-    if not err or not err.response:
+    if not err or err.response is None:
         return False
     if err.response.status_code == 403:
         # download url needs to be refreshed, give up on backoff
@@ -172,7 +183,18 @@ def fatal_request_error(err=None):
     max_time=MAX_RETRY_TIME_SECONDS,
     giveup=fatal_request_error,
 )
-def download_file(file_path, download_url, skip_existing=True, no_progress=False):
+@backoff.on_exception(
+    backoff.constant, ChecksumMismatch, max_tries=CHECKSUM_MISMATCH_TRIES
+)
+def download_file(
+    file_path,
+    download_url,
+    skip_existing=True,
+    no_progress=False,
+    scheduler=None,
+    refresh_url=None,
+    checksum_sha256=None,
+):
     """Download a file to file system.
 
     Args:
@@ -181,18 +203,59 @@ def download_file(file_path, download_url, skip_existing=True, no_progress=False
         download_url (str): url of the file to download
         skip_existing (bool): skip already downloaded files
         no_progress (bool): don't show progress bar
+        scheduler (DownloadScheduler): shared connections and progress of
+            all files being downloaded, the file gets its own progress bar
+            and range workers if not given
+        refresh_url (callable): returns a fresh download url of the file,
+            used when `download_url` expires before all of it is downloaded
+        checksum_sha256 (str): sha256 the downloaded data is verified
+            against while it is written, the file is downloaded again
+            if it doesn't match
 
     Returns:
         str : file path
             location of the downloaded file
+
+    Raises:
+        ChecksumMismatch: if every download of the file had another sha256
     """
-    download_url = (
-        str(download_url) if isinstance(download_url, HttpUrl) else download_url
+    download_url = PresignedUrl(
+        str(download_url) if isinstance(download_url, HttpUrl) else download_url,
+        refresh_url,
     )
-    file_path_tmp = f"{file_path}.tmp"
     request_kwargs_base = {"stream": True, "allow_redirects": False, "timeout": 30}
 
-    response = requests.get(download_url, **request_kwargs_base)
+    connection = (
+        scheduler.connection() if scheduler else contextlib.nullcontext(lambda: None)
+    )
+    with connection as release:
+        return _download_file(
+            file_path,
+            download_url,
+            skip_existing,
+            no_progress,
+            scheduler,
+            request_kwargs_base,
+            release,
+            checksum_sha256,
+        )
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def _download_file(
+    file_path,
+    download_url,
+    skip_existing,
+    no_progress,
+    scheduler,
+    request_kwargs_base,
+    release,
+    checksum_sha256=None,
+):
+    """Download a file while holding a connection released by `release`."""
+    file_path_tmp = f"{file_path}.tmp"
+    session = scheduler.session if scheduler else get_session()
+    response = _get(session, download_url, **request_kwargs_base)
 
     try:
         response.raise_for_status()
@@ -207,7 +270,10 @@ def download_file(file_path, download_url, skip_existing=True, no_progress=False
             return file_path
 
         echo_info(f"Downloading file to {file_path}")
-        worker_count = _determine_parallel_workers(total)
+        if scheduler:
+            worker_count = _determine_parallel_workers(total, scheduler.max_ranges)
+        else:
+            worker_count = _determine_parallel_workers(total)
 
         echo_debug(f"Using {worker_count} worker(s)")
 
@@ -215,34 +281,132 @@ def download_file(file_path, download_url, skip_existing=True, no_progress=False
             # For small files or limited threads, consume the initial response stream
             # instead of making additional range requests.
             # this is primarily to maintain compatibility with older tests
-            _download_from_response(response, file_path_tmp, total, no_progress)
+            if scheduler:
+                scheduler.add_file(total)
+            # left behind by a partial download of another version of the object
+            RangeSidecar(file_path_tmp).remove()
+            file_hash = hashlib.sha256() if checksum_sha256 else None
+            _download_from_response(
+                response, file_path_tmp, total, no_progress, scheduler, file_hash
+            )
         else:
-            with open(file_path_tmp, "wb") as tmp_file:
-                tmp_file.truncate(total)
-
-            response.close()
-            _download_in_parallel(
-                download_url,
-                file_path_tmp,
-                total,
-                worker_count,
-                no_progress,
-                request_kwargs_base,
+            sidecar = RangeSidecar(file_path_tmp)
+            ranges = _prepare_ranges(
+                sidecar, total, response.headers.get("etag"), worker_count
             )
+            if scheduler:
+                scheduler.add_file(sum(end - start + 1 for start, end in ranges))
+            response.close()
+            # ranges hold connections of their own
+            release()
+            file_hash = TrailingHash(file_path_tmp) if checksum_sha256 else None
+            try:
+                _download_in_parallel(
+                    download_url,
+                    file_path_tmp,
+                    total,
+                    worker_count,
+                    no_progress,
+                    request_kwargs_base,
+                    scheduler,
+                    ranges,
+                    sidecar,
+                    file_hash,
+                )
+            except BaseException:
+                if file_hash:
+                    file_hash.stop()
+                raise
+            sidecar.remove()
+        verify_checksum(file_path, file_hash, checksum_sha256)
         _finalize_download(file_path_tmp, file_path)
         echo_info(f"Finished downloading file: {file_path}")
+        if scheduler:
+            scheduler.file_done(file_path)
         return file_path
     finally:
         response.close()
 
         # if there's a failure, tmp file remains
-        # this ensures it is always removed
-        if os.path.exists(file_path_tmp):
-            echo_info(f"Removing temporary file: {file_path_tmp}")
-            os.remove(file_path_tmp)
+        # this ensures it is removed unless the download can be resumed
+        _remove_temporary_file(file_path_tmp)
+
 
+def _remove_temporary_file(file_path_tmp):
+    """Remove the temporary file of a failed download that can't be resumed
+
+    Args:
+        file_path_tmp (str): Temporary file path used during download
 
-def _download_from_response(response, file_path_tmp, total, no_progress):
+    Returns:
+        None
+    """
+    if not os.path.exists(file_path_tmp):
+        return
+    if RangeSidecar(file_path_tmp).load():
+        echo_info(
+            f"Keeping partial download {file_path_tmp}, "
+            "it is resumed when the file is downloaded again"
+        )
+        return
+    echo_info(f"Removing temporary file: {file_path_tmp}")
+    os.remove(file_path_tmp)
+
+
+def _prepare_ranges(sidecar, total, etag, worker_count):
+    """Return the segments to download, resuming a partial download if any
+
+    A partial download of the same object is resumed, anything else
+    is replaced by a new preallocated temporary file.
+
+    Args:
+        sidecar (RangeSidecar): Sidecar of the temporary file
+        total (int): Full size of the object in bytes
+        etag (str): ETag of the object
+        worker_count (int): Number of concurrent range requests
+
+    Returns:
+        list[tuple[int, int]]: Inclusive byte ranges left to download
+    """
+    missing = sidecar.resume(total, etag)
+    if missing is not None:
+        left = sum(end - start + 1 for start, end in missing)
+        echo_info(
+            f"Resuming partial download {sidecar.file_path_tmp}: "
+            f"{left} of {total} bytes left"
+        )
+    else:
+        _preallocate(sidecar.file_path_tmp, total)
+        sidecar.start(total, etag)
+        missing = [(0, total - 1)]
+    segment_size = min(DOWNLOAD_SEGMENT_SIZE, -(-total // worker_count))
+    return [
+        segment
+        for start, end in missing
+        for segment in _split_range(start, end, segment_size)
+    ]
+
+
+def _split_range(start, end, segment_size):
+    """Split an inclusive byte range into segments
+
+    Args:
+        start (int): First byte of the range
+        end (int): Last byte of the range
+        segment_size (int): Size of each segment but the last one
+
+    Returns:
+        list[tuple[int, int]]: Inclusive byte ranges of the segments
+    """
+    return [
+        (position, min(position + segment_size, end + 1) - 1)
+        for position in range(start, end + 1, segment_size)
+    ]
+
+
+def _download_from_response(
+    response, file_path_tmp, total, no_progress, scheduler=None, file_hash=None
+):
     """Download file by consuming response stream
 
     Args:
@@ -250,13 +414,18 @@ def _download_from_response(response, file_path_tmp, total, no_progress):
         file_path_tmp (str): Temporary file path used during download
         total (int): Full size of the object in bytes
         no_progress (bool): Disable progress reporting when True
+        scheduler (DownloadScheduler): Reports progress of all files if given
+        file_hash (hashlib.sha256): Hash updated with the data written
 
     Returns:
         None
+
+    Raises:
+        DownloadCancelled: if the scheduler was cancelled
     """
     progress = 0
     pbar = None
-    if not no_progress:
+    if not no_progress and not scheduler:
         pbar = get_progress_bar(total, "Downloading: ")
         pbar.start()
 
@@ -265,9 +434,15 @@ def _download_from_response(response, file_path_tmp, total, no_progress):
             if not chunk:
                 continue
             downloaded_file.write(chunk)
+            if file_hash:
+                file_hash.update(chunk)
             progress += len(chunk)
             if pbar:
                 pbar.update(progress)
+            if scheduler:
+                if scheduler.cancelled:
+                    raise DownloadCancelled
+                scheduler.transferred(len(chunk))
 
     if pbar:
         pbar.finish()
@@ -280,95 +455,316 @@ def _download_in_parallel(  # pylint: disable=too-many-locals
     worker_count,
     no_progress,
     request_kwargs_base,
+    scheduler=None,
+    ranges=None,
+    sidecar=None,
+    file_hash=None,
 ):
     """Download file by splitting into byte ranges and fetching in parallel
 
     Args:
-        download_url (str): URL of the object to download
+        download_url (PresignedUrl): URL of the object to download
         file_path_tmp (str): Temporary file path used during download
         total (int): Full size of the object in bytes
         worker_count (int): Number of concurrent range requests
         no_progress (bool): Disable progress reporting when True
-        request_kwargs_base (dict): Common keyword arguments for `requests.get`
+        request_kwargs_base (dict): Common keyword arguments for `Session.get`
+        scheduler (DownloadScheduler): Runs the workers on the shared pool,
+            within the shared connection budget, if given
+        ranges (list[tuple[int, int]]): Byte ranges to fetch, one for each
+            worker if not given
+        sidecar (RangeSidecar): Records the ranges that were written
+        file_hash (TrailingHash): Hashes the file behind the written ranges
 
     Returns:
         None
     """
+    if ranges is None:
+        ranges = _build_ranges(total, worker_count)
     if not os.path.exists(file_path_tmp):
-        with open(file_path_tmp, "wb") as tmp_file:
-            tmp_file.truncate(total)
+        _preallocate(file_path_tmp, total)
+    segments = SegmentQueue(ranges)
+    session = scheduler.session if scheduler else get_session()
+    if file_hash:
+        file_hash.start(total, segments.written_until)
+
+    if scheduler:
+        with _RangeFile(file_path_tmp) as range_file:
+            scheduler.run_workers(
+                lambda: _fetch_segments(
+                    session,
+                    download_url,
+                    request_kwargs_base,
+                    segments,
+                    range_file,
+                    sidecar,
+                    scheduler.transferred,
+                    lambda: scheduler.cancelled,
+                    scheduler.connection,
+                ),
+                worker_count,
+            )
+        return
 
     pbar = None
     progress = _ThreadSafeCounter()
+    # resumed downloads start with the ranges written before
+    progress.increment(total - sum(end - start + 1 for start, end in ranges))
     cancel_event = threading.Event()
 
     if not no_progress:
         pbar = get_progress_bar(total, "Downloading: ")
         pbar.start()
+        pbar.update(progress.value)
 
     def update_progress(amount):
         if not pbar:
             return
         current = progress.increment(amount)
-        pbar.update(current)
-
-    def fetch_range(start, end):
-        """Fetch range of bytes from the download URL and write to file"""
-        if cancel_event.is_set():
-            return
-        expected = end - start + 1
-        request_headers = {"Range": f"bytes={start}-{end}"}
-        request_kwargs = request_kwargs_base
-        request_kwargs["headers"] = request_headers
-        with requests.get(download_url, **request_kwargs) as resp:
-            resp.raise_for_status()
-            bytes_written = 0
-            with open(file_path_tmp, "rb+") as part_file:
-                part_file.seek(start)
-                for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
-                    if cancel_event.is_set():
-                        return
-                    if not chunk:
-                        continue
-                    part_file.write(chunk)
-                    bytes_written += len(chunk)
-                    update_progress(len(chunk))
-            if bytes_written != expected:
-                raise requests.exceptions.ContentDecodingError(
-                    f"Incomplete range download for bytes {start}-{end} "
-                    f"(expected {expected}, got {bytes_written})"
-                )
+        pbar.update(min(current, total))
 
-    ranges = _build_ranges(total, worker_count)
+    range_file = _RangeFile(file_path_tmp)
     executor = ThreadPoolExecutor(max_workers=worker_count)
-    futures = [executor.submit(fetch_range, start, end) for start, end in ranges]
+    futures = [
+        executor.submit(
+            _fetch_segments,
+            session,
+            download_url,
+            request_kwargs_base,
+            segments,
+            range_file,
+            sidecar,
+            update_progress,
+            cancel_event.is_set,
+        )
+        for _ in range(worker_count)
+    ]
     try:
         for future in as_completed(futures):
             future.result()
-    except KeyboardInterrupt:
+    except BaseException:
         cancel_event.set()
+        segments.close()
         for future in futures:
             future.cancel()
-        executor.shutdown(wait=False)
         raise
     finally:
         executor.shutdown(wait=True)
+        range_file.close()
 
     if pbar:
         pbar.finish()
 
 
-def _determine_parallel_workers(total):
+# pylint: disable=too-many-arguments
+def _fetch_segments(
+    session,
+    download_url,
+    request_kwargs_base,
+    segments,
+    range_file,
+    sidecar,
+    transferred,
+    cancelled,
+    connection=contextlib.nullcontext,
+):
+    """Fetch segments of a file from the queue until none are left
+
+    Args:
+        session (requests.Session): Session the requests are sent with
+        download_url (PresignedUrl): URL of the object to download
+        request_kwargs_base (dict): Common keyword arguments for `Session.get`
+        segments (SegmentQueue): Segments of the file
+        range_file (_RangeFile): Temporary file the segments are written to
+        sidecar (RangeSidecar): Records the ranges that were written
+        transferred (callable): Called with the number of bytes written
+        cancelled (callable): Whether the download was cancelled
+        connection (callable): Context manager held during each request
+
+    Returns:
+        None
+
+    Raises:
+        DownloadCancelled: if the download was cancelled
+    """
+    while True:
+        segment = segments.next()
+        if segment is None:
+            return
+        try:
+            with connection():
+                _fetch_segment(
+                    session,
+                    download_url,
+                    request_kwargs_base,
+                    segments,
+                    segment,
+                    range_file,
+                    transferred,
+                    cancelled,
+                )
+        except Exception:  # pylint: disable=broad-except
+            if cancelled() or not segments.covered(segment):
+                segments.close()
+                raise
+            echo_debug(
+                f"Ignoring failed request for bytes {segment.start}-{segment.end}, "
+                "they were downloaded by another request"
+            )
+        finally:
+            written = segments.finish(segment)
+            if sidecar and written:
+                sidecar.add_range(*written)
+
+
+# pylint: disable=too-many-arguments
+def _fetch_segment(
+    session,
+    download_url,
+    request_kwargs_base,
+    segments,
+    segment,
+    range_file,
+    transferred,
+    cancelled,
+):
+    """Fetch a segment and write it until its end, which may shrink"""
+    request_kwargs = {
+        **request_kwargs_base,
+        "headers": {"Range": f"bytes={segment.position}-{segment.end}"},
+    }
+    with _get(session, download_url, **request_kwargs) as resp:
+        resp.raise_for_status()
+        for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+            if cancelled():
+                raise DownloadCancelled
+            size = segments.allowed(segment, len(chunk))
+            if not size:
+                if chunk:
+                    # the rest of the segment was taken over by another request
+                    return
+                continue
+            range_file.write_at(memoryview(chunk)[:size], segment.position)
+            segments.advance(segment, size)
+            transferred(size)
+    if segment.remaining > 0:
+        raise requests.exceptions.ContentDecodingError(
+            f"Incomplete range download for bytes {segment.start}-{segment.end} "
+            f"(got {segment.position - segment.start})"
+        )
+
+
+def _get(session, download_url, **request_kwargs):
+    """Send a GET request, replacing the url if it was rejected as expired
+
+    Presigned urls are checked when a request starts, so a response that
+    is being streamed isn't cut off by the expiry of its url, and only
+    requests that get 403 are sent again.
+
+    Args:
+        session (requests.Session): Session the request is sent with
+        download_url (PresignedUrl): URL of the object to download
+        **request_kwargs: Keyword arguments for `Session.get`
+
+    Returns:
+        requests.Response: response to the last request
+    """
+    attempt = 0
+    while True:
+        url = download_url.current()
+        response = session.get(url, **request_kwargs)
+        if (
+            response.status_code != 403
+            or attempt == URL_REFRESH_ATTEMPTS
+            or not download_url.refresh(url)
+        ):
+            return response
+        response.close()
+        attempt += 1
+
+
+def _preallocate(file_path_tmp, total):
+    """Create the temporary file of a download with its full size
+
+    Disk space is allocated up front where the platform supports it, so
+    ranges written out of order don't leave a sparse, fragmented file.
+
+    Args:
+        file_path_tmp (str): Temporary file path used during download
+        total (int): Full size of the object in bytes
+
+    Returns:
+        None
+    """
+    with open(file_path_tmp, "wb") as tmp_file:
+        tmp_file.truncate(total)
+        if total and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(tmp_file.fileno(), 0, total)
+            except OSError as err:
+                echo_debug(f"Could not preallocate {file_path_tmp}: {err}")
+
+
+class _RangeFile:
+    """Temporary file of a download, written at offsets by range workers
+
+    All workers share one descriptor and write with `os.pwrite`, so ranges
+    neither reopen the file nor move a shared file position. Platforms
+    without `os.pwrite` seek and write under a lock.
+    """
+
+    def __init__(self, file_path_tmp):
+        self.file_descriptor = os.open(
+            file_path_tmp, os.O_WRONLY | getattr(os, "O_BINARY", 0)
+        )
+        self._lock = None if hasattr(os, "pwrite") else threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write_at(self, data, offset):
+        """Write all of data at offset
+
+        Args:
+            data (bytes): Data to write
+            offset (int): Position in the file
+
+        Returns:
+            None
+        """
+        view = memoryview(data)
+        while view:
+            if self._lock is None:
+                written = os.pwrite(self.file_descriptor, view, offset)
+            else:
+                with self._lock:
+                    os.lseek(self.file_descriptor, offset, os.SEEK_SET)
+                    written = os.write(self.file_descriptor, view)
+            view = view[written:]
+            offset += written
+
+    def close(self):
+        """Close the descriptor"""
+        if self.file_descriptor is not None:
+            os.close(self.file_descriptor)
+            self.file_descriptor = None
+
+
+def _determine_parallel_workers(total, max_workers=MAX_PARALLEL_DOWNLOADS):
     """Determine how many workers to use based on object size
 
     Args:
         total (int): Full size of the object in bytes
+        max_workers (int): Upper bound of the number of workers
 
     Returns:
         int: Number of workers to spawn
     """
     parts = max(1, (total + MIN_BYTES_PER_PART - 1) // MIN_BYTES_PER_PART)
-    return min(MAX_PARALLEL_DOWNLOADS, parts)
+    return min(max_workers, parts)
 
 
 def _build_ranges(total, worker_count):
@@ -512,6 +908,23 @@ def fatal_process_sample_error(err):
     return err.response.status_code not in [403, 500, 502, 503, 504]
 
 
+def is_sample_complete(sample):
+    """Whether a sample of a project listing has all it takes to download it.
+
+    Args:
+        sample (SampleDetails): sample of a project listing
+
+    Returns:
+        bool: True if the statuses and download urls of all files are listed
+    """
+    return bool(
+        sample.last_status
+        and sample.archive_last_status
+        and sample.files is not None
+        and all(sample_file.download_url for sample_file in sample.files)
+    )
+
+
 def get_download_template_format_params(client_id, gencove_id):
     """Return format parts for download template.
 
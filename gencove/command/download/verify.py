@@ -0,0 +1,95 @@
+"""Verification of downloaded files against their checksums."""
+import hashlib
+import threading
+
+from .constants import CHUNK_SIZE, HASH_POLL_INTERVAL
+from .exceptions import ChecksumMismatch
+
+
+def verify_checksum(file_path, file_hash, checksum_sha256):
+    """Check the hash of a downloaded file.
+
+    Args:
+        file_path (str): path the file is downloaded to
+        file_hash (TrailingHash or hashlib.sha256): hash of the data written,
+            None if the file isn't verified
+        checksum_sha256 (str): checksum of the deliverable
+
+    Raises:
+        ChecksumMismatch: if the file has another sha256
+    """
+    if file_hash and file_hash.hexdigest() != checksum_sha256:
+        # the temporary file is removed, there is no telling which ranges
+        # are wrong
+        raise ChecksumMismatch(
+            f"{file_path} doesn't match its checksum, downloading it again"
+        )
+
+
+class TrailingHash:
+    """sha256 of a file computed while its ranges are written.
+
+    A thread reads the file in order, up to the lowest offset that isn't
+    written yet, so hashing overlaps with the transfer and reads data that
+    was just written, from the page cache, instead of reading the whole
+    file again after the download.
+    """
+
+    def __init__(self, file_path_tmp):
+        self.file_path_tmp = file_path_tmp
+        self._hash = hashlib.sha256()
+        self._offset = 0
+        self._total = 0
+        self._written_until = None
+        self._finishing = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self, total, written_until):
+        """Start hashing in the background.
+
+        Args:
+            total (int): Full size of the file in bytes
+            written_until (callable): Called with `total`, returns the
+                offset below which every byte is written
+        """
+        self._total = total
+        self._written_until = written_until
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # unbuffered, a read ahead would get bytes that aren't written yet
+        with open(self.file_path_tmp, "rb", buffering=0) as tmp_file:
+            while self._offset < self._total and not self._stopped:
+                available = self._written_until(self._total) - self._offset
+                if available <= 0:
+                    if self._finishing.is_set():
+                        return
+                    self._finishing.wait(HASH_POLL_INTERVAL)
+                    continue
+                data = tmp_file.read(min(available, CHUNK_SIZE))
+                if not data:
+                    return
+                self._hash.update(data)
+                self._offset += len(data)
+
+    def stop(self):
+        """Stop hashing a download that failed."""
+        self._stopped = True
+        self._finishing.set()
+        if self._thread:
+            self._thread.join()
+
+    def hexdigest(self):
+        """Hex sha256 of the whole file, once all of it is written.
+
+        Returns:
+            str: hex digest, None if the file wasn't hashed to its end
+        """
+        self._finishing.set()
+        if self._thread:
+            self._thread.join()
+        if self._offset != self._total:
+            return None
+        return self._hash.hexdigest()
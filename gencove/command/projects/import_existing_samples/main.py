@@ -11,6 +11,7 @@ from .... import client
 from ....constants import IMPORT_BATCH_SIZE, SampleArchiveStatus, SampleStatus
 from ....exceptions import ValidationError
 from ....models import ProjectSamples, SampleDetails
+from ....pagination import paginate
 from ....utils import batchify
 
 
@@ -100,17 +101,10 @@ class ImportExistingSamples(Command):
         Yields:
             Samples in succeeded or failed_qc state that have files.
         """
-        more = True
-        next_link = None
-        while more:
-            self.echo_debug("Get all completed samples")
-            resp = self.get_samples(next_link)
-            if resp.results:
-                for sample in resp.results:
-                    if sample.last_status.status in ["failed qc", "succeeded"]:
-                        yield sample
-            next_link = resp.meta.next
-            more = next_link is not None
+        for samples in paginate(self.get_samples):
+            for sample in samples:
+                if sample.last_status.status in ["failed qc", "succeeded"]:
+                    yield sample
 
     @backoff.on_exception(
         backoff.expo,
@@ -120,6 +114,7 @@ class ImportExistingSamples(Command):
     )
     def get_samples(self, next_link=None) -> ProjectSamples:
         """Get all completed samples page."""
+        self.echo_debug("Get all completed samples")
         return self.api_client.get_project_samples(
             project_id=self.source_project_id,
             next_link=next_link,
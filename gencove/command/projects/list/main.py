@@ -6,6 +6,7 @@ from gencove.client import APIClientError, APIClientTimeout  # noqa: I100
 from gencove.command.base import Command
 from gencove.constants import HiddenStatus
 from gencove.models import Project
+from gencove.pagination import paginate
 
 from .utils import get_line
 
@@ -53,15 +54,7 @@ class List(Command):
         Yields:
             paginated lists of projects
         """
-        more = True
-        next_link = None
-        while more:
-            self.echo_debug("Get projects page")
-            resp = self.get_projects(next_link)
-
-            yield resp.results
-            next_link = resp.meta.next
-            more = next_link is not None
+        yield from paginate(self.get_projects)
 
     @backoff.on_exception(
         backoff.expo,
@@ -71,6 +64,7 @@ class List(Command):
     )
     def get_projects(self, next_link=None):
         """Get projects page."""
+        self.echo_debug("Get projects page")
         hidden_status = HiddenStatus.VISIBLE.value
         if self.include_hidden:
             hidden_status = HiddenStatus.ALL.value
@@ -5,11 +5,11 @@ import json
 import backoff
 
 from ...base import Command
-from ...utils import is_valid_json
+from ...utils import BatchAssigner, is_valid_json
 from .... import client
-from ....constants import ASSIGN_BATCH_SIZE, UPLOAD_PREFIX
+from ....constants import UPLOAD_PREFIX
 from ....exceptions import ValidationError
-from ....utils import batchify
+from ....pagination import get_sample_sheet_key, paginate
 
 
 class RunPrefix(Command):
@@ -71,14 +71,7 @@ class RunPrefix(Command):
         Yields:
             paginated lists of uploads
         """
-        more = True
-        next_link = None
-        while more:
-            self.echo_debug("Get sample sheet page")
-            resp = self._get_sample_sheet(next_link)
-            yield resp.results
-            next_link = resp.meta.next
-            more = next_link is not None
+        yield from paginate(self._get_sample_sheet, key=get_sample_sheet_key)
 
     @backoff.on_exception(
         backoff.expo,
@@ -88,6 +81,7 @@ class RunPrefix(Command):
     )
     def _get_sample_sheet(self, next_link=None):
         """Get sample sheet page."""
+        self.echo_debug("Get sample sheet page")
         return self.api_client.get_sample_sheet(
             gncv_path=self.prefix,
             assigned_status=self.status,
@@ -102,28 +96,29 @@ class RunPrefix(Command):
             if self.metadata_json is not None:
                 metadata = json.loads(self.metadata_json)
                 self.echo_info("Assigning metadata to the uploaded samples.")
-            assigned_count = 0
-            for samples_batch in batchify(samples, batch_size=ASSIGN_BATCH_SIZE):
-                try:
-                    samples_batch_len = len(samples_batch)
-                    self.echo_info(f"Assigning batch: {samples_batch_len}")
-                    self.api_client.add_samples_to_project(
-                        samples_batch, self.project_id, metadata
+            assigner = BatchAssigner(
+                self.api_client, self.project_id, metadata, scope=self.prefix
+            )
+            try:
+                assigner.assign(
+                    samples,
+                    lambda assigned: self.echo_info(
+                        "Total assigned: "
+                        f"{assigner.assigned_count + assigner.skipped_count}"
+                    ),
+                )
+            except client.APIClientError as err:
+                self.echo_debug(err)
+                self.echo_error("There was an error assigning/running samples.")
+                if assigner.assigned_count or assigner.skipped_count:
+                    self.echo_warning(
+                        "Some of the samples were assigned. "
+                        "Run the command again to assign "
+                        "the rest of the samples."
                     )
-                    assigned_count += samples_batch_len
-                    self.echo_info(f"Total assigned: {assigned_count}")
-                except client.APIClientError as err:
-                    self.echo_debug(err)
-                    self.echo_error("There was an error assigning/running samples.")
-                    if assigned_count > 0:
-                        self.echo_warning(
-                            "Some of the samples were assigned. "
-                            "Please use the Web UI to assign "
-                            "the rest of the samples."
-                        )
-                    else:
-                        self.echo_error("There was an error assigning samples.")
-                    raise
+                else:
+                    self.echo_error("There was an error assigning samples.")
+                raise
             self.echo_info("Assigned all samples to a project.")
 
         except client.APIClientError as err:
@@ -5,6 +5,7 @@ import backoff
 from gencove.client import APIClientError, APIClientTimeout  # noqa: I100
 from gencove.command.base import Command
 from gencove.constants import HiddenStatus
+from gencove.pagination import paginate
 
 from .utils import get_line
 
@@ -54,14 +55,7 @@ class ListSamples(Command):
         Yields:
             paginated lists of samples
         """
-        more = True
-        next_link = None
-        while more:
-            self.echo_debug("Get sample sheet page")
-            resp = self.get_samples(next_link)
-            yield resp.results
-            next_link = resp.meta.next
-            more = next_link is not None
+        yield from paginate(self.get_samples)
 
     @backoff.on_exception(
         backoff.expo,
@@ -71,6 +65,7 @@ class ListSamples(Command):
     )
     def get_samples(self, next_link=None):
         """Get sample sheet page."""
+        self.echo_debug("Get sample sheet page")
         hidden_status = HiddenStatus.VISIBLE.value
         if self.include_hidden:
             hidden_status = HiddenStatus.ALL.value
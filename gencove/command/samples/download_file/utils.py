@@ -3,9 +3,8 @@ import json
 
 from pydantic import HttpUrl
 
-import requests
-
 from gencove import client  # noqa: I100
+from gencove.command.download.session import get_session
 from gencove.logger import echo_debug, echo_warning  # noqa: I100
 from gencove.utils import get_progress_bar
 
@@ -41,7 +40,7 @@ def download_file(destination, download_url, no_progress=False):
     )
     stream_params = dict(stream=True, allow_redirects=False, headers={}, timeout=30)
 
-    with requests.get(download_url, **stream_params) as req:
+    with get_session().get(download_url, **stream_params) as req:
         req.raise_for_status()
         echo_debug("Starting download")
 
@@ -4,7 +4,12 @@ import click
 from gencove.command.common_cli_options import add_options, common_options
 from gencove.constants import Credentials
 
-from .constants import UploadOptions
+from .constants import (
+    DEFAULT_PARALLEL_UPLOADS,
+    DEFAULT_URL_IMPORT_WORKERS,
+    MAX_PART_SIZE_MB,
+    UploadOptions,
+)
 from .main import Upload
 
 
@@ -40,7 +45,56 @@ from .main import Upload
         "Only compatible with --run-project-id."
     ),
 )
-def upload(  # pylint: disable=E0012,C0330,R0913
+@click.option(
+    "--parallel-uploads",
+    type=click.IntRange(min=1),
+    default=DEFAULT_PARALLEL_UPLOADS,
+    show_default=True,
+    help="Number of files that are uploaded at the same time.",
+)
+@click.option(
+    "--url-import-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_URL_IMPORT_WORKERS,
+    show_default=True,
+    help="Number of URL imports requested at the same time, for map files of URLs.",
+)
+@click.option(
+    "--checksum-manifest",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help=(
+        "File where the sha256 of every uploaded file is appended. "
+        "Defaults to ~/.gencove/upload-checksums.jsonl"
+    ),
+)
+@click.option(
+    "--part-size",
+    type=click.IntRange(min=5, max=MAX_PART_SIZE_MB),
+    default=None,
+    help=(
+        "Size of the parts, in MB, that large files are split into. "
+        "Chosen from the file size and the measured throughput by default."
+    ),
+)
+@click.option(
+    "--max-concurrency",
+    type=click.IntRange(min=1),
+    default=None,
+    help=(
+        "Number of parts sent at the same time, across all files. "
+        "Tuned from the measured throughput by default."
+    ),
+)
+@click.option(
+    "--validate-fastqs",
+    is_flag=True,
+    help=(
+        "Check that FASTQ files aren't corrupted or truncated and that R1 and "
+        "R2 files have the same number of reads, while uploading them."
+    ),
+)
+def upload(  # pylint: disable=E0012,C0330,R0913,R0914
     source,
     destination,
     host,
@@ -51,6 +105,12 @@ def upload(  # pylint: disable=E0012,C0330,R0913
     output,
     no_progress,
     metadata,
+    parallel_uploads,
+    url_import_workers,
+    checksum_manifest,
+    part_size,
+    max_concurrency,
+    validate_fastqs,
 ):  # noqa: D301
     """Upload FASTQ files to Gencove's system.
 
@@ -71,7 +131,17 @@ def upload(  # pylint: disable=E0012,C0330,R0913
         source,
         destination,
         Credentials(email=email, password=password, api_key=api_key),
-        UploadOptions(host=host, project_id=run_project_id, metadata=metadata),
+        UploadOptions(
+            host=host,
+            project_id=run_project_id,
+            metadata=metadata,
+            parallel_uploads=parallel_uploads,
+            url_import_workers=url_import_workers,
+            checksum_manifest=checksum_manifest,
+            part_size=part_size,
+            max_concurrency=max_concurrency,
+            validate_fastqs=validate_fastqs,
+        ),
         output,
         no_progress,
     ).run()
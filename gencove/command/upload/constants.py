@@ -5,6 +5,7 @@ from typing import Optional
 from pydantic import BaseModel  # pylint: disable=no-name-in-module
 
 from gencove.constants import Optionals  # noqa: I100
+from gencove.utils import MB
 
 # pylint: disable=invalid-name
 
@@ -26,6 +27,49 @@ class UploadStatuses(Enum):
 
 FASTQ_EXTENSIONS = (".fastq.gz", ".fastq.bgz", ".fq.gz", ".fq.bgz")
 
+# number of upload details fetched at the same time before uploading
+PREFLIGHT_WORKERS = 8
+# number of URL imports requested at the same time
+DEFAULT_URL_IMPORT_WORKERS = 8
+# number of files uploaded at the same time
+DEFAULT_PARALLEL_UPLOADS = 4
+# number of S3 requests in flight across all files being uploaded, when
+# it isn't tuned automatically
+UPLOAD_MAX_CONCURRENCY = 10
+# bounds of the automatically tuned number of S3 requests in flight
+AUTO_MIN_CONCURRENCY = 2
+AUTO_INITIAL_CONCURRENCY = 4
+AUTO_MAX_CONCURRENCY = 16
+# automatically chosen part sizes aim for this many parts per file, until
+# the throughput of part requests was measured
+AUTO_PART_COUNT = 64
+# once it was measured, parts are sized to take this many seconds to send
+AUTO_PART_SECONDS = 10
+# S3 minimum is 5 MB, except for the last part
+MIN_PART_SIZE = 8 * MB
+MAX_AUTO_PART_SIZE = 64 * MB
+# largest part size that can be requested, the S3 limit is 5 GB
+MAX_PART_SIZE_MB = 5 * 1024
+# size of the chunks read to checksum data sent in a single request
+HASH_CHUNK_SIZE = 1 * MB
+# directory, inside the local state directory, of the multipart upload journal
+UPLOAD_JOURNAL_DIR = "upload-journal"
+# file, inside the local state directory, where upload checksums are saved
+CHECKSUM_MANIFEST_FILE = "upload-checksums.jsonl"
+# number of processes validating FASTQ files, one per CPU by default
+VALIDATION_WORKERS = None
+# size of the decompressed chunks read while validating FASTQ files
+VALIDATION_CHUNK_SIZE = 1 * MB
+# S3 limit on the number of parts of a multipart upload
+MAX_UPLOAD_PARTS = 10000
+# seconds between sample sheet polls, doubled while no new samples show up
+SAMPLE_SHEET_POLL_DELAY = 1
+SAMPLE_SHEET_MAX_POLL_DELAY = 15
+# seconds spent waiting for the samples of the uploads before giving up
+SAMPLE_SHEET_MAX_WAIT = 300
+# when this few uploads are missing, only their paths are searched for
+SAMPLE_SHEET_SEARCH_LIMIT = 10
+
 
 # pylint: disable=too-few-public-methods
 class UploadOptions(Optionals):
@@ -33,6 +77,12 @@ class UploadOptions(Optionals):
 
     project_id: Optional[str] = None
     metadata: Optional[str] = None
+    parallel_uploads: int = DEFAULT_PARALLEL_UPLOADS
+    url_import_workers: int = DEFAULT_URL_IMPORT_WORKERS
+    checksum_manifest: Optional[str] = None
+    part_size: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    validate_fastqs: bool = False
 
 
 ASSIGN_ERROR = (
@@ -11,3 +11,7 @@ class UploadNotFound(Exception):
 
 class SampleSheetError(Exception):
     """Error to generate the sample sheet for uploads."""
+
+
+class FastqIntegrityError(Exception):
+    """FASTQ file is corrupted or truncated."""
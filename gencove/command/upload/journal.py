@@ -0,0 +1,110 @@
+"""On-disk journal of multipart uploads, used to resume interrupted uploads."""
+import hashlib
+import json
+import os
+import threading
+
+from gencove.logger import echo_debug
+from gencove.utils import get_local_state_dir
+
+from .constants import UPLOAD_JOURNAL_DIR
+
+
+class UploadJournal:
+    """Multipart upload state for each destination gncv path.
+
+    Every destination is saved in its own JSON file, named after a hash of
+    the gncv path, holding the multipart UploadId and the ETags of the parts
+    that were completed. Files are replaced atomically, so an interrupted
+    write leaves the previous state in place.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or get_local_state_dir(UPLOAD_JOURNAL_DIR)
+        self._lock = threading.Lock()
+
+    def entry(self, gncv_path):
+        """Return the journal entry of a destination.
+
+        Args:
+            gncv_path (str): destination of the upload
+
+        Returns:
+            JournalEntry: entry bound to this journal
+        """
+        return JournalEntry(self, gncv_path)
+
+    def _file_path(self, gncv_path):
+        digest = hashlib.sha256(gncv_path.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, f"{digest}.json")
+
+    def load(self, gncv_path):
+        """Load the saved state of a destination, None if there is none."""
+        try:
+            with open(self._file_path(gncv_path), encoding="utf-8") as journal_file:
+                state = json.load(journal_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as err:
+            echo_debug(f"Ignoring unreadable upload journal for {gncv_path}: {err}")
+            return None
+        if state.get("gncv_path") != gncv_path:
+            return None
+        return state
+
+    def save(self, gncv_path, state):
+        """Replace the saved state of a destination."""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            file_path = self._file_path(gncv_path)
+            tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as journal_file:
+                json.dump(dict(state, gncv_path=gncv_path), journal_file)
+            os.replace(tmp_path, file_path)
+
+    def remove(self, gncv_path):
+        """Forget a destination, usually after its upload completed."""
+        with self._lock:
+            try:
+                os.remove(self._file_path(gncv_path))
+            except FileNotFoundError:
+                pass
+
+
+class JournalEntry:
+    """State of a single multipart upload, bound to its destination."""
+
+    def __init__(self, journal, gncv_path):
+        self.journal = journal
+        self.gncv_path = gncv_path
+        self.state = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the saved state, None if the destination has none."""
+        self.state = self.journal.load(self.gncv_path)
+        return self.state
+
+    def start(self, upload_id, source):
+        """Record a newly created multipart upload.
+
+        Args:
+            upload_id (str): S3 multipart UploadId
+            source (dict): description of the uploaded data, used to check
+                that a later run uploads the same data to the same object
+        """
+        with self._lock:
+            self.state = {"upload_id": upload_id, "source": source, "parts": {}}
+            self.journal.save(self.gncv_path, self.state)
+
+    def add_part(self, part_number, etag):
+        """Record a completed part."""
+        with self._lock:
+            self.state["parts"][str(part_number)] = etag
+            self.journal.save(self.gncv_path, self.state)
+
+    def remove(self):
+        """Forget the upload."""
+        with self._lock:
+            self.state = None
+            self.journal.remove(self.gncv_path)
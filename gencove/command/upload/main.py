@@ -3,6 +3,7 @@ import datetime
 import json
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from time import sleep
 
 import backoff
@@ -10,11 +11,15 @@ import backoff
 from gencove.client import (  # noqa: I100
     APIClientError,
     APIClientTimeout,
-    APIClientTooManyRequestsError,
     CustomEncoder,
 )
 from gencove.command.base import Command
-from gencove.command.utils import is_valid_uuid
+from gencove.command.utils import (
+    BatchAssigner,
+    TooManyRequestsThrottle,
+    is_valid_uuid,
+    sample_upload_ids,
+)
 from gencove.constants import (
     FASTQ_MAP_EXTENSION,
     SampleAssignmentStatus,
@@ -22,7 +27,7 @@ from gencove.constants import (
 )
 from gencove.exceptions import ValidationError
 from gencove.utils import (
-    batchify,
+    MB,
     get_regular_progress_bar,
     get_s3_client_refreshable,
 )
@@ -30,11 +35,18 @@ from gencove.utils import (
 from .constants import (
     ASSIGN_ERROR,
     FASTQ_EXTENSIONS,
+    PREFLIGHT_WORKERS,
+    SAMPLE_SHEET_MAX_POLL_DELAY,
+    SAMPLE_SHEET_MAX_WAIT,
+    SAMPLE_SHEET_POLL_DELAY,
+    SAMPLE_SHEET_SEARCH_LIMIT,
     TMP_UPLOADS_WARNING,
     UploadStatuses,
 )
 from .exceptions import SampleSheetError, UploadError, UploadNotFound
-from .multi_file_reader import MultiFileReader
+from .journal import UploadJournal
+from .manifest import ChecksumManifest
+from .scheduler import UploadScheduler
 from .utils import (
     get_filename_from_path,
     get_get_upload_details_retry_predicate,
@@ -48,8 +60,8 @@ from .utils import (
     upload_file,
     upload_multi_file,
 )
+from .validation import FastqValidator, get_pair
 from ..utils import is_valid_json
-from ...constants import ASSIGN_BATCH_SIZE
 
 try:
     utc_tz = datetime.UTC  # Python 3.11+ only
@@ -57,7 +69,7 @@ except AttributeError:
     utc_tz = datetime.timezone.utc  # fallback for older Python versions
 
 
-# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-instance-attributes,too-many-public-methods
 class Upload(Command):
     """Upload command executor."""
 
@@ -69,11 +81,19 @@ class Upload(Command):
         self.project_id = options.project_id
         self.fastqs = []
         self.fastqs_map = {}
-        self.upload_ids = set()
+        self.upload_ids = {}
         self.output = output
         self.assigned_samples = []
         self.no_progress = no_progress
         self.metadata = options.metadata
+        self.parallel_uploads = options.parallel_uploads
+        self.url_import_workers = options.url_import_workers
+        self.part_size = options.part_size * MB if options.part_size else None
+        self.max_concurrency = options.max_concurrency
+        self.validate_fastqs = options.validate_fastqs
+        self.journal = UploadJournal()
+        self.throttle = TooManyRequestsThrottle()
+        self.manifest = ChecksumManifest(options.checksum_manifest)
 
     @staticmethod
     def generate_gncv_destination(fastq_source: str = "cli"):
@@ -179,36 +199,222 @@ class Upload(Command):
         elif self.fastqs_map:
             self.upload_from_map_file(s3_client)
 
+        if self.manifest.recorded:
+            self.echo_info(f"Checksums of uploaded files saved to {self.manifest.path}")
         self.echo_debug(f"Upload ids are now: {self.upload_ids}")
         if self.project_id:
-            self.echo_debug("Cooling down period.")
-            sleep(10)
             self.assign_uploads_to_project()
             if self.output:
                 self.output_list()
 
     def upload_from_source(self, s3_client):
         """Upload command with <source> argument provided."""
-        for file_path in self.fastqs:
-            upload = self.upload_from_file_path(file_path, s3_client)
-            if self.project_id and upload:
-                self.upload_ids.add(upload.id)
+        clean_file_paths = [
+            get_filename_from_path(file_path, self.source) for file_path in self.fastqs
+        ]
+        uploads = self.preflight(
+            [self.destination + clean_file_path for clean_file_path in clean_file_paths]
+        )
+
+        jobs = []
+        for file_path, clean_file_path, upload_details in zip(
+            self.fastqs, clean_file_paths, uploads
+        ):
+            if self.project_id:
+                self.upload_ids[upload_details.id] = self.destination + clean_file_path
+            if self.is_uploaded(upload_details):
+                self.echo_info(f"File was already uploaded: {clean_file_path}")
+                continue
+            jobs.append(
+                ((file_path, upload_details), os.path.getsize(file_path), file_path)
+            )
+
+        def upload_job(job, transfer_kwargs):
+            file_path, upload_details = job
+            return self.upload_from_file_path(
+                file_path, s3_client, transfer_kwargs, upload_details
+            )
+
+        self.run_uploads(
+            upload_job,
+            jobs,
+            [
+                (clean_file_path, [file_path], get_pair(clean_file_path))
+                for file_path, clean_file_path in zip(self.fastqs, clean_file_paths)
+            ],
+        )
 
         self.echo_info("All files were successfully uploaded.")
 
     def upload_from_map_file(self, s3_client):
         """Upload fastq files from a csv file."""
+        url_keys = []
+        local_keys = []
         for key, fastqs in self.fastqs_map.items():
             if all((looks_like_url(f) for f in fastqs)):
-                upload = self.post_fastq_url(key, fastqs)
+                url_keys.append(key)
             else:
-                upload = self.concatenate_and_upload_fastqs(key, fastqs, s3_client)
+                local_keys.append(key)
 
+        uploads = self.import_urls(url_keys)
+        local_uploads = self.preflight(
+            [self.destination + get_gncv_path(*key) for key in local_keys]
+        )
+        uploads.extend(local_uploads)
+        local_jobs = []
+        for key, upload_details in zip(local_keys, local_uploads):
+            if self.is_uploaded(upload_details):
+                self.echo_info(
+                    f"File was already uploaded: {self.destination}"
+                    f"{get_gncv_path(*key)}"
+                )
+                continue
+            fastqs = self.fastqs_map[key]
+            local_jobs.append(
+                (
+                    (key, fastqs, upload_details),
+                    sum(os.path.getsize(fastq) for fastq in fastqs),
+                    get_gncv_path(*key),
+                )
+            )
+
+        def upload_job(job, transfer_kwargs):
+            key, fastqs, upload_details = job
+            return self.concatenate_and_upload_fastqs(
+                key, fastqs, s3_client, transfer_kwargs, upload_details
+            )
+
+        self.run_uploads(
+            upload_job,
+            local_jobs,
+            [(get_gncv_path(*key), self.fastqs_map[key], key) for key in local_keys],
+        )
+        for key, upload in zip(url_keys + local_keys, uploads):
             if self.project_id and upload:
-                self.upload_ids.add(upload.id)
+                self.upload_ids[upload.id] = self.destination + get_gncv_path(*key)
 
         self.echo_info("All files were successfully processed.")
 
+    def preflight(self, gncv_paths):
+        """Get upload details of all destinations before any data is sent.
+
+        Lookups run concurrently in a bounded worker pool, and all of them
+        pause when the API answers with 429.
+
+        Args:
+            gncv_paths (list of str): destinations of the uploads
+
+        Returns:
+            list of UploadsPostData: upload details, in the order of gncv_paths
+        """
+        if not gncv_paths:
+            return []
+        self.echo_info(f"Checking upload status of {len(gncv_paths)} files")
+        workers = min(PREFLIGHT_WORKERS, len(gncv_paths))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.fetch_upload_details, gncv_path)
+                for gncv_path in gncv_paths
+            ]
+            try:
+                uploads = [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        uploaded = sum(self.is_uploaded(upload) for upload in uploads)
+        if uploaded:
+            self.echo_info(f"{uploaded} of {len(uploads)} files were already uploaded")
+        return uploads
+
+    @staticmethod
+    def is_uploaded(upload_details):
+        """Whether the upload already succeeded."""
+        return bool(
+            upload_details.last_status
+            and upload_details.last_status.status == UploadStatuses.DONE.value
+        )
+
+    def run_uploads(self, upload_job, jobs, validations):
+        """Upload jobs, validating the FASTQ files at the same time if asked.
+
+        Validation runs on a process pool alongside the uploads. Uploads that
+        haven't started yet are skipped once a file fails validation, and
+        the command fails before anything is assigned to a project.
+
+        Args:
+            upload_job (callable): passed on to `UploadScheduler.run`
+            jobs (list): passed on to `UploadScheduler.run`
+            validations (list of tuple): `(label, paths, pair)` of every
+                upload, passed on to `FastqValidator.start`
+
+        Returns:
+            list: results of upload_job, in the order of jobs
+        """
+        scheduler = UploadScheduler(
+            self.parallel_uploads, self.no_progress, self.max_concurrency
+        )
+        if not self.validate_fastqs:
+            return scheduler.run(upload_job, jobs)
+
+        validator = FastqValidator()
+        validator.start(validations)
+
+        def validated_upload_job(job, transfer_kwargs):
+            validator.check()
+            return upload_job(job, transfer_kwargs)
+
+        try:
+            results = scheduler.run(validated_upload_job, jobs)
+            validator.wait()
+        finally:
+            validator.shutdown()
+        return results
+
+    def import_urls(self, keys):
+        """Request the imports of the FASTQ URLs of a map file.
+
+        Imports are requested concurrently in a bounded worker pool, and all
+        of them pause when the API answers with 429. A failed import doesn't
+        stop the others; every result is listed in a table of upload ids
+        once all of them are done.
+
+        Args:
+            keys (list of tuple): client id and R notation of the samples
+
+        Returns:
+            list of UploadURLImport: import details, in the order of keys
+
+        Raises:
+            UploadError: if any of the imports failed
+        """
+        if not keys:
+            return []
+        self.echo_info(f"Importing {len(keys)} files from URLs")
+        workers = min(self.url_import_workers, len(keys))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.post_fastq_url, key, self.fastqs_map[key])
+                for key in keys
+            ]
+            try:
+                errors = [future.exception() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        self.echo_info("client_id\tr_notation\tupload_id")
+        for (client_id, r_notation), future, error in zip(keys, futures, errors):
+            result = f"failed: {error}" if error else future.result().id
+            self.echo_info(f"{client_id}\t{r_notation}\t{result}")
+
+        failed = sum(1 for error in errors if error)
+        if failed:
+            self.echo_error(f"{failed} of {len(keys)} URL imports failed")
+            raise UploadError
+        return [future.result() for future in futures]
+
     @backoff.on_exception(
         backoff.expo,
         APIClientError,
@@ -221,14 +427,31 @@ class Upload(Command):
         client_id, r_notation = key
         gncv_path = self.destination + get_gncv_path(client_id, r_notation)
         self.echo_debug(f"Calculated gncv path: {gncv_path}")
-        upload_url_details = self.api_client.import_fastqs_from_url(
+        upload_url_details = self.throttle.call(
+            self.api_client.import_fastqs_from_url,
             gncv_file_path=gncv_path,
             url=next(iter(fastqs)),
         )
         return upload_url_details
 
-    def concatenate_and_upload_fastqs(self, key, fastqs, s3_client):
-        """Upload fastqs parts as one file."""
+    # pylint: disable=too-many-arguments
+    def concatenate_and_upload_fastqs(
+        self, key, fastqs, s3_client, transfer_kwargs=None, upload_details=None
+    ):
+        """Upload fastqs parts as one file.
+
+        Args:
+            key (tuple): client id and R notation of the sample
+            fastqs (list of str): local paths of the parts
+            s3_client (boto3 s3 client): instantiated boto3 S3 client.
+            transfer_kwargs (dict): options for the transfer, provided by
+                UploadScheduler.
+            upload_details (UploadsPostData): details from the pre-flight,
+                fetched if not provided
+
+        Returns:
+            dict representing upload details
+        """
         client_id, r_notation = key
         self.echo_debug(
             f"Uploading fastq. client_id={client_id} r_notation={r_notation}"
@@ -238,31 +461,38 @@ class Upload(Command):
         gncv_path = self.destination + get_gncv_path(client_id, r_notation)
         self.echo_debug(f"Calculated gncv path: {gncv_path}")
 
-        upload_details = self.get_upload_details(gncv_path)
-
-        if (
-            upload_details.last_status
-            and upload_details.last_status.status == UploadStatuses.DONE.value
-        ):
-            self.echo_info(f"File was already uploaded: {gncv_path}")
-            return upload_details
+        if upload_details is None:
+            upload_details = self.fetch_upload_details(gncv_path)
+            if self.is_uploaded(upload_details):
+                self.echo_info(f"File was already uploaded: {gncv_path}")
+                return upload_details
 
         self.echo_info(f"Uploading to {gncv_path}")
         upload_multi_file(
             s3_client,
-            MultiFileReader(fastqs),
+            fastqs,
             upload_details.s3.bucket,
             upload_details.s3.object_name,
-            self.no_progress,
+            journal_entry=self.journal.entry(gncv_path),
+            manifest=self.manifest,
+            part_size=self.part_size,
+            max_concurrency=self.max_concurrency,
+            **(transfer_kwargs or {"no_progress": self.no_progress}),
         )
         return upload_details
 
-    def upload_from_file_path(self, file_path, s3_client):
+    def upload_from_file_path(
+        self, file_path, s3_client, transfer_kwargs=None, upload_details=None
+    ):
         """Prepare file and upload, if it wasn't uploaded yet.
 
         Args:
             file_path (str): a local system path to a file to be uploaded.
             s3_client (boto3 s3 client): instantiated boto3 S3 client.
+            transfer_kwargs (dict): options for the transfer, provided by
+                UploadScheduler.
+            upload_details (UploadsPostData): details from the pre-flight,
+                fetched if not provided
 
         Returns:
             dict representing upload details
@@ -271,22 +501,12 @@ class Upload(Command):
         self.echo_debug(f"Uploading clean file path: {clean_file_path}")
         gncv_notated_path = self.destination + clean_file_path
 
-        self.echo_info(f"Checking if file was already uploaded: {clean_file_path}")
-
-        try:
-            upload_details = self.get_upload_details(gncv_notated_path)
-        except APIClientError as err:
-            if err.status_code == 400:
-                self.echo_info(err.message)
-                raise UploadError  # pylint: disable=W0707
-            raise err
-
-        if (
-            upload_details.last_status
-            and upload_details.last_status.status == UploadStatuses.DONE.value
-        ):
-            self.echo_info(f"File was already uploaded: {clean_file_path}")
-            return upload_details
+        if upload_details is None:
+            self.echo_info(f"Checking if file was already uploaded: {clean_file_path}")
+            upload_details = self.fetch_upload_details(gncv_notated_path)
+            if self.is_uploaded(upload_details):
+                self.echo_info(f"File was already uploaded: {clean_file_path}")
+                return upload_details
 
         self.echo_info(f"Uploading {file_path} to {gncv_notated_path}")
         upload_file(
@@ -294,10 +514,28 @@ class Upload(Command):
             file_name=file_path,
             bucket=upload_details.s3.bucket,
             object_name=upload_details.s3.object_name,
-            no_progress=self.no_progress,
+            journal_entry=self.journal.entry(gncv_notated_path),
+            manifest=self.manifest,
+            part_size=self.part_size,
+            max_concurrency=self.max_concurrency,
+            **(transfer_kwargs or {"no_progress": self.no_progress}),
         )
         return upload_details
 
+    def fetch_upload_details(self, gncv_path):
+        """Get upload details, turning a rejected destination into an error.
+
+        Raises:
+            UploadError: if the API rejects the destination.
+        """
+        try:
+            return self.get_upload_details(gncv_path)
+        except APIClientError as err:
+            if err.status_code == 400:
+                self.echo_info(err.message)
+                raise UploadError  # pylint: disable=W0707
+            raise err
+
     @backoff.on_predicate(
         backoff.expo, get_get_upload_details_retry_predicate, max_tries=10
     )
@@ -307,22 +545,44 @@ class Upload(Command):
         max_tries=10,
         giveup=get_upload_details_give_up_predicate,
     )
-    @backoff.on_exception(backoff.expo, APIClientTooManyRequestsError, max_tries=20)
     def get_upload_details(self, gncv_path):
         """Get upload details with retry for last status update."""
-        return self.api_client.get_upload_details(gncv_path)
+        return self.throttle.call(self.api_client.get_upload_details, gncv_path)
 
     def assign_uploads_to_project(self):
         """Assign uploads to a project and trigger a run."""
         self.echo_info(f"Assigning uploads to project {self.project_id}")
 
-        try:
-            samples = self.build_samples(self.upload_ids)
-        except (UploadError, SampleSheetError, UploadNotFound):
-            self.echo_warning(ASSIGN_ERROR.format(self.project_id, self.destination))
-            raise
+        metadata_api = None
+        if self.metadata is not None:
+            metadata_api = json.loads(self.metadata)
+        assigner = BatchAssigner(
+            self.api_client, self.project_id, metadata_api, scope=self.destination
+        )
+        # assigned uploads leave the unassigned sample sheet, so the ones a
+        # previous run assigned are not waited for
+        done_uploads = assigner.resume(self.upload_ids)
+        if done_uploads:
+            self.echo_info(
+                f"Skipping {len(done_uploads)} uploads assigned by a previous run"
+            )
+        uploads = {
+            upload: gncv_path
+            for upload, gncv_path in self.upload_ids.items()
+            if str(upload) not in done_uploads
+        }
 
-        if not samples:
+        samples = []
+        if uploads:
+            try:
+                samples = self.build_samples(uploads)
+            except (UploadError, SampleSheetError, UploadNotFound):
+                self.echo_warning(
+                    ASSIGN_ERROR.format(self.project_id, self.destination)
+                )
+                raise
+
+        if not samples and not done_uploads:
             self.echo_debug("No related samples were found")
             self.echo_warning(ASSIGN_ERROR.format(self.project_id, self.destination))
             raise UploadError
@@ -331,106 +591,129 @@ class Upload(Command):
 
         self.echo_debug(f"Assigning samples to project ({self.project_id})")
 
-        assigned_count = 0
+        callback = None
         if not self.no_progress:
             progress_bar = get_regular_progress_bar(len(samples), "Assigning: ")
             progress_bar.start()
-        for samples_batch in batchify(samples, batch_size=ASSIGN_BATCH_SIZE):
-            try:
-                samples_batch_len = len(samples_batch)
-                self.echo_debug(f"Assigning batch: {samples_batch_len}")
-                metadata_api = None
-                if self.metadata is not None:
-                    metadata_api = json.loads(self.metadata)
-                assigned_batch = self.api_client.add_samples_to_project(
-                    samples_batch, self.project_id, metadata_api
+            callback = progress_bar.update
+        try:
+            self.assigned_samples = assigner.assign(samples, callback)
+        except APIClientError as err:
+            self.echo_debug(err)
+            self.echo_warning("There was an error assigning/running samples.")
+            if assigner.assigned_count or done_uploads:
+                self.echo_warning(
+                    "Some of the samples were assigned. "
+                    "Run the command again to assign "
+                    "the rest of the samples"
                 )
-                if assigned_batch.uploads:
-                    self.assigned_samples.extend(assigned_batch.uploads)
-                assigned_count += samples_batch_len
-                if not self.no_progress:
-                    progress_bar.update(samples_batch_len)
-                self.echo_debug(f"Total assigned: {assigned_count}")
-            except APIClientError as err:
-                self.echo_debug(err)
-                self.echo_warning("There was an error assigning/running samples.")
-                if assigned_count > 0:
-                    self.echo_warning(
-                        "Some of the samples were assigned. "
-                        "Please use the Web UI to assign "
-                        "the rest of the samples"
-                    )
-                else:
-                    self.echo_warning(
-                        ASSIGN_ERROR.format(self.project_id, self.destination)
-                    )
-                if not self.no_progress:
-                    progress_bar.finish()
-                raise
-        if not self.no_progress:
-            progress_bar.finish()
+            else:
+                self.echo_warning(
+                    ASSIGN_ERROR.format(self.project_id, self.destination)
+                )
+            raise
+        finally:
+            if not self.no_progress:
+                progress_bar.finish()
         self.echo_info("Assigned all samples to a project")
 
-    @backoff.on_exception(
-        backoff.expo, (SampleSheetError, UploadNotFound), max_time=300
-    )
     def build_samples(self, uploads):
         """Get samples for current uploads.
 
+        The sample sheet is polled until every upload belongs to a sample,
+        waiting longer between polls while no new samples show up. Matched
+        uploads are remembered, so a poll stops paging as soon as nothing is
+        missing, and once only a few uploads are missing just their paths
+        are searched for.
+
+        Args:
+            uploads (dict): gncv path of each upload id
+
         Returns:
             list of dict: a list of samples for the uploads.
+
+        Raises:
+            UploadError: if the sample sheet could not be fetched
+            UploadNotFound: if uploads are still paired with uploads of
+                another run when the wait is over
+            SampleSheetError: if uploads still have no sample when the wait
+                is over
         """
-        # make a copy of uploads so as not to change the input
-        search_uploads = uploads.copy()
+        missing = {str(upload): gncv_path for upload, gncv_path in uploads.items()}
         samples = []
-        for sample_sheet in self.sample_sheet_paginator():
-            if not sample_sheet:
-                self.echo_debug("Sample sheet returned empty.")
-                raise UploadError
-
-            for sample in sample_sheet:
-                self.echo_debug(f"Checking sample: {sample}")
-                add_it = False
-                if sample.fastq and sample.fastq.r1:
-                    if sample.fastq.r1.upload in search_uploads:
-                        add_it = True
-                        search_uploads.remove(sample.fastq.r1.upload)
-                        self.echo_debug(
-                            f"Found sample for upload r1: {sample.fastq.r1.upload}"
-                        )
-                    else:
-                        self.echo_debug(
-                            f"R1 upload not found. sample {sample} "
-                            f"uploads {search_uploads}"
-                        )
-                        raise UploadNotFound
-                if sample.fastq and sample.fastq.r2:
-                    if sample.fastq.r2.upload in search_uploads:
-                        add_it = True
-                        search_uploads.remove(sample.fastq.r2.upload)
-                        self.echo_debug(
-                            f"Found sample for upload r2: {sample.fastq.r2.upload}"
-                        )
-                    else:
-                        self.echo_debug(
-                            f"R2 upload not found. sample {sample} "
-                            f"uploads {search_uploads}"
-                        )
-                        raise UploadNotFound
+        delay = SAMPLE_SHEET_POLL_DELAY
+        waited = 0
+        while True:
+            found, mismatched = self.match_samples(missing, samples)
+            if not missing:
+                return samples
+            if waited >= SAMPLE_SHEET_MAX_WAIT:
+                break
+            if found:
+                delay = SAMPLE_SHEET_POLL_DELAY
+            self.echo_debug(
+                f"{len(missing)} uploads without samples, polling again in {delay}s"
+            )
+            sleep(delay)
+            waited += delay
+            delay = min(delay * 2, SAMPLE_SHEET_MAX_POLL_DELAY)
 
-                if add_it:
-                    samples.append(sample)
+        self.echo_warning(
+            f"No samples were found for {len(missing)} uploads after "
+            f"{waited}s: " + ", ".join(sorted(missing.values()))
+        )
+        if mismatched:
+            raise UploadNotFound
+        raise SampleSheetError
 
-        if search_uploads:
-            self.echo_debug(f"Have uploads without samples: {search_uploads}")
-            raise SampleSheetError
+    def match_samples(self, missing, samples):
+        """Poll the sample sheet once for the samples of missing uploads.
 
-        return samples
+        Args:
+            missing (dict): gncv path of each upload id without a sample,
+                matched uploads are removed from it
+            samples (list): samples found so far, new ones are appended
+
+        Returns:
+            tuple: number of samples found and number of samples that pair
+                a missing upload with an upload of another run
+        """
+        if len(missing) <= SAMPLE_SHEET_SEARCH_LIMIT:
+            searches = sorted(set(missing.values()))
+        else:
+            searches = [self.destination]
+        found = 0
+        mismatched = 0
+        for search in searches:
+            for sample_sheet in self.sample_sheet_paginator(search):
+                for sample in sample_sheet or []:
+                    fastq_uploads = sample_upload_ids(sample)
+                    matched = [upload for upload in fastq_uploads if upload in missing]
+                    if not matched:
+                        continue
+                    if len(matched) < len(fastq_uploads):
+                        self.echo_debug(
+                            f"Sample {sample} has uploads of another run, "
+                            f"missing uploads {set(missing)}"
+                        )
+                        mismatched += 1
+                        continue
+                    self.echo_debug(f"Found sample for uploads: {matched}")
+                    for upload in matched:
+                        del missing[upload]
+                    samples.append(sample)
+                    found += 1
+                    if not missing:
+                        return found, mismatched
+        return found, mismatched
 
     # duplicated in projects/run_prefix/main.py with the exception difference
-    def sample_sheet_paginator(self):
+    def sample_sheet_paginator(self, search=None):
         """Paginate over all sample sheets for the destination.
 
+        Args:
+            search (str): gncv path to search for, the destination by default
+
         Yields:
             paginated lists of samples
         """
@@ -439,7 +722,7 @@ class Upload(Command):
         while more:
             self.echo_debug("Get sample sheet page")
             try:
-                resp = self.get_sample_sheet(next_link)
+                resp = self.get_sample_sheet(next_link, search)
                 yield resp.results
                 next_link = resp.meta.next
                 more = next_link is not None
@@ -453,10 +736,10 @@ class Upload(Command):
         max_tries=5,
         max_time=30,
     )
-    def get_sample_sheet(self, next_link=None):
+    def get_sample_sheet(self, next_link=None, search=None):
         """Get samples by gncv path."""
         return self.api_client.get_sample_sheet(
-            self.destination,
+            search or self.destination,
             SampleAssignmentStatus.UNASSIGNED.value,
             next_link,
         )
@@ -0,0 +1,55 @@
+"""Manifest of the checksums of uploaded files."""
+import datetime
+import json
+import os
+import threading
+
+from gencove.utils import get_local_state_dir
+
+from .constants import CHECKSUM_MANIFEST_FILE
+
+
+# pylint: disable=too-few-public-methods
+class ChecksumManifest:
+    """JSON lines file with the digests computed while uploading.
+
+    Every completed upload appends one line holding the destination gncv
+    path, the uploaded files, the sha256 of the uploaded data and the MD5
+    of each part, as sent to S3 in the Content-MD5 header.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or get_local_state_dir(CHECKSUM_MANIFEST_FILE)
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    # pylint: disable=too-many-arguments
+    def record(self, gncv_path, files, size, sha256, part_size, parts_md5):
+        """Append the digests of a completed upload.
+
+        Args:
+            gncv_path (str): destination of the upload
+            files (list of str): uploaded files, in the order they were read
+            size (int): number of bytes uploaded
+            sha256 (str): hex sha256 of the uploaded data
+            part_size (int): size of each part but the last one
+            parts_md5 (list of str): hex MD5 of each part
+        """
+        line = json.dumps(
+            {
+                "gncv_path": gncv_path,
+                "files": [os.path.abspath(file_path) for file_path in files],
+                "size": size,
+                "sha256": sha256,
+                "part_size": part_size,
+                "parts_md5": parts_md5,
+                "uploaded": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            }
+        )
+        with self._lock:
+            dirname = os.path.dirname(self.path)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as manifest_file:
+                manifest_file.write(f"{line}\n")
+            self.recorded += 1
@@ -1,23 +1,61 @@
 """File like object that reads multiple files as if they are one file."""
+import bisect
 import os
+import queue
+import threading
 
+from gencove.utils import MB
 
-# pylint: disable=R0205
+# size of the buffers filled by the read-ahead thread
+READ_AHEAD_BUFFER_SIZE = 8 * MB
+# how many buffers the read-ahead thread may fill ahead of the reader
+READ_AHEAD_DEPTH = 4
+
+
+# pylint: disable=R0205,too-many-instance-attributes
 class MultiFileReader(object):
-    """File-like object that reads multi-files as if they are one file."""
+    """File-like object that reads multi-files as if they are one file.
+
+    Data is read straight into caller provided buffers with `readinto`, so
+    chunks are never built up by concatenation. The reader is seekable, which
+    lets S3 transfers retry a part from its own offset.
 
-    def __init__(self, files):
+    When `read_ahead` is set, a background thread reads the files ahead of
+    the consumer into a small pool of preallocated buffers, which overlaps
+    disk reads with network sends. Seeking away from the read-ahead position
+    discards the buffered data and restarts the thread at the new offset.
+    """
+
+    def __init__(
+        self,
+        files,
+        read_ahead=False,
+        buffer_size=READ_AHEAD_BUFFER_SIZE,
+        read_ahead_depth=READ_AHEAD_DEPTH,
+    ):
         if isinstance(files, str):
             self._files = (files,)
         else:
-            self._files = files
+            self._files = tuple(files)
 
         self._file = None
         self._file_idx = 0
         self._map_sizes = {
             file_path: os.path.getsize(file_path) for file_path in self._files
         }
-        self._read_files_offset = {file_path: 0 for file_path in self._files}
+        self._offsets = []
+        offset = 0
+        for file_path in self._files:
+            self._offsets.append(offset)
+            offset += self._map_sizes[file_path]
+        self._size = offset
+        self._position = 0
+        self._lock = threading.RLock()
+
+        self._read_ahead = read_ahead
+        self._buffer_size = buffer_size
+        self._read_ahead_depth = read_ahead_depth
+        self._prefetcher = None
 
     def __del__(self):
         self.close()
@@ -31,31 +69,36 @@ class MultiFileReader(object):
     def __iter__(self):  # pylint: disable=E0301
         return self
 
+    @property
+    def name(self):
+        """Name of the first file, used to describe the whole reader."""
+        return self._files[0] if self._files else ""
+
+    @property
+    def files(self):
+        """Paths of the files, in the order they are read."""
+        return self._files
+
     def close(self):
         """Close file and clear state."""
+        self._stop_prefetcher()
         if self._file:
             self._file.close()
             self._file = None
             self._file_idx = 0
 
     def nextfile(self):
-        """Get next file if there is one."""
-        prev_file = self._file
-        self._file = None
-        if prev_file:
-            prev_file.close()
-            self._file_idx += 1
-
-        try:
-            self._file = open(  # pylint: disable=consider-using-with
-                self._files[self._file_idx], "rb"
-            )
-        except IndexError:
-            pass
+        """Move to the beginning of the next file if there is one."""
+        with self._lock:
+            next_idx = self._file_index(self._position) + 1
+            if next_idx < len(self._files):
+                self.seek(self._offsets[next_idx])
+            else:
+                self.seek(self._size)
 
     def filename(self):
         """Returns filename of the current file."""
-        return self._file.name
+        return self._files[self._file_index(self._position)]
 
     def fileno(self):
         """Returns fileno of the current file."""
@@ -69,12 +112,78 @@ class MultiFileReader(object):
 
     def get_size(self):
         """Returns combined size of the files."""
-        return sum(self._map_sizes.values())
+        return self._size
+
+    @staticmethod
+    def readable():
+        """The reader can always be read from."""
+        return True
+
+    @staticmethod
+    def seekable():
+        """The reader supports random access via seek."""
+        return True
+
+    def tell(self):
+        """Returns current position in the combined files."""
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Change the position in the combined files.
+
+        Args:
+            offset (int): offset relative to whence
+            whence (int): os.SEEK_SET, os.SEEK_CUR or os.SEEK_END
+
+        Returns:
+            int: the new absolute position
+        """
+        with self._lock:
+            if whence == os.SEEK_SET:
+                position = offset
+            elif whence == os.SEEK_CUR:
+                position = self._position + offset
+            elif whence == os.SEEK_END:
+                position = self._size + offset
+            else:
+                raise ValueError(f"Invalid whence: {whence}")
+            if position < 0:
+                raise ValueError(f"Negative seek position {position}")
+            if position != self._position:
+                self._stop_prefetcher()
+            self._position = position
+            return position
+
+    def readinto(self, buffer):
+        """Read bytes into a pre-allocated, writable bytes-like object.
+
+        Args:
+            buffer (bytearray or memoryview): buffer to be filled
+
+        Returns:
+            int: number of bytes read, 0 at the end of the files
+        """
+        with self._lock:
+            view = memoryview(buffer).cast("B")
+            if self._read_ahead:
+                if not self._prefetcher:
+                    self._prefetcher = _ReadAhead(
+                        self._read_at,
+                        self._position,
+                        self._buffer_size,
+                        self._read_ahead_depth,
+                    )
+                length = self._prefetcher.readinto(view)
+            else:
+                length = self._read_at(self._position, view)
+            self._position += length
+            return length
 
     def read(self, size=None):
         """Read a chunk of the file.
 
-        If the size is not provided, will read all files at once.
+        If the size is not provided, will read the rest of the files at once.
+        Prefer `readinto` with a reused buffer for large chunks.
 
         Args:
             size (int): number of bytes to read
@@ -82,31 +191,132 @@ class MultiFileReader(object):
         Returns:
             bytes: the chunk
         """
-        if not size:
-            size = self.get_size()
-
-        buf = b""
-        while size > 0:
-            if not self._file and self._file_idx == len(self._files):
-                break
-
-            # pylint: disable=E0012,C0330
-            if (
-                not self._file
-                or self._read_files_offset[self._file.name]
-                == self._map_sizes[self._file.name]
-            ):
-                self.nextfile()
+        with self._lock:
+            remaining = max(0, self._size - self._position)
+            if size is None or size < 0:
+                size = remaining
+            size = min(size, remaining)
+            buf = bytearray(size)
+            length = self.readinto(buf)
+            if length < size:
+                del buf[length:]
+            return bytes(buf)
+
+    def _file_index(self, position):
+        """Index of the file containing the byte at position."""
+        return max(0, bisect.bisect_right(self._offsets, position) - 1)
+
+    def _open(self, file_idx):
+        """Make file_idx the currently opened file."""
+        if self._file and self._file_idx == file_idx:
+            return self._file
+        if self._file:
+            self._file.close()
+        self._file_idx = file_idx
+        self._file = open(  # pylint: disable=consider-using-with
+            self._files[file_idx], "rb"
+        )
+        return self._file
+
+    def _read_at(self, position, view):
+        """Fill view with the bytes starting at position.
+
+        Args:
+            position (int): absolute position in the combined files
+            view (memoryview): buffer to be filled
+
+        Returns:
+            int: number of bytes read
+        """
+        filled = 0
+        file_idx = self._file_index(position)
+        while filled < len(view) and file_idx < len(self._files):
+            file_path = self._files[file_idx]
+            file_position = position - self._offsets[file_idx]
+            unread = self._map_sizes[file_path] - file_position
+            if unread <= 0:
+                file_idx += 1
                 continue
 
-            unread = (
-                self._map_sizes[self._file.name]
-                - self._read_files_offset[self._file.name]
-            )
-            length = min(size, unread)
-            self._file.seek(self._read_files_offset[self._file.name])
-            buf += self._file.read(length)
-            size -= length
-            self._read_files_offset[self._file.name] += length
-
-        return buf
+            file_obj = self._open(file_idx)
+            if file_obj.tell() != file_position:
+                file_obj.seek(file_position)
+            end = filled + min(len(view) - filled, unread)
+            read = file_obj.readinto(view[filled:end])
+            if not read:
+                raise IOError(f"File {file_path} was truncated while reading it")
+            filled += read
+            position += read
+        return filled
+
+    def _stop_prefetcher(self):
+        if self._prefetcher:
+            self._prefetcher.close()
+            self._prefetcher = None
+
+
+class _ReadAhead:
+    """Background thread reading the combined files ahead of the consumer."""
+
+    _EOF = object()
+
+    def __init__(self, read_at, position, buffer_size, depth):
+        self._read_at = read_at
+        self._position = position
+        self._free = queue.Queue()
+        for _ in range(depth):
+            self._free.put(bytearray(buffer_size))
+        self._ready = queue.Queue()
+        self._stop = threading.Event()
+        self._current = None
+        self._current_offset = 0
+        self._current_length = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    buf = self._free.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                length = self._read_at(self._position, memoryview(buf))
+                self._position += length
+                self._ready.put((buf, length))
+                if not length:
+                    return
+        except Exception as err:  # pylint: disable=broad-except
+            self._ready.put(err)
+
+    def readinto(self, view):
+        """Copy buffered bytes into view, waiting for the thread if needed."""
+        filled = 0
+        while filled < len(view):
+            if self._current is None:
+                item = self._ready.get()
+                if isinstance(item, Exception):
+                    self._ready.put(item)
+                    raise item
+                self._current, self._current_length = item
+                self._current_offset = 0
+                if not self._current_length:
+                    # end of files, keep returning nothing
+                    self._ready.put(item)
+                    self._current = None
+                    break
+            start = self._current_offset
+            stop = min(self._current_length, start + len(view) - filled)
+            end = filled + stop - start
+            view[filled:end] = memoryview(self._current)[start:stop]
+            self._current_offset = stop
+            filled = end
+            if self._current_offset == self._current_length:
+                self._free.put(self._current)
+                self._current = None
+        return filled
+
+    def close(self):
+        """Stop the thread and drop the buffered data."""
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,534 @@
+"""Uploads that hash the data they send and can be resumed when interrupted."""
+import base64
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from boto3.s3.transfer import ProgressCallbackInvoker
+
+from botocore.exceptions import ClientError
+
+from s3transfer.utils import ReadFileChunk
+
+from gencove.logger import echo_debug, echo_info  # noqa: I100
+from gencove.tuning import ThroughputTuner
+from gencove.utils import MB
+
+from .constants import (
+    AUTO_INITIAL_CONCURRENCY,
+    AUTO_MAX_CONCURRENCY,
+    AUTO_MIN_CONCURRENCY,
+    AUTO_PART_COUNT,
+    AUTO_PART_SECONDS,
+    HASH_CHUNK_SIZE,
+    MAX_AUTO_PART_SIZE,
+    MAX_UPLOAD_PARTS,
+    MIN_PART_SIZE,
+)
+from .multi_file_reader import MultiFileReader
+
+
+def get_part_size(size, part_size=None, request_rate=None):
+    """Return the part size to use for an upload.
+
+    Args:
+        size (int): total number of bytes to upload
+        part_size (int): requested part size, chosen when not provided
+        request_rate (float): bytes per second a single part request was
+            measured to send, parts are sized to take `AUTO_PART_SECONDS`
+            at this rate when it is known, and from the size otherwise
+
+    Returns:
+        int: part size, grown if needed to stay within the S3 limit on the
+            number of parts
+    """
+    if part_size is None:
+        if request_rate:
+            part_size = int(request_rate * AUTO_PART_SECONDS)
+        else:
+            part_size = -(-size // AUTO_PART_COUNT)
+        part_size = min(max(part_size, MIN_PART_SIZE), MAX_AUTO_PART_SIZE)
+        part_size = -(-part_size // MB) * MB
+    return max(part_size, -(-size // MAX_UPLOAD_PARTS))
+
+
+def get_md5(data):
+    """MD5 of a part, sent as its Content-MD5.
+
+    The hash isn't used for security, which lets it work where MD5 is
+    otherwise disabled, like on FIPS systems.
+
+    Args:
+        data (bytes-like): data of the part
+
+    Returns:
+        hashlib MD5 object
+    """
+    try:
+        return hashlib.md5(data, usedforsecurity=False)
+    except TypeError:
+        # hashlib of interpreters built without usedforsecurity support
+        return hashlib.md5(data)  # nosec - S3 Content-MD5, not for security
+
+
+class BufferReader:
+    """Seekable file-like object over a buffer, so a part can be sent and
+    retried without copying all of it.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer)
+        self._position = 0
+
+    def read(self, size=-1):
+        """Read up to size bytes, the rest of the buffer by default."""
+        start = self._position
+        end = len(self._buffer)
+        if size is not None and size >= 0:
+            end = min(end, start + size)
+        self._position = max(start, end)
+        return self._buffer[start:end].tobytes()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Change the position in the buffer."""
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += len(self._buffer)
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self):
+        """Current position in the buffer."""
+        return self._position
+
+    def close(self):
+        """Nothing to close, the buffer belongs to a reservation."""
+
+
+# pylint: disable=too-many-instance-attributes
+class PartExecutor:
+    """Thread pool for part uploads that bounds the parts held in memory.
+
+    A part is read into memory before it is submitted, so `reserve` must be
+    called before reading it. A reservation owns a buffer from a pool that
+    the part is read into, and the buffer goes back to the pool once the
+    part upload finishes, which keeps at most `concurrency + 1` parts in
+    memory across all the uploads sharing the executor, without allocating
+    a new buffer for every part.
+
+    Unless `max_concurrency` is given, the number of parts in flight is
+    tuned from the throughput by a `ThroughputTuner`. The time every part
+    request takes is measured too, and `request_rate` is used to size the
+    parts of the uploads that start later.
+    """
+
+    def __init__(self, max_concurrency=None):
+        self.adaptive = max_concurrency is None
+        self._tuner = None
+        if self.adaptive:
+            self._tuner = ThroughputTuner(
+                AUTO_INITIAL_CONCURRENCY,
+                AUTO_MIN_CONCURRENCY,
+                AUTO_MAX_CONCURRENCY,
+                "Upload concurrency",
+            )
+            max_workers = AUTO_MAX_CONCURRENCY
+        else:
+            self._fixed_concurrency = max_workers = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._condition = threading.Condition()
+        self._reserved = 0
+        self._buffers = []
+        self._max_buffers = max_workers + 1
+        self.request_rate = None
+
+    def reserve(self, size):
+        """Wait until another part may be read into memory.
+
+        Args:
+            size (int): bytes of the part
+
+        Returns:
+            memoryview: buffer of `size` bytes the part is read into, owned
+                by the reservation until it is released
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._reserved < self.concurrency + 1)
+            self._reserved += 1
+            buffer = self._buffers.pop() if self._buffers else None
+        if buffer is None or len(buffer) < size:
+            buffer = bytearray(size)
+        return memoryview(buffer)[:size]
+
+    def release(self, buffer):
+        """Give back a reservation and its buffer, once the part is done.
+
+        Args:
+            buffer (memoryview): buffer returned by `reserve`
+        """
+        with self._condition:
+            self._reserved -= 1
+            if len(self._buffers) < self._max_buffers:
+                self._buffers.append(buffer.obj)
+            self._condition.notify_all()
+
+    def submit(self, func, buffer, *args):
+        """Run func in the pool and release the reservation when it's done.
+
+        Args:
+            func (callable): uploads the part
+            buffer (memoryview): buffer of the reservation, holding the
+                part, its size is used to measure throughput
+            args: passed on to func
+        """
+        future = self._executor.submit(self._run, func, len(buffer), *args)
+        future.add_done_callback(lambda _: self.release(buffer))
+        return future
+
+    def shutdown(self):
+        """Wait for running parts and drop the ones that haven't started."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, func, size, *args):
+        start = time.monotonic()
+        result = func(*args)
+        self._measure(size, time.monotonic() - start)
+        return result
+
+    @property
+    def concurrency(self):
+        """Number of parts sent at the same time."""
+        return self._tuner.value if self._tuner else self._fixed_concurrency
+
+    def _measure(self, size, elapsed):
+        with self._condition:
+            if elapsed > 0:
+                rate = size / elapsed
+                if self.request_rate is not None:
+                    # average that follows changes of the link quickly
+                    rate = (self.request_rate + rate) / 2
+                self.request_rate = rate
+            if self._tuner and self._tuner.transferred(size):
+                self._condition.notify_all()
+
+    def tune(self, rate):
+        """Adjust concurrency to the throughput of the last interval.
+
+        Args:
+            rate (float): bytes per second sent during the last interval
+        """
+        if self._tuner:
+            self._tuner.tune(rate)
+
+
+# pylint: disable=too-many-instance-attributes
+class ResumableUpload:
+    """Upload of one or more concatenated files to an S3 object.
+
+    The files are read once, sequentially. The same buffers feed the sha256
+    of the whole upload, the MD5 of every part, which is sent as Content-MD5
+    so S3 rejects corrupted parts, and the requests themselves.
+
+    Data that fits in one part is sent with a single PutObject. Larger data
+    is sent as a multipart upload whose UploadId and completed part ETags
+    are saved in the upload journal. When the same files are uploaded to the
+    same destination again, parts that S3 already has are only read for the
+    checksum and the missing ones are sent.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        s3_client,
+        files,
+        bucket,
+        object_name,
+        journal_entry,
+        part_size=None,
+        callback=None,
+        manifest=None,
+    ):
+        self.s3_client = s3_client
+        self.files = [files] if isinstance(files, str) else list(files)
+        self.bucket = bucket
+        self.object_name = object_name
+        self.journal_entry = journal_entry
+        self.callback = callback
+        self.manifest = manifest
+        self.size = sum(os.path.getsize(file_path) for file_path in self.files)
+        self.requested_part_size = part_size
+        self.part_size = get_part_size(self.size, part_size)
+        self.num_parts = max(1, -(-self.size // self.part_size))
+        self.upload_id = None
+        self.sha256 = None
+        self.parts_md5 = []
+
+    @property
+    def source(self):
+        """Description of the uploaded data, saved alongside the UploadId."""
+        return {
+            "files": [
+                [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns]
+                for file_path, stat in (
+                    (file_path, os.stat(file_path)) for file_path in self.files
+                )
+            ],
+            "bucket": self.bucket,
+            "object_name": self.object_name,
+            "part_size": self.part_size,
+        }
+
+    def run(self, part_executor=None, max_concurrency=None):
+        """Upload the data and record its checksums.
+
+        Args:
+            part_executor (PartExecutor): executor shared by concurrent
+                uploads, a private one is used if it is not provided
+            max_concurrency (int): number of parts uploaded at the same
+                time when a private executor is used, tuned automatically
+                when not provided
+        """
+        if self.requested_part_size is None:
+            self._adapt_part_size(part_executor)
+        sha256 = hashlib.sha256()
+        with MultiFileReader(self.files, read_ahead=True) as reader:
+            if self.num_parts == 1:
+                self._put_object(reader, sha256)
+            else:
+                self._upload_parts(reader, sha256, part_executor, max_concurrency)
+        self.sha256 = sha256.hexdigest()
+        if self.manifest:
+            self.manifest.record(
+                self.journal_entry.gncv_path,
+                self.files,
+                self.size,
+                self.sha256,
+                self.part_size,
+                self.parts_md5,
+            )
+
+    def _adapt_part_size(self, part_executor):
+        """Size the parts from the throughput measured by the executor.
+
+        An upload that can be resumed keeps the part size it started with,
+        so the parts S3 already has can be used.
+        """
+        state = self.journal_entry.load() or {}
+        started = state.get("source") or {}
+        if started.get("part_size") and started == dict(
+            self.source, part_size=started["part_size"]
+        ):
+            part_size = started["part_size"]
+        elif part_executor is not None and part_executor.request_rate:
+            part_size = get_part_size(
+                self.size, request_rate=part_executor.request_rate
+            )
+        else:
+            return
+        if part_size != self.part_size:
+            echo_debug(
+                f"Part size of {self.journal_entry.gncv_path}: "
+                f"{part_size / MB:.1f} MB"
+            )
+        self.part_size = part_size
+        self.num_parts = max(1, -(-self.size // self.part_size))
+
+    def _start(self):
+        """Resume the upload of a previous run or create a new one.
+
+        Returns:
+            dict: ETags of the parts S3 already has, by part number
+        """
+        uploaded = self._resume()
+        if self.upload_id is None:
+            self.upload_id = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.object_name
+            )["UploadId"]
+            self.journal_entry.start(self.upload_id, self.source)
+            echo_debug(f"Started multipart upload {self.upload_id}")
+        else:
+            echo_info(
+                f"Resuming upload to {self.journal_entry.gncv_path}: "
+                f"{len(uploaded)} of {self.num_parts} parts already uploaded"
+            )
+        return uploaded
+
+    # pylint: disable=too-many-locals
+    def _upload_parts(self, reader, sha256, part_executor, max_concurrency):
+        uploaded = self._start()
+        parts = {}
+        futures = {}
+        failed = threading.Event()
+        own_executor = None
+        if part_executor is None:
+            part_executor = own_executor = PartExecutor(max_concurrency)
+        try:
+            for part_number in range(1, self.num_parts + 1):
+                if failed.is_set():
+                    break
+                buffer = part_executor.reserve(self._part_range(part_number)[1])
+                try:
+                    part = self._read_part(reader, part_number, sha256, buffer)
+                except BaseException:
+                    part_executor.release(buffer)
+                    raise
+                if part_number in uploaded:
+                    part_executor.release(buffer)
+                    parts[part_number] = uploaded[part_number]
+                    if self.callback:
+                        self.callback(len(buffer))
+                    continue
+                future = part_executor.submit(
+                    self._upload_part, buffer, part_number, part
+                )
+                future.add_done_callback(
+                    lambda done: done.cancelled() or done.exception() and failed.set()
+                )
+                futures[future] = part_number
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in not_done:
+                future.cancel()
+            for future in done:
+                parts[futures[future]] = future.result()
+        finally:
+            if own_executor:
+                own_executor.shutdown()
+
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.object_name,
+            UploadId=self.upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"ETag": parts[part_number], "PartNumber": part_number}
+                    for part_number in sorted(parts)
+                ]
+            },
+        )
+        self.journal_entry.remove()
+
+    def _part_range(self, part_number):
+        start = (part_number - 1) * self.part_size
+        return start, min(self.part_size, self.size - start)
+
+    def _read_part(self, reader, part_number, sha256, buffer):
+        """Read the next part into a buffer and update the checksums with it.
+
+        Returns:
+            tuple: the buffer and the Content-MD5 of the part
+        """
+        length = self._part_range(part_number)[1]
+        data = buffer[:length]
+        if reader.readinto(data) != length:
+            raise IOError(f"Files {self.files} were truncated while reading them")
+        sha256.update(data)
+        md5 = get_md5(data)
+        self.parts_md5.append(md5.hexdigest())
+        return data, base64.b64encode(md5.digest()).decode("ascii")
+
+    def _body(self, data):
+        """Request body that reports the bytes sent to the callback."""
+        callbacks = None
+        if self.callback:
+            callbacks = [ProgressCallbackInvoker(self.callback).on_progress]
+        return ReadFileChunk(BufferReader(data), len(data), len(data), callbacks)
+
+    def _put_object(self, reader, sha256):
+        """Send the data with a single request, streamed from the files.
+
+        The files are read twice, once in small chunks for the checksums,
+        which must be known before the request is sent, and once by the
+        request itself, so the data is never held in memory as a whole.
+        """
+        md5 = get_md5(b"")
+        chunk = memoryview(bytearray(min(HASH_CHUNK_SIZE, max(self.size, 1))))
+        remaining = self.size
+        while remaining:
+            length = reader.readinto(chunk[: min(remaining, len(chunk))])
+            if not length:
+                raise IOError(f"Files {self.files} were truncated while reading them")
+            sha256.update(chunk[:length])
+            md5.update(chunk[:length])
+            remaining -= length
+        self.parts_md5.append(md5.hexdigest())
+        reader.seek(0)
+        callbacks = None
+        if self.callback:
+            callbacks = [ProgressCallbackInvoker(self.callback).on_progress]
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self.object_name,
+            ContentMD5=base64.b64encode(md5.digest()).decode("ascii"),
+            Body=ReadFileChunk(reader, self.size, self.size, callbacks),
+        )
+
+    def _resume(self):
+        """Find the upload of a previous run and the parts S3 already has.
+
+        Returns:
+            dict: ETags of usable parts by part number
+        """
+        state = self.journal_entry.load()
+        if not state:
+            return {}
+        if state.get("source") != self.source:
+            echo_debug(
+                f"Files for {self.journal_entry.gncv_path} changed since the "
+                "last upload attempt, starting over"
+            )
+            self._abort(state)
+            self.journal_entry.remove()
+            return {}
+        try:
+            listed = self._list_parts(state["upload_id"])
+        except ClientError as err:
+            echo_debug(f"Cannot resume upload {state['upload_id']}: {err}")
+            self.journal_entry.remove()
+            return {}
+        self.upload_id = state["upload_id"]
+        return {
+            part_number: etag
+            for part_number, (etag, size) in listed.items()
+            if part_number <= self.num_parts
+            and size == self._part_range(part_number)[1]
+        }
+
+    def _list_parts(self, upload_id):
+        parts = {}
+        kwargs = {"Bucket": self.bucket, "Key": self.object_name, "UploadId": upload_id}
+        while True:
+            response = self.s3_client.list_parts(**kwargs)
+            for part in response.get("Parts", []):
+                parts[part["PartNumber"]] = (part["ETag"], part["Size"])
+            if not response.get("IsTruncated"):
+                return parts
+            kwargs["PartNumberMarker"] = response["NextPartNumberMarker"]
+
+    def _abort(self, state):
+        """Abort an upload that can't be resumed, so S3 drops its parts."""
+        source = state.get("source") or {}
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=source.get("bucket", self.bucket),
+                Key=source.get("object_name", self.object_name),
+                UploadId=state["upload_id"],
+            )
+        except (ClientError, KeyError) as err:
+            echo_debug(f"Failed to abort previous multipart upload: {err}")
+
+    def _upload_part(self, part_number, part):
+        data, content_md5 = part
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.object_name,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            ContentMD5=content_md5,
+            Body=self._body(data),
+        )
+        self.journal_entry.add_part(part_number, response["ETag"])
+        echo_debug(f"Uploaded part {part_number} of {self.num_parts}")
+        return response["ETag"]
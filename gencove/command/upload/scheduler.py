@@ -0,0 +1,143 @@
+"""Scheduler that uploads several files at once."""
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from gencove.logger import echo_debug, echo_info
+from gencove.utils import get_progress_bar
+
+from .multipart import PartExecutor
+
+
+# pylint: disable=too-few-public-methods
+class UploadScheduler:
+    """Upload many files concurrently through one shared part executor.
+
+    Up to `parallel_uploads` files are in flight at any time, while the
+    shared part executor caps the number of concurrent S3 requests across
+    all of them at `max_concurrency`, or tunes it when that isn't set.
+    When more than one file is in flight, a single aggregate progress bar
+    replaces the per-file ones.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        parallel_uploads=1,
+        no_progress=False,
+        max_concurrency=None,
+    ):
+        self.parallel_uploads = max(1, parallel_uploads)
+        self.no_progress = no_progress
+        self.max_concurrency = max_concurrency
+        self._part_executor = None
+        self._progress_bar = None
+        self._progress = 0
+        self._lock = threading.Lock()
+
+    def run(self, upload_func, jobs):
+        """Run `upload_func` for every job.
+
+        Args:
+            upload_func (callable): called as `upload_func(job, transfer_kwargs)`
+                where `transfer_kwargs` must be passed on to `upload_file` or
+                `upload_multi_file`.
+            jobs (iterable): `(job, size, label)` tuples, where size is the
+                number of bytes the job is expected to upload and label is
+                used in status messages.
+
+        Returns:
+            list: results of `upload_func`, in the same order as `jobs`.
+        """
+        jobs = list(jobs)
+        workers = min(self.parallel_uploads, len(jobs))
+        if workers <= 1:
+            return [
+                upload_func(job, {"no_progress": self.no_progress})
+                for job, _, _ in jobs
+            ]
+
+        echo_debug(
+            f"Uploading {len(jobs)} files with {workers} parallel uploads "
+            f"and {self.max_concurrency or 'auto-tuned'} concurrent requests"
+        )
+        results = [None] * len(jobs)
+        cancel_event = threading.Event()
+        self._start(sum(size for _, size, _ in jobs))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(
+                        self._run_job, upload_func, job, size, label, cancel_event
+                    ): index
+                    for index, (job, size, label) in enumerate(jobs)
+                }
+                try:
+                    for finished, future in enumerate(as_completed(futures), 1):
+                        results[futures[future]] = future.result()
+                        echo_info(f"Finished {finished} of {len(jobs)} uploads")
+                except BaseException:
+                    # let running uploads finish, but don't start new ones
+                    cancel_event.set()
+                    raise
+        finally:
+            self._stop()
+        return results
+
+    # pylint: disable=too-many-arguments
+    def _run_job(self, upload_func, job, size, label, cancel_event):
+        """Upload a single job and account for its bytes in the progress."""
+        if cancel_event.is_set():
+            return None
+        transferred = _JobProgress(self._update_progress)
+        result = upload_func(
+            job,
+            {
+                "no_progress": True,
+                "part_executor": self._part_executor,
+                "callback": transferred.update,
+            },
+        )
+        # skipped or partially reported uploads still count as done
+        if size > transferred.value:
+            self._update_progress(size - transferred.value)
+        echo_debug(f"Upload job finished: {label}")
+        return result
+
+    def _start(self, total_size):
+        self._progress = 0
+        self._part_executor = PartExecutor(self.max_concurrency)
+        if not self.no_progress:
+            self._progress_bar = get_progress_bar(total_size, "Uploading: ")
+            self._progress_bar.start()
+
+    def _stop(self):
+        if self._part_executor:
+            self._part_executor.shutdown()
+            self._part_executor = None
+        if self._progress_bar:
+            self._progress_bar.finish()
+            self._progress_bar = None
+
+    def _update_progress(self, amount):
+        with self._lock:
+            self._progress += amount
+            if self._progress_bar:
+                self._progress_bar.update(
+                    min(self._progress, self._progress_bar.max_value)
+                )
+
+
+# pylint: disable=too-few-public-methods
+class _JobProgress:
+    """Bytes reported by the transfer of a single job."""
+
+    def __init__(self, forward):
+        self.value = 0
+        self._forward = forward
+        self._lock = threading.Lock()
+
+    def update(self, amount):
+        """Record transferred bytes and forward them to the aggregate."""
+        with self._lock:
+            self.value += amount
+        self._forward(amount)
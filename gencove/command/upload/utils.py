@@ -14,7 +14,7 @@ from botocore.exceptions import ClientError
 from gencove.client import APIClientError
 from gencove.exceptions import ValidationError
 from gencove.logger import echo_debug, echo_info
-from gencove.utils import CHUNK_SIZE, get_progress_bar
+from gencove.utils import get_progress_bar
 
 from .constants import (
     FASTQ_EXTENSIONS,
@@ -22,11 +22,25 @@ from .constants import (
     PATH_TEMPLATE,
     PathTemplateParts,
     R_NOTATION_MAP,
+    UPLOAD_MAX_CONCURRENCY,
 )
+from .multi_file_reader import MultiFileReader
+from .multipart import ResumableUpload, get_part_size
 
 
+# pylint: disable=too-many-arguments
 def upload_file(
-    s3_client, file_name, bucket, object_name=None, no_progress=False
+    s3_client,
+    file_name,
+    bucket,
+    object_name=None,
+    no_progress=False,
+    callback=None,
+    journal_entry=None,
+    part_executor=None,
+    manifest=None,
+    part_size=None,
+    max_concurrency=None,
 ):  # noqa: D413
     """Upload a file to an S3 bucket.
 
@@ -36,6 +50,17 @@ def upload_file(
         bucket (str): Bucket to upload to.
         object_name (str): S3 object name.
             If not specified then file_name is used
+        no_progress (bool): don't show progress bar
+        callback (callable): called with the number of bytes transferred
+        journal_entry (JournalEntry): upload journal entry of the destination,
+            when provided the data is checksummed while it is sent and large
+            uploads can be resumed
+        part_executor (PartExecutor): executor running the parts of multipart
+            uploads, shared when several files are uploaded at once
+        manifest (ChecksumManifest): where checksums of the data are saved
+        part_size (int): bytes per part, chosen from the size when not set
+        max_concurrency (int): parts sent at the same time, when not set it
+            is tuned from the measured throughput of journaled uploads
 
     Returns:
         True if file was uploaded, else False
@@ -46,23 +71,36 @@ def upload_file(
 
     # Upload the file
     try:
-        # Set desired multipart threshold value of 5GB
-        config = TransferConfig(
-            multipart_threshold=CHUNK_SIZE,
-            multipart_chunksize=CHUNK_SIZE,
-            use_threads=True,
-            max_concurrency=10,
-        )
         if not no_progress:
             progress_bar = get_progress_bar(os.path.getsize(file_name), "Uploading: ")
             progress_bar.start()
-        s3_client.upload_file(
-            file_name,
-            bucket,
-            object_name,
-            Config=config,
-            Callback=_progress_bar_update(progress_bar) if not no_progress else None,
-        )
+            callback = _progress_bar_update(progress_bar)
+        if journal_entry:
+            ResumableUpload(
+                s3_client,
+                file_name,
+                bucket,
+                object_name,
+                journal_entry,
+                part_size=part_size,
+                callback=callback,
+                manifest=manifest,
+            ).run(part_executor, max_concurrency)
+        else:
+            part_size = get_part_size(os.path.getsize(file_name), part_size)
+            config = TransferConfig(
+                multipart_threshold=part_size,
+                multipart_chunksize=part_size,
+                use_threads=True,
+                max_concurrency=max_concurrency or UPLOAD_MAX_CONCURRENCY,
+            )
+            s3_client.upload_file(
+                file_name,
+                bucket,
+                object_name,
+                Config=config,
+                Callback=callback,
+            )
         if not no_progress:
             progress_bar.finish()
     except ClientError as err:
@@ -71,54 +109,86 @@ def upload_file(
     return True
 
 
+# pylint: disable=too-many-arguments,too-many-locals
 def upload_multi_file(
     s3_client,
-    file_obj,
+    files,
     bucket,
     object_name=None,  # pylint: disable=E0012,C0330
     no_progress=False,
+    callback=None,
+    journal_entry=None,
+    part_executor=None,
+    manifest=None,
+    part_size=None,
+    max_concurrency=None,
 ):  # noqa: D413
     """Upload a file to an S3 bucket.
 
     Args:
         s3_client: Boto s3 client.
-        file_obj (MultiFileReader): File-like object with read() and
-            __iter__ methods
+        files (list of str): files uploaded one after the other as a
+            single object
         bucket (str): Bucket to upload to.
         object_name (str): S3 object name.
             If not specified then file_name is used
+        no_progress (bool): don't show progress bar
+        callback (callable): called with the number of bytes transferred
+        journal_entry (JournalEntry): upload journal entry of the destination,
+            when provided the data is checksummed while it is sent and large
+            uploads can be resumed
+        part_executor (PartExecutor): executor running the parts of multipart
+            uploads, shared when several files are uploaded at once
+        manifest (ChecksumManifest): where checksums of the data are saved
+        part_size (int): bytes per part, chosen from the size when not set
+        max_concurrency (int): parts sent at the same time, when not set it
+            is tuned from the measured throughput of journaled uploads
 
     Returns:
         True if file was uploaded, else False
     """
-    # If S3 object_name was not specified, use file_name
+    # If S3 object_name was not specified, use the first file name
     if object_name is None:
-        object_name = file_obj.name
+        object_name = files[0]
+    size = sum(os.path.getsize(file_name) for file_name in files)
 
     # Upload the file
     try:
-        # Set desired multipart threshold value of 5GB
-        config = TransferConfig(
-            multipart_threshold=CHUNK_SIZE,
-            multipart_chunksize=CHUNK_SIZE,
-            use_threads=True,
-            max_concurrency=10,
-        )
-
         if not no_progress:
-            progress_bar = get_progress_bar(file_obj.get_size(), "Uploading: ")
+            progress_bar = get_progress_bar(size, "Uploading: ")
             progress_bar.start()
-        s3_client.upload_fileobj(
-            file_obj,
-            bucket,
-            object_name,
-            Config=config,
-            Callback=_progress_bar_update(progress_bar) if not no_progress else None,
-        )
+            callback = _progress_bar_update(progress_bar)
+        if journal_entry:
+            ResumableUpload(
+                s3_client,
+                files,
+                bucket,
+                object_name,
+                journal_entry,
+                part_size=part_size,
+                callback=callback,
+                manifest=manifest,
+            ).run(part_executor, max_concurrency)
+        else:
+            part_size = get_part_size(size, part_size)
+            config = TransferConfig(
+                multipart_threshold=part_size,
+                multipart_chunksize=part_size,
+                use_threads=True,
+                max_concurrency=max_concurrency or UPLOAD_MAX_CONCURRENCY,
+            )
+            with MultiFileReader(files, read_ahead=True) as file_obj:
+                s3_client.upload_fileobj(
+                    file_obj,
+                    bucket,
+                    object_name,
+                    Config=config,
+                    Callback=callback,
+                )
         if not no_progress:
             progress_bar.finish()
     except ClientError as err:
-        echo_info(f"Failed to upload file {file_obj.name}: {err}")
+        echo_info(f"Failed to upload file {files[0]}: {err}")
         return False
     return True
 
@@ -0,0 +1,182 @@
+"""Integrity checks of FASTQ files, run on a process pool while uploading."""
+import gzip
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from gencove.exceptions import ValidationError
+from gencove.logger import echo_error, echo_info
+
+from .constants import VALIDATION_CHUNK_SIZE, VALIDATION_WORKERS
+from .exceptions import FastqIntegrityError
+
+# empty block that ends every complete BGZF file
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+# R notation of a file name, e.g. sample_R1.fastq.gz or sample_S1_R2_001.fq.gz
+PAIRED_FILE_NAME = re.compile(r"^(.+)_[Rr]([12])((?:_[^/]*)?\.f(?:ast)?q\.b?gz)$")
+
+
+def is_bgzf(path):
+    """Whether the file starts with a BGZF block header."""
+    with open(path, "rb") as fastq_file:
+        header = fastq_file.read(14)
+    return (
+        len(header) == 14
+        and header[:4] == b"\x1f\x8b\x08\x04"
+        and header[12:14] == b"BC"
+    )
+
+
+def count_reads(paths, chunk_size=VALIDATION_CHUNK_SIZE):
+    """Decompress FASTQ files and count their reads.
+
+    Every gzip member is checked against its CRC and length by the gzip
+    module, and BGZF files must end with the BGZF end-of-file block, since
+    a BGZF file truncated between two blocks is still valid gzip.
+
+    Args:
+        paths (list of str): files holding the reads of one upload
+        chunk_size (int): size of the decompressed chunks
+
+    Returns:
+        int: number of reads in all files
+
+    Raises:
+        FastqIntegrityError: if a file is corrupted, truncated or doesn't
+            hold complete FASTQ records
+    """
+    lines = 0
+    for path in paths:
+        if is_bgzf(path):
+            with open(path, "rb") as fastq_file:
+                fastq_file.seek(max(0, os.path.getsize(path) - len(BGZF_EOF)))
+                if fastq_file.read() != BGZF_EOF:
+                    raise FastqIntegrityError(
+                        f"{path}: missing BGZF end-of-file block, "
+                        "the file is truncated"
+                    )
+        last = b"\n"
+        first = None
+        try:
+            with gzip.open(path, "rb") as fastq_file:
+                while True:
+                    chunk = fastq_file.read(chunk_size)
+                    if not chunk:
+                        break
+                    if first is None:
+                        first = chunk[:1]
+                    lines += chunk.count(b"\n")
+                    last = chunk[-1:]
+        except (EOFError, OSError, zlib.error) as err:
+            raise FastqIntegrityError(f"{path}: {err}") from err
+        if first is None:
+            raise FastqIntegrityError(f"{path}: file has no reads")
+        if first != b"@":
+            raise FastqIntegrityError(f"{path}: file is not in FASTQ format")
+        if last != b"\n":
+            lines += 1
+    if lines % 4:
+        raise FastqIntegrityError(
+            f"{', '.join(paths)}: last FASTQ record is incomplete"
+        )
+    return lines // 4
+
+
+def get_pair(path):
+    """Sample and R notation of a paired FASTQ file name.
+
+    Returns:
+        tuple: sample and R notation, or None if the file name has none
+    """
+    match = PAIRED_FILE_NAME.match(path)
+    if not match:
+        return None
+    return (match.group(1) + match.group(3), f"R{match.group(2)}")
+
+
+class FastqValidator:
+    """Validate FASTQ files in background processes.
+
+    Files are decompressed on a process pool, so the validation runs at the
+    same time as the uploads instead of before them. `check` fails as soon
+    as any finished validation found a problem, so uploads that are yet to
+    start can be skipped, and `wait` reports all problems, including R1 and
+    R2 files of a sample with different numbers of reads.
+    """
+
+    def __init__(self, workers=VALIDATION_WORKERS):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._validations = []
+
+    def start(self, uploads):
+        """Start validating uploads.
+
+        Args:
+            uploads (list of tuple): `(label, paths, pair)` for every upload,
+                where pair is a `(sample, r_notation)` tuple, or None when
+                the upload isn't part of a pair
+        """
+        if not uploads:
+            return
+        echo_info(f"Validating {len(uploads)} FASTQ files")
+        self._executor = ProcessPoolExecutor(
+            max_workers=min(self.workers, len(uploads))
+        )
+        for label, paths, pair in uploads:
+            future = self._executor.submit(count_reads, paths)
+            self._validations.append((label, pair, future))
+
+    def check(self):
+        """Raise if any finished validation failed.
+
+        Raises:
+            ValidationError: if a file is corrupted or truncated
+        """
+        for label, _, future in self._validations:
+            if future.done() and future.exception():
+                echo_error(f"FASTQ validation failed for {label}")
+                raise ValidationError(str(future.exception()))
+
+    def wait(self):
+        """Wait for all validations and report their problems.
+
+        Raises:
+            ValidationError: if a file is corrupted or truncated, or the
+                files of a pair have different numbers of reads
+        """
+        errors = []
+        pairs = {}
+        total = 0
+        for label, pair, future in self._validations:
+            error = future.exception()
+            if error:
+                errors.append(str(error))
+                continue
+            total += future.result()
+            if pair:
+                sample, r_notation = pair
+                pairs.setdefault(sample, {})[r_notation] = (label, future.result())
+        for reads in pairs.values():
+            if len(reads) == 2 and reads["R1"][1] != reads["R2"][1]:
+                errors.append(
+                    f"{reads['R1'][0]} has {reads['R1'][1]} reads but "
+                    f"{reads['R2'][0]} has {reads['R2'][1]} reads"
+                )
+        self.shutdown()
+        if errors:
+            for error in errors:
+                echo_error(error)
+            raise ValidationError(
+                f"FASTQ validation found {len(errors)} problems. "
+                "Uploaded files were not assigned to a project."
+            )
+        if self._validations:
+            echo_info(f"Validated {len(self._validations)} FASTQ files: {total} reads")
+
+    def shutdown(self):
+        """Stop the processes, dropping validations that didn't start."""
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -4,6 +4,7 @@ import backoff
 # pylint: disable=wrong-import-order
 from gencove.client import APIClientError, APIClientTimeout  # noqa: I100
 from gencove.command.base import Command
+from gencove.pagination import get_sample_sheet_key, paginate
 
 from .utils import get_line
 
@@ -48,14 +49,7 @@ class ListSampleSheet(Command):
         Yields:
             paginated lists of uploads
         """
-        more = True
-        next_link = None
-        while more:
-            self.echo_debug("Get sample sheet page")
-            resp = self.get_sample_sheet(next_link)
-            yield resp.results
-            next_link = resp.meta.next
-            more = next_link is not None
+        yield from paginate(self.get_sample_sheet, key=get_sample_sheet_key)
 
     @backoff.on_exception(
         backoff.expo,
@@ -65,6 +59,7 @@ class ListSampleSheet(Command):
     )
     def get_sample_sheet(self, next_link=None):
         """Get sample sheet page."""
+        self.echo_debug("Get sample sheet page")
         return self.api_client.get_sample_sheet(
             gncv_path=self.gncv_path,
             assigned_status=self.status,
@@ -1,16 +1,36 @@
 """Common utils used in multiple commands."""
+import hashlib
 import json
 import os
 import re
 import shutil
 import subprocess  # nosec B404 (bandit subprocess import)
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional
 
 import click
 
-from gencove.exceptions import ValidationError  # noqa: I100
-from gencove.logger import dump_debug_log, echo_error
+from gencove.client import (  # noqa: I100
+    APIClientError,
+    APIClientTooManyRequestsError,
+    CustomEncoder,
+)
+from gencove.constants import (
+    ASSIGN_BATCH_SIZE,
+    ASSIGN_CHECKPOINT_DIR,
+    ASSIGN_MAX_RETRY_DELAY,
+    ASSIGN_MAX_TRIES,
+    ASSIGN_WORKERS,
+    SampleAssignmentStatus,
+)
+from gencove.exceptions import ValidationError
+from gencove.logger import dump_debug_log, echo_debug, echo_error
+from gencove.models import Sample
+from gencove.pagination import get_sample_sheet_key, paginate
+from gencove.utils import batchify, get_local_state_dir
 
 map_arguments_to_human_readable = {
     "pipeline_capability_id": "Pipeline capability ID",
@@ -231,3 +251,370 @@ def user_has_session_manager_plugin_in_path(
             "userguide/session-manager-working-with-install-plugin.html"
         )
     return False
+
+
+class TooManyRequestsThrottle:
+    """Pause shared by concurrent API calls while the API answers with 429.
+
+    Workers make their calls through `call`. A 429 seen by any of them
+    pauses all of them, twice as long on every consecutive 429 up to
+    `max_delay`, and every successful call halves the pause again.
+    """
+
+    def __init__(self, initial_delay=1, max_delay=60, max_tries=20):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.max_tries = max_tries
+        self._delay = 0
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Sleep while the calls are paused."""
+        with self._lock:
+            delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def too_many_requests(self):
+        """Pause the calls after a 429."""
+        with self._lock:
+            self._delay = min(
+                self.max_delay, self._delay * 2 if self._delay else self.initial_delay
+            )
+            self._paused_until = max(self._paused_until, time.monotonic() + self._delay)
+            echo_debug(f"Too many requests, pausing API calls for {self._delay}s")
+
+    def success(self):
+        """Shorten the pause after a successful call."""
+        with self._lock:
+            self._delay = self._delay / 2 if self._delay > self.initial_delay else 0
+
+    def call(self, func, *args, **kwargs):
+        """Call func, retrying it after the shared pause while it gets 429s.
+
+        Returns:
+            the value returned by func
+
+        Raises:
+            APIClientTooManyRequestsError: if func still gets a 429 after
+                `max_tries` calls.
+        """
+        for attempt in range(1, self.max_tries + 1):
+            self.wait()
+            try:
+                result = func(*args, **kwargs)
+            except APIClientTooManyRequestsError:
+                self.too_many_requests()
+                if attempt == self.max_tries:
+                    raise
+                continue
+            self.success()
+            return result
+        return None
+
+
+def retry_api_error_giveup(exc):
+    """Give up retrying API calls on errors other than 429 and 5xx.
+
+    Args:
+        exc (Exception): Exception raised.
+
+    Returns:
+        bool: True for giving up, False to continue.
+    """
+    status_code = getattr(exc, "status_code", None)
+    return status_code is not None and status_code != 429 and status_code < 500
+
+
+def sample_upload_ids(sample):
+    """Ids of the uploads of a sample sheet sample, as strings."""
+    if not sample.fastq:
+        return []
+    return [
+        str(fastq.upload)
+        for fastq in (sample.fastq.r1, sample.fastq.r2)
+        if fastq and fastq.upload
+    ]
+
+
+class AssignCheckpoint:
+    """JSON lines file of the batches of uploads assigned to a project.
+
+    Every assigned batch appends one line holding the ids of its uploads and
+    the samples returned by the API, so a run that stopped half way can skip
+    what was already assigned and still report it. Runs assigning different
+    destinations or prefixes to the same project use different files.
+    """
+
+    def __init__(self, project_id, scope=None, path=None):
+        name = str(project_id)
+        if scope:
+            name += "-" + hashlib.sha256(scope.encode("utf-8")).hexdigest()[:16]
+        self.path = path or get_local_state_dir(ASSIGN_CHECKPOINT_DIR, f"{name}.jsonl")
+        self._lock = threading.Lock()
+
+    def load(self, uploads=None):
+        """Read the assigned batches.
+
+        Args:
+            uploads (set of str): ids of the uploads being assigned, batches
+                with other uploads are left out, all batches by default
+
+        Returns:
+            tuple: set of assigned upload ids and list of assigned samples
+        """
+        done_uploads = set()
+        assigned = []
+        try:
+            with open(self.path, encoding="utf-8") as checkpoint_file:
+                for line in checkpoint_file:
+                    try:
+                        batch = json.loads(line)
+                    except ValueError:
+                        # the last line of an interrupted run
+                        continue
+                    if uploads is not None and not uploads.issuperset(batch["uploads"]):
+                        continue
+                    done_uploads.update(batch["uploads"])
+                    assigned.extend(Sample(**sample) for sample in batch["assigned"])
+        except FileNotFoundError:
+            pass
+        return done_uploads, assigned
+
+    def record(self, uploads, assigned):
+        """Append an assigned batch.
+
+        Args:
+            uploads (list of str): ids of the uploads of the batch
+            assigned (list of Sample): samples returned by the API
+        """
+        line = json.dumps({"uploads": uploads, "assigned": assigned}, cls=CustomEncoder)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as checkpoint_file:
+                checkpoint_file.write(f"{line}\n")
+
+    def remove(self):
+        """Forget the assigned batches, once all of them are done."""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class BatchAssigner:
+    """Assign samples to a project in batches sent concurrently.
+
+    Batches that fail with 429 or 5xx are retried on their own, and every
+    assigned batch is saved to an `AssignCheckpoint`, so running the command
+    again after a failure only assigns the samples that are left.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        api_client,
+        project_id,
+        metadata=None,
+        workers=None,
+        checkpoint=None,
+        scope=None,
+    ):
+        self.api_client = api_client
+        self.project_id = project_id
+        self.metadata = metadata
+        self.workers = workers or ASSIGN_WORKERS
+        self.checkpoint = checkpoint or AssignCheckpoint(project_id, scope)
+        self.throttle = TooManyRequestsThrottle()
+        self.assigned_count = 0
+        self.skipped_count = 0
+        self.done_uploads = None
+        self._done_assigned = []
+
+    def resume(self, uploads):
+        """Load what a previous run assigned of some uploads.
+
+        Args:
+            uploads (iterable of str): ids of the uploads being assigned
+
+        Returns:
+            set of str: ids of the uploads that were assigned before
+        """
+        self.done_uploads, self._done_assigned = self.checkpoint.load(
+            {str(upload) for upload in uploads}
+        )
+        return self.done_uploads
+
+    def assign(self, samples, callback=None):
+        """Assign samples, skipping the ones a previous run assigned.
+
+        Args:
+            samples (list of Sample): sample sheet samples
+            callback (callable): called with the number of samples of every
+                batch that is done, skipped batches included
+
+        Returns:
+            list of Sample: samples returned by the API, for all batches,
+                including the ones assigned before
+
+        Raises:
+            APIClientError: if a batch could not be assigned, after the
+                batches being sent are done
+        """
+        if self.done_uploads is None:
+            self.resume(
+                upload for sample in samples for upload in sample_upload_ids(sample)
+            )
+        assigned = list(self._done_assigned)
+        pending = []
+        for sample in samples:
+            uploads = sample_upload_ids(sample)
+            if uploads and all(upload in self.done_uploads for upload in uploads):
+                self.skipped_count += 1
+            else:
+                pending.append(sample)
+        if self.skipped_count:
+            echo_debug(f"Skipping {self.skipped_count} samples assigned before")
+            if callback:
+                callback(self.skipped_count)
+
+        # batchify ends with an empty batch when the samples divide evenly
+        batches = [
+            batch for batch in batchify(pending, batch_size=ASSIGN_BATCH_SIZE) if batch
+        ]
+        for batch_assigned in self._assign_batches(batches, callback):
+            assigned.extend(batch_assigned)
+        self.checkpoint.remove()
+        return assigned
+
+    def _assign_batches(self, batches, callback):
+        """Send batches from a bounded worker pool.
+
+        Returns:
+            list: samples returned by the API for each batch, in order
+        """
+        results = [None] * len(batches)
+        if not batches:
+            return results
+        with ThreadPoolExecutor(
+            max_workers=min(self.workers, len(batches))
+        ) as executor:
+            futures = {
+                executor.submit(self.assign_batch, batch): index
+                for index, batch in enumerate(batches)
+            }
+            error = None
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                if future.exception():
+                    # batches being sent are still counted, the rest is dropped
+                    if error is None:
+                        error = future.exception()
+                        for other in futures:
+                            other.cancel()
+                    continue
+                index = futures[future]
+                results[index] = future.result()
+                self.assigned_count += len(batches[index])
+                if callback:
+                    callback(len(batches[index]))
+        if error:
+            raise error
+        return results
+
+    def assign_batch(self, batch):
+        """Assign one batch and save it to the checkpoint.
+
+        Adding samples to a project isn't idempotent, so after a 5xx or a
+        timeout the sample sheet is checked for the samples the failed
+        request assigned, and only the rest of the batch is sent again.
+        429s and these errors share `ASSIGN_MAX_TRIES` attempts.
+
+        Returns:
+            list of Sample: samples returned by the API
+
+        Raises:
+            APIClientError: if the batch still fails after the last attempt,
+                or if what a failed request assigned can't be told
+        """
+        uploads = [upload for sample in batch for upload in sample_upload_ids(sample)]
+        pending = batch
+        assigned = []
+        for attempt in range(1, ASSIGN_MAX_TRIES + 1):
+            self.throttle.wait()
+            echo_debug(f"Assigning batch: {len(pending)}")
+            try:
+                response = self.api_client.add_samples_to_project(
+                    pending, self.project_id, self.metadata
+                )
+            except APIClientTooManyRequestsError:
+                if attempt == ASSIGN_MAX_TRIES:
+                    raise
+                self.throttle.too_many_requests()
+                continue
+            except APIClientError as err:
+                if retry_api_error_giveup(err) or attempt == ASSIGN_MAX_TRIES:
+                    raise
+                echo_debug(f"Assigning batch failed, checking the sample sheet: {err}")
+                time.sleep(min(2 ** (attempt - 1), ASSIGN_MAX_RETRY_DELAY))
+                found, pending = self._split_assigned(pending, err)
+                assigned.extend(found)
+                if not pending:
+                    break
+                continue
+            self.throttle.success()
+            assigned.extend(response.uploads or [])
+            break
+        self.checkpoint.record(uploads, assigned)
+        return assigned
+
+    def _split_assigned(self, batch, error):
+        """Split a batch into the samples the sample sheet lists as assigned
+        and the samples that are still unassigned.
+
+        Returns:
+            tuple: assigned sample sheet samples and unassigned batch samples
+
+        Raises:
+            APIClientError: `error`, when the uploads of the batch have no
+                paths to search the sample sheet for
+        """
+        paths = [
+            sample.fastq.r1.destination_path
+            for sample in batch
+            if sample.fastq and sample.fastq.r1 and sample.fastq.r1.destination_path
+        ]
+        if len(paths) < len(batch):
+            raise error
+        batch_uploads = {
+            upload for sample in batch for upload in sample_upload_ids(sample)
+        }
+        found_uploads = set()
+        found = []
+        pages = paginate(
+            lambda next_link: self.api_client.get_sample_sheet(
+                gncv_path=os.path.commonprefix(paths),
+                assigned_status=SampleAssignmentStatus.ASSIGNED.value,
+                next_link=next_link,
+            ),
+            key=get_sample_sheet_key,
+        )
+        for page in pages:
+            for sample in page:
+                sample_uploads = sample_upload_ids(sample)
+                if sample_uploads and batch_uploads.issuperset(sample_uploads):
+                    found_uploads.update(sample_uploads)
+                    found.append(sample)
+            if found_uploads == batch_uploads:
+                pages.close()
+                break
+        unassigned = [
+            sample
+            for sample in batch
+            if not found_uploads.issuperset(sample_upload_ids(sample))
+        ]
+        echo_debug(f"{len(found)} samples of the failed batch were assigned")
+        return found, unassigned
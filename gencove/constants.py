@@ -187,7 +187,44 @@ MAX_RETRY_TIME_SECONDS = 300  # 5 minutes
 FASTQ_MAP_EXTENSION = ".fastq-map.csv"
 UPLOAD_PREFIX = "gncv://"
 ASSIGN_BATCH_SIZE = 200
+# number of batches of samples assigned to a project at the same time
+ASSIGN_WORKERS = 4
+# directory, inside the local state directory, of the assigned batches
+ASSIGN_CHECKPOINT_DIR = "assign-checkpoints"
+# attempts at assigning a batch, after 429s, 5xx and timeouts alike
+ASSIGN_MAX_TRIES = 8
+# longest wait, in seconds, before checking what a failed batch assigned
+ASSIGN_MAX_RETRY_DELAY = 30
 IMPORT_BATCH_SIZE = 100
+# connections to the API kept alive, unless GENCOVE_API_POOL_SIZE is set
+API_POOL_SIZE = 16
+# API requests in flight at the same time for an AsyncAPIClient
+ASYNC_MAX_IN_FLIGHT = 32
+# cache of the JWTs of users, inside the local state directory, kept when
+# $GENCOVE_TOKEN_CACHE is set
+TOKEN_CACHE_FILE = "tokens.json"
+# seconds before its expiry a cached access token is refreshed
+TOKEN_REFRESH_MARGIN = 60
+# cached API responses, inside the local state directory, unless
+# $GENCOVE_NO_CACHE is set
+RESPONSE_CACHE_DIR = "responses"
+# seconds the responses of slow changing endpoints are cached for
+RESPONSE_CACHE_TTLS = {
+    ApiEndpoints.FILE_TYPES.value: 3600,
+    ApiEndpoints.PIPELINE_CAPABILITES.value: 3600,
+    ApiEndpoints.PIPELINE_CAPABILITES_SEARCH.value: 3600,
+    ApiEndpoints.PIPELINES.value: 3600,
+    ApiEndpoints.PIPELINE.value: 3600,
+    ApiEndpoints.USER_DETAILS.value: 900,
+    ApiEndpoints.ORGANIZATION_DETAILS.value: 900,
+    ApiEndpoints.ORGANIZATION_USERS.value: 900,
+}
+# pages of a listing requested at the same time once its size is known
+PAGINATION_WORKERS = 8
+# seconds of transfer measured before transfers in flight are tuned again
+AUTO_TUNE_INTERVAL = 5
+# relative change of the throughput that is considered noise
+AUTO_TUNE_TOLERANCE = 0.1
 
 MINIMUM_SUPPORTED_PYTHON_MAJOR, MINIMUM_SUPPORTED_PYTHON_MINOR = 3, 9
 
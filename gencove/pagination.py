@@ -0,0 +1,164 @@
+"""Listing of all pages of paginated API endpoints."""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from gencove.constants import PAGINATION_WORKERS
+from gencove.logger import echo_debug
+
+
+def get_item_key(item):
+    """Identity of a listed item, used to drop items listed twice.
+
+    Returns:
+        str: id of the item, or its JSON when it has none
+    """
+    item_id = getattr(item, "id", None)
+    if item_id is not None:
+        return str(item_id)
+    return item.model_dump_json()
+
+
+def get_sample_sheet_key(item):
+    """Identity of a sample sheet item, which is its uploads.
+
+    Returns:
+        str: ids of the R1 and R2 uploads of the item
+    """
+    if item.fastq is None:
+        return item.model_dump_json()
+    return " ".join(
+        str(upload.upload) if upload else ""
+        for upload in (item.fastq.r1, item.fastq.r2)
+    )
+
+
+def get_offset_link(next_link, offset):
+    """Link of the page that starts at an offset.
+
+    Args:
+        next_link (str): link to the next page returned by the API
+        offset (int): offset of the first result of the page
+
+    Returns:
+        str: `next_link` with its offset replaced
+    """
+    parsed = urlparse(next_link)
+    query = parse_qs(parsed.query)
+    query["offset"] = [str(offset)]
+    return parsed._replace(query=urlencode(query, doseq=True)).geturl()
+
+
+def _get_page_slice(next_link):
+    """Offset and limit of the page a link points to, None if unknown."""
+    query = parse_qs(urlparse(next_link).query)
+    try:
+        return int(query["offset"][0]), int(query["limit"][0])
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+def paginate(get_page, workers=PAGINATION_WORKERS, key=get_item_key):
+    """Get all pages of a listing, requesting several pages at once.
+
+    The first page tells how many results there are, and the pages after it
+    are requested at their offsets by up to `workers` threads, while the
+    pages are yielded in order. Listings are sorted by when their items
+    were modified, so items that change while they are being listed move
+    between pages. Items seen before are dropped, and when a page repeats
+    items, is short or reports a different count, all pages are listed
+    again one after the other to pick up the items that were missed, which
+    are yielded last. Listings that don't report their count or page size
+    are paged through one page at a time.
+
+    Args:
+        get_page (function): takes the link to a page, None for the first
+            one, and returns the page with `meta` and `results`
+        workers (int): pages requested at the same time
+        key (function): identity of a listed item
+
+    Yields:
+        list: results of the first page, which may be empty, and the new
+            results of every page after it
+    """
+    page = get_page(None)
+    seen = set()
+    yield _drop_seen(page.results, seen, key)
+    next_link = page.meta.next
+    if next_link is None:
+        return
+    page_slice = _get_page_slice(next_link)
+    count = page.meta.count
+    offsets = deque()
+    if count is not None and page_slice is not None and page_slice[1] > 0:
+        offsets.extend(range(page_slice[0], count, page_slice[1]))
+    if workers < 2 or not offsets:
+        echo_debug("Listing pages one at a time")
+        yield from _paginate_sequentially(get_page, next_link, seen, key)
+        return
+
+    limit = page_slice[1]
+    echo_debug(f"Listing {count} results in {len(offsets) + 1} pages")
+    shifted = False
+    for page_offset, page in _request_pages(get_page, next_link, offsets, workers):
+        results = page.results or []
+        new_results = _drop_seen(results, seen, key)
+        if (
+            page.meta.count != count
+            or len(results) != min(limit, count - page_offset)
+            or len(new_results) != len(results)
+        ):
+            shifted = True
+        if new_results:
+            yield new_results
+
+    if shifted:
+        echo_debug("Listing changed while it was paged, listing it again")
+        yield from _paginate_sequentially(get_page, None, seen, key)
+
+
+def _request_pages(get_page, next_link, offsets, workers):
+    """Request the pages at the offsets on threads, yielding them in order.
+
+    At most `workers` pages are requested ahead of the page being yielded.
+
+    Yields:
+        tuple: offset of the page and the page
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=min(workers, len(offsets)), thread_name_prefix="gencove-pages"
+    )
+    try:
+        in_flight = deque()
+        while offsets or in_flight:
+            while offsets and len(in_flight) < workers:
+                offset = offsets.popleft()
+                link = get_offset_link(next_link, offset)
+                in_flight.append((offset, executor.submit(get_page, link)))
+            offset, future = in_flight.popleft()
+            yield offset, future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _paginate_sequentially(get_page, next_link, seen, key):
+    """Follow the links to the next pages, dropping items seen before."""
+    while True:
+        page = get_page(next_link)
+        new_results = _drop_seen(page.results, seen, key)
+        if new_results:
+            yield new_results
+        next_link = page.meta.next
+        if next_link is None:
+            return
+
+
+def _drop_seen(results, seen, key):
+    """Results that weren't listed on pages before, remembering them."""
+    results = results or []
+    keys = [key(item) for item in results]
+    new_results = [
+        item for item, item_key in zip(results, keys) if item_key not in seen
+    ]
+    seen.update(keys)
+    return new_results
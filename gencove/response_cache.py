@@ -0,0 +1,107 @@
+"""On-disk cache of API responses that rarely change."""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+from gencove.constants import RESPONSE_CACHE_TTLS
+from gencove.logger import echo_debug
+
+ENDPOINT_TTLS = [
+    (re.compile(re.escape(endpoint).replace(re.escape("{id}"), "[^/]+")), ttl)
+    for endpoint, ttl in RESPONSE_CACHE_TTLS.items()
+]
+
+
+def is_response_cache_enabled():
+    """Whether responses are cached, unless turned off with $GENCOVE_NO_CACHE."""
+    return os.environ.get("GENCOVE_NO_CACHE", "").lower() not in ("1", "true", "yes")
+
+
+def get_endpoint_ttl(endpoint):
+    """Seconds the responses of an endpoint are cached for.
+
+    Args:
+        endpoint (str): endpoint path, with its ids filled in
+
+    Returns:
+        int: time to live, None if the endpoint isn't cached
+    """
+    for pattern, ttl in ENDPOINT_TTLS:
+        if pattern.fullmatch(endpoint):
+            return ttl
+    return None
+
+
+def get_resource(endpoint):
+    """Resource of an endpoint, e.g. `pipeline` for `/api/v2/pipeline/{id}`."""
+    parts = [part for part in endpoint.split("/") if part]
+    return parts[2] if len(parts) > 2 else "-".join(parts) or "root"
+
+
+class ResponseCache:
+    """JSON responses of GET requests, saved until their endpoint's TTL.
+
+    Every response is saved in its own file, named after a hash of the
+    host, the user, the endpoint and the query parameters, in a directory
+    of its resource. Writing to a resource removes its directory, so a
+    POST or DELETE is never followed by a stale response. Files are
+    replaced atomically, and a cache that can't be used means sending the
+    request.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _file_path(self, endpoint, key):
+        digest = hashlib.sha256(
+            json.dumps(key, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.path, get_resource(endpoint), f"{digest}.json")
+
+    def get(self, endpoint, key):
+        """Load a cached response.
+
+        Args:
+            endpoint (str): endpoint the response was sent by
+            key (list): host, user and query parameters of the request
+
+        Returns:
+            cached response, None if there is none or it expired
+        """
+        file_path = self._file_path(endpoint, key)
+        try:
+            with open(file_path, encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as err:
+            echo_debug(f"Ignoring unreadable cached response {file_path}: {err}")
+            return None
+        if entry.get("expires", 0) <= time.time():
+            return None
+        echo_debug(f"Using cached response of {endpoint}")
+        return entry.get("response")
+
+    def set(self, endpoint, key, response, ttl):
+        """Save a response for `ttl` seconds."""
+        file_path = self._file_path(endpoint, key)
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(file_path), mode=0o700, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(
+                    {"expires": time.time() + ttl, "response": response}, cache_file
+                )
+            os.replace(tmp_path, file_path)
+        except (OSError, TypeError, ValueError) as err:
+            echo_debug(f"Failed to cache response of {endpoint}: {err}")
+
+    def invalidate(self, endpoint):
+        """Forget the cached responses of the resource written to."""
+        shutil.rmtree(
+            os.path.join(self.path, get_resource(endpoint)), ignore_errors=True
+        )
@@ -0,0 +1,29 @@
+"""HTTP sessions that keep connections alive between requests."""
+import http.cookiejar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def create_session(pool_size, headers=None):
+    """Create a session that reuses connections, shared between threads.
+
+    Its connection pools are thread safe, and cookies, the only state a
+    session keeps between requests, are never stored, so requests of one
+    thread don't leak into another.
+
+    Args:
+        pool_size (int): connections kept alive for each host, should be
+            the number of requests that can run at the same time
+        headers (dict): headers sent with every request
+
+    Returns:
+        requests.Session: session with keep-alive connection pools
+    """
+    session = requests.Session()
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    session.headers.update(headers or {})
+    adapter = HTTPAdapter(pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
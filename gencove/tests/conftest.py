@@ -16,6 +16,12 @@ except AttributeError:
     utc_tz = datetime.timezone.utc  # fallback for older Python versions
 
 
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    """Send every request, so responses don't leak between tests."""
+    monkeypatch.setenv("GENCOVE_NO_CACHE", "1")
+
+
 @pytest.fixture(scope="session")
 def using_api_key():
     """Returns True if API Key is being used."""
@@ -192,6 +198,14 @@ def dont_save_dump_log():
     os.environ["GENCOVE_SAVE_DUMP_LOG"] = "FALSE"
 
 
+@pytest.fixture(scope="function", autouse=True)
+def local_state_dir(tmp_path, monkeypatch):
+    """Keeps the state the CLI saves between runs out of the home folder."""
+    state_dir = tmp_path / "gencove-home"
+    monkeypatch.setenv("GENCOVE_HOME", str(state_dir))
+    return state_dir
+
+
 @pytest.fixture(scope="function")
 def dump_filename(mocker):
     """Fixtures that returns the log filename and creates the folder."""
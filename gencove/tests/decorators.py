@@ -6,6 +6,8 @@ from functools import wraps
 
 import requests
 
+from gencove.client import get_api_session  # noqa: I100
+
 
 def parse_response_to_json(func):
     """Decorator that parses the response body into JSON and passes it to the
@@ -47,7 +49,7 @@ def assert_authorization(func):
             kwargs["headers"] = headers
             return requests.get(url, *args, **kwargs)
 
-        mocker.patch("gencove.client.get", side_effect=mock_get_auth)
+        mocker.patch.object(get_api_session(), "get", side_effect=mock_get_auth)
         login_called = False
 
         def mock_post_auth(url, data, *args, headers, **kwargs):
@@ -67,7 +69,7 @@ def assert_authorization(func):
             kwargs["headers"] = headers
             return requests.post(url, data, *args, **kwargs)
 
-        mocker.patch("gencove.client.post", side_effect=mock_post_auth)
+        mocker.patch.object(get_api_session(), "post", side_effect=mock_post_auth)
         kwargs["mocker"] = mocker
         func(*args, **kwargs)
         if not using_api_key:
@@ -83,9 +85,10 @@ def assert_no_requests(func):
 
     @wraps(func)
     def wrapper(*args, mocker, **kwargs):
-        mock_get = mocker.patch("gencove.client.get")
-        mock_post = mocker.patch("gencove.client.post")
-        mock_delete = mocker.patch("gencove.client.delete")
+        session = get_api_session()
+        mock_get = mocker.patch.object(session, "get")
+        mock_post = mocker.patch.object(session, "post")
+        mock_delete = mocker.patch.object(session, "delete")
 
         kwargs["mocker"] = mocker
         func(*args, **kwargs)
@@ -5,18 +5,26 @@ import json
 import operator
 import os
 import sys
-from unittest.mock import call
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import ANY, call
 from uuid import UUID, uuid4
 
 from click import echo
 from click.testing import CliRunner
 
 from gencove.cli import download
-from gencove.client import APIClient
+from gencove.client import APIClient, APIClientError
 from gencove.command.base import Command
+from gencove.command.download.index import DownloadIndex
 from gencove.command.download.main import Download
 from gencove.command.download.utils import download_file
-from gencove.models import ProjectSamples, SampleDetails, SampleMetadata, SampleQC
+from gencove.models import (
+    FileTypesModel,
+    ProjectSamples,
+    SampleDetails,
+    SampleMetadata,
+    SampleQC,
+)
 from gencove.tests.decorators import assert_authorization
 from gencove.tests.download.vcr.filters import (
     filter_files_request,
@@ -42,6 +50,8 @@ from pydantic.networks import HttpUrl
 
 import pytest
 
+import requests
+
 from vcr import VCR
 
 
@@ -246,6 +256,9 @@ def test_sample_ids_provided(credentials, mocker, recording, sample_id_download,
                     ),
                     True,
                     False,
+                    scheduler=ANY,
+                    refresh_url=ANY,
+                    checksum_sha256=None,
                 ),
                 call(
                     f"cli_test_data/mock-client-id/{MOCK_UUID}/r2.fastq.gz",
@@ -256,6 +269,9 @@ def test_sample_ids_provided(credentials, mocker, recording, sample_id_download,
                     ),
                     True,
                     False,
+                    scheduler=ANY,
+                    refresh_url=ANY,
+                    checksum_sha256=None,
                 ),
             ]
             mocked_download_file.assert_has_calls(calls)
@@ -385,11 +401,13 @@ def test_create_checksum_file(credentials, mocker, recording, sample_id_download
                 ),
                 True,
                 False,
+                scheduler=ANY,
+                refresh_url=ANY,
+                checksum_sha256=None,
             )
 
-            mocked_get_file_checksum.assert_called_once_with(
-                UUID(MOCK_UUID), filename=filename
-            )
+            # the checksum comes with the sample
+            mocked_get_file_checksum.assert_not_called()
             checksum_path = (
                 f"cli_test_data/mock-client-id/{MOCK_UUID}/{filename}.sha256"
             )
@@ -460,18 +478,17 @@ def test_create_checksum_file_template(
                 ),
                 True,
                 False,
+                scheduler=ANY,
+                refresh_url=ANY,
+                checksum_sha256=None,
             )
 
-            mocked_get_file_checksum.assert_called_once_with(
-                UUID(MOCK_UUID), filename=filename
-            )
+            # the checksum comes with the sample
+            mocked_get_file_checksum.assert_not_called()
             checksum_path = f"cli_test_data/{filename}.sha256"
             assert os.path.exists(checksum_path)
             with open(checksum_path, "r", encoding="utf-8") as checksum_file:
-                assert (
-                    checksum_file.read()
-                    == f"{MOCK_CHECKSUM} *{MOCK_UUID}_R2.fastq.gz\n"
-                )
+                assert checksum_file.read() == f"{MOCK_CHECKSUM} *{filename}\n"
 
 
 @pytest.mark.vcr
@@ -526,6 +543,9 @@ def test_create_checksum_file_exception(
                 ),
                 True,
                 False,
+                scheduler=ANY,
+                refresh_url=ANY,
+                checksum_sha256=None,
             )
             file_path = f"cli_test_data/mock-client-id/{MOCK_UUID}/{filename}"
             checksum_path = f"{file_path}.sha256"
@@ -816,6 +836,9 @@ def test_download_no_progress(credentials, mocker, recording, sample_id_download
                         ),
                         True,
                         True,
+                        scheduler=ANY,
+                        refresh_url=ANY,
+                        checksum_sha256=None,
                     ),
                     call(
                         f"cli_test_data/mock-client-id/{MOCK_UUID}/{MOCK_UUID}_R2.fastq.gz",  # noqa: E501 pylint: disable=line-too-long
@@ -828,6 +851,9 @@ def test_download_no_progress(credentials, mocker, recording, sample_id_download
                         ),
                         True,
                         True,
+                        scheduler=ANY,
+                        refresh_url=ANY,
+                        checksum_sha256=None,
                     ),
                 ]
             )
@@ -995,6 +1021,280 @@ def test_project_id_provided_filter_not_archived(credentials, mocker):
         mocked_sample_details.assert_not_called()
 
 
+@pytest.mark.default_cassette("jwt-create.yaml")
+@pytest.mark.vcr
+@assert_authorization
+def test_project_id_provided_uses_listing(credentials, mocker):
+    """Samples are downloaded from the project listing and fetched again
+    only to replace an expired download url.
+    """
+    runner = CliRunner()
+    sample_id = str(uuid4())
+    status = {"id": str(uuid4()), "created": "2021-10-12T19:55:46.498353Z"}
+
+    def sample_details(url):
+        return SampleDetails(
+            id=sample_id,
+            client_id="mock-client-id",
+            last_status={**status, "status": "succeeded"},
+            archive_last_status={**status, "status": "available"},
+            files=[
+                {
+                    "id": str(uuid4()),
+                    "file_type": "fastq-r1",
+                    "download_url": url,
+                }
+            ],
+        )
+
+    with runner.isolated_filesystem():
+        mocker.patch.object(
+            APIClient,
+            "get_project_samples",
+            return_value=ProjectSamples(
+                results=[sample_details("https://example.com/expired_R1.fastq.gz")],
+                meta={"next": None},
+            ),
+        )
+        mocker.patch.object(
+            APIClient,
+            "get_file_types",
+            return_value=FileTypesModel(results=[{"key": "fastq-r1"}], meta={}),
+        )
+        mocked_sample_details = mocker.patch.object(
+            APIClient,
+            "get_sample_details",
+            return_value=sample_details("https://example.com/fresh_R1.fastq.gz"),
+        )
+        expired = requests.Response()
+        expired.status_code = 403
+        mocked_download_file = mocker.patch(
+            "gencove.command.download.main.download_file",
+            side_effect=[requests.exceptions.HTTPError(response=expired), None],
+        )
+        res = runner.invoke(
+            download,
+            [
+                "cli_test_data",
+                "--project-id",
+                str(uuid4()),
+                "--file-types",
+                "fastq-r1",
+                *credentials,
+            ],
+        )
+        assert res.exit_code == 0
+        mocked_sample_details.assert_called_once_with(UUID(sample_id))
+        assert [
+            str(download_call[0][1])
+            for download_call in mocked_download_file.call_args_list
+        ] == [
+            "https://example.com/expired_R1.fastq.gz",
+            "https://example.com/fresh_R1.fastq.gz",
+        ]
+
+
+@pytest.mark.default_cassette("jwt-create.yaml")
+@pytest.mark.vcr
+@assert_authorization
+def test_project_id_provided_skips_indexed_files(credentials, mocker):
+    """Files recorded in the download index are skipped without requests."""
+    runner = CliRunner()
+    sample_id = str(uuid4())
+    status = {"id": str(uuid4()), "created": "2021-10-12T19:55:46.498353Z"}
+    file_id = str(uuid4())
+    sample = SampleDetails(
+        id=sample_id,
+        client_id="mock-client-id",
+        last_status={**status, "status": "succeeded"},
+        archive_last_status={**status, "status": "available"},
+        files=[
+            {
+                "id": file_id,
+                "file_type": "fastq-r1",
+                "download_url": "https://example.com/sample_R1.fastq.gz",
+                "checksum_sha256": "a" * 64,
+            }
+        ],
+    )
+
+    with runner.isolated_filesystem():
+        file_path = f"cli_test_data/mock-client-id/{sample_id}/sample_R1.fastq.gz"
+        os.makedirs(os.path.dirname(file_path))
+        with open(file_path, "wb") as downloaded_file:
+            downloaded_file.write(b"reads")
+        index = DownloadIndex("cli_test_data/.gencove-downloads.sqlite3")
+        index.record(file_id, file_path, "a" * 64)
+        index.close()
+        mocker.patch.object(
+            APIClient,
+            "get_project_samples",
+            return_value=ProjectSamples(results=[sample], meta={"next": None}),
+        )
+        mocker.patch.object(
+            APIClient,
+            "get_file_types",
+            return_value=FileTypesModel(results=[{"key": "fastq-r1"}], meta={}),
+        )
+        mocked_sample_details = mocker.patch.object(APIClient, "get_sample_details")
+        mocked_download_file = mocker.patch(
+            "gencove.command.download.main.download_file"
+        )
+        mocked_get = mocker.patch.object(requests.Session, "get")
+        res = runner.invoke(
+            download,
+            [
+                "cli_test_data",
+                "--project-id",
+                str(uuid4()),
+                "--file-types",
+                "fastq-r1",
+                *credentials,
+            ],
+        )
+        assert res.exit_code == 0
+        assert "Files not found" not in res.output
+        mocked_download_file.assert_not_called()
+        mocked_sample_details.assert_not_called()
+        mocked_get.assert_not_called()
+
+
+@pytest.mark.default_cassette("jwt-create.yaml")
+@pytest.mark.vcr
+@assert_authorization
+def test_checksums_fetched_in_background(credentials, mocker):
+    """Missing checksums are fetched on the checksum executor, and API errors
+    while fetching them retry the sample.
+    """
+    runner = CliRunner()
+    sample_id = str(uuid4())
+    status = {"id": str(uuid4()), "created": "2021-10-12T19:55:46.498353Z"}
+    sample = SampleDetails(
+        id=sample_id,
+        client_id="mock-client-id",
+        last_status={**status, "status": "succeeded"},
+        archive_last_status={**status, "status": "available"},
+        files=[
+            {
+                "id": str(uuid4()),
+                "file_type": "fastq-r1",
+                "download_url": "https://example.com/sample_R1.fastq.gz",
+            }
+        ],
+    )
+    checksum = f"{MOCK_CHECKSUM} *sample_R1.fastq.gz\n"
+
+    with runner.isolated_filesystem():
+        mocker.patch.object(
+            APIClient,
+            "get_project_samples",
+            return_value=ProjectSamples(results=[sample], meta={"next": None}),
+        )
+        mocker.patch.object(
+            APIClient,
+            "get_file_types",
+            return_value=FileTypesModel(results=[{"key": "fastq-r1"}], meta={}),
+        )
+        mocked_sample_details = mocker.patch.object(
+            APIClient, "get_sample_details", return_value=sample
+        )
+        mocker.patch("gencove.command.download.main.download_file")
+        mocked_get_file_checksum = mocker.patch.object(
+            APIClient,
+            "get_file_checksum",
+            side_effect=[APIClientError("Server error"), checksum],
+        )
+        mocked_submit = mocker.spy(ThreadPoolExecutor, "submit")
+        res = runner.invoke(
+            download,
+            [
+                "cli_test_data",
+                "--project-id",
+                str(uuid4()),
+                "--file-types",
+                "fastq-r1",
+                "--checksums",
+                *credentials,
+            ],
+        )
+        assert res.exit_code == 0
+        assert mocked_get_file_checksum.call_count == 2
+        mocked_sample_details.assert_called_once()
+        fetches = [
+            submitted
+            for submitted in mocked_submit.call_args_list
+            if getattr(submitted.args[1], "__func__", None) is Download.fetch_checksum
+        ]
+        assert len(fetches) == 2
+        checksum_path = (
+            f"cli_test_data/mock-client-id/{sample_id}/sample_R1.fastq.gz.sha256"
+        )
+        with open(checksum_path, "r", encoding="utf-8") as checksum_file:
+            assert checksum_file.read() == checksum
+
+
+@pytest.mark.default_cassette("jwt-create.yaml")
+@pytest.mark.vcr
+@assert_authorization
+def test_download_urls_leave_out_indexed_files(credentials, mocker):
+    """Files in the index of the directory of the list are left out of it."""
+    # pylint: disable=too-many-locals
+    runner = CliRunner()
+    sample_id = str(uuid4())
+    status = {"id": str(uuid4()), "created": "2021-10-12T19:55:46.498353Z"}
+    file_ids = {"fastq-r1": str(uuid4()), "fastq-r2": str(uuid4())}
+    sample = SampleDetails(
+        id=sample_id,
+        client_id="mock-client-id",
+        last_status={**status, "status": "succeeded"},
+        archive_last_status={**status, "status": "available"},
+        files=[
+            {
+                "id": file_id,
+                "file_type": file_type,
+                "download_url": f"https://example.com/{file_type}.fastq.gz",
+                "checksum_sha256": "a" * 64,
+            }
+            for file_type, file_id in file_ids.items()
+        ],
+    )
+
+    with runner.isolated_filesystem():
+        file_path = f"cli_test_data/mock-client-id/{sample_id}/sample_R1.fastq.gz"
+        os.makedirs(os.path.dirname(file_path))
+        with open(file_path, "wb") as downloaded_file:
+            downloaded_file.write(b"reads")
+        index = DownloadIndex("cli_test_data/.gencove-downloads.sqlite3")
+        index.record(file_ids["fastq-r1"], file_path, "a" * 64)
+        index.close()
+        mocker.patch.object(
+            APIClient,
+            "get_project_samples",
+            return_value=ProjectSamples(results=[sample], meta={"next": None}),
+        )
+        mocker.patch.object(
+            APIClient,
+            "get_file_types",
+            return_value=FileTypesModel(
+                results=[{"key": "fastq-r1"}, {"key": "fastq-r2"}], meta={}
+            ),
+        )
+        res = runner.invoke(
+            download,
+            [
+                "cli_test_data/urls.json",
+                "--project-id",
+                str(uuid4()),
+                "--download-urls",
+                *credentials,
+            ],
+        )
+        assert res.exit_code == 0
+        with open("cli_test_data/urls.json", encoding="utf-8") as urls_file:
+            listed = json.load(urls_file)
+        assert list(listed[0]["files"]) == ["fastq-r2"]
+
+
 @pytest.mark.vcr
 def test_invalid_file_types_project_id_provided(
     credentials, mocker, project_id_download, recording, vcr
@@ -0,0 +1,59 @@
+"""Tests for the index of completed downloads."""
+# pylint: disable=import-error
+
+import os
+
+from click.testing import CliRunner
+
+from gencove.command.download.index import DownloadIndex
+
+
+def test_download_index():
+    """Recorded files are downloaded until they or their checksum change."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        os.makedirs("destination/sample")
+        with open("destination/sample/file.bin", "wb") as downloaded_file:
+            downloaded_file.write(b"content")
+        index = DownloadIndex("destination/.index.sqlite3")
+        assert not index.is_downloaded("file-id", "destination/sample/file.bin", "a")
+        assert not os.path.exists("destination/.index.sqlite3")
+
+        index.record("file-id", "destination/sample/file.bin", "a")
+        index.record("missing-id", "destination/sample/missing.bin", "b")
+
+        assert index.is_downloaded("file-id", "destination/sample/file.bin", "a")
+        assert not index.is_downloaded("file-id", "destination/sample/file.bin", "b")
+        assert not index.is_downloaded("file-id", "destination/other.bin", "a")
+        assert index.has_file("file-id", "a")
+        assert not index.has_file("file-id", "b")
+        assert not index.has_file("missing-id", "b")
+        assert not index.is_downloaded(
+            "missing-id", "destination/sample/missing.bin", "b"
+        )
+        index.close()
+
+        # paths are relative to the destination, which can be moved
+        os.rename("destination", "moved")
+        index = DownloadIndex("moved/.index.sqlite3")
+        assert index.is_downloaded("file-id", "moved/sample/file.bin", "a")
+        with open("moved/sample/file.bin", "ab") as downloaded_file:
+            downloaded_file.write(b"more")
+        assert not index.is_downloaded("file-id", "moved/sample/file.bin", "a")
+        index.close()
+
+
+def test_download_index_unusable():
+    """Downloads continue without an index that can't be opened."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("file.bin", "wb") as downloaded_file:
+            downloaded_file.write(b"content")
+        with open("index.sqlite3", "wb") as index_file:
+            index_file.write(b"not a database" * 100)
+        index = DownloadIndex("index.sqlite3")
+
+        index.record("file-id", "file.bin", "a")
+
+        assert not index.is_downloaded("file-id", "file.bin", "a")
+        index.close()
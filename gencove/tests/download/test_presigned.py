@@ -0,0 +1,61 @@
+"""Tests for presigned download urls."""
+# pylint: disable=import-error
+
+import datetime
+
+from gencove.command.download.presigned import PresignedUrl, get_url_expiry
+
+import pytest  # pylint: disable=wrong-import-order
+
+
+@pytest.mark.parametrize(
+    "url,expiry",
+    [
+        (
+            "https://bucket.s3.amazonaws.com/file?X-Amz-Date=20240101T120000Z"
+            "&X-Amz-Expires=3600&X-Amz-Signature=abc",
+            datetime.datetime(2024, 1, 1, 13, tzinfo=datetime.timezone.utc),
+        ),
+        (
+            "https://cdn.example.com/file?Expires=1704110400&Signature=abc",
+            datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc),
+        ),
+        ("https://example.com/file", None),
+        ("https://example.com/file?X-Amz-Date=bad&X-Amz-Expires=3600", None),
+    ],
+    ids=["sigv4", "expires", "unsigned", "malformed"],
+)
+def test_get_url_expiry(url, expiry):
+    """Expiry is read from the query of signed urls."""
+    assert get_url_expiry(url) == expiry
+
+
+def _signed_url(expires_in):
+    expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+        seconds=expires_in
+    )
+    return f"https://example.com/file?Expires={int(expiry.timestamp())}"
+
+
+def test_presigned_url_refreshed_before_expiry(mocker):
+    """Urls about to expire are replaced before a request is sent."""
+    fresh_url = _signed_url(7200)
+    refresh = mocker.Mock(return_value=fresh_url)
+
+    assert PresignedUrl(_signed_url(3600), refresh).current() != fresh_url
+    assert PresignedUrl(_signed_url(10), refresh).current() == fresh_url
+    refresh.assert_called_once_with()
+
+
+def test_presigned_url_refreshed_once(mocker):
+    """Requests rejected with the same url get a single fresh url."""
+    refresh = mocker.Mock(side_effect=["https://example.com/2", None])
+    url = PresignedUrl("https://example.com/1", refresh)
+
+    assert url.refresh("https://example.com/1")
+    assert url.refresh("https://example.com/1")
+    assert url.current() == "https://example.com/2"
+    refresh.assert_called_once_with()
+    # no fresh url means the request fails
+    assert not url.refresh("https://example.com/2")
+    assert not PresignedUrl("https://example.com/1").refresh("https://example.com/1")
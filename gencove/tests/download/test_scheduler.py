@@ -0,0 +1,117 @@
+"""Tests for the download scheduler."""
+# pylint: disable=import-error
+
+import threading
+
+from click.testing import CliRunner
+
+from gencove.command.download.constants import (
+    AUTO_INITIAL_CONNECTIONS,
+    AUTO_MAX_CONNECTIONS,
+    AUTO_MIN_CONNECTIONS,
+)
+from gencove.command.download.exceptions import DownloadCancelled
+from gencove.command.download.scheduler import DownloadScheduler
+from gencove.command.download.utils import download_file
+from gencove.tests.utils import MockRangeResponse
+from gencove.utils import MB
+
+import pytest  # pylint: disable=wrong-import-order
+
+import requests  # pylint: disable=wrong-import-order
+
+
+def test_scheduler_tune():
+    """Connections climb while throughput improves and back off after."""
+    scheduler = DownloadScheduler(no_progress=True)
+    try:
+        assert scheduler.adaptive
+        assert scheduler.connections == AUTO_INITIAL_CONNECTIONS
+        scheduler.tune(10 * MB)
+        scheduler.tune(20 * MB)
+        assert scheduler.connections == AUTO_INITIAL_CONNECTIONS + 2
+        # small changes are noise
+        scheduler.tune(21 * MB)
+        assert scheduler.connections == AUTO_INITIAL_CONNECTIONS + 2
+        scheduler.tune(10 * MB)
+        assert scheduler.connections == AUTO_INITIAL_CONNECTIONS + 1
+        for step in range(AUTO_MAX_CONNECTIONS):
+            scheduler.tune(2**step * 20 * MB)
+        assert scheduler.connections == AUTO_MIN_CONNECTIONS
+    finally:
+        scheduler.shutdown()
+
+
+def test_scheduler_throttled():
+    """Throttled requests halve the connections."""
+    scheduler = DownloadScheduler(no_progress=True)
+    response = requests.Response()
+    response.status_code = 429
+    try:
+        with pytest.raises(requests.exceptions.HTTPError):
+            with scheduler.connection():
+                raise requests.exceptions.HTTPError(response=response)
+        assert scheduler.connections == AUTO_INITIAL_CONNECTIONS // 2
+        # errors that aren't caused by load are left alone
+        with pytest.raises(ValueError):
+            with scheduler.connection():
+                raise ValueError
+        assert scheduler.connections == AUTO_INITIAL_CONNECTIONS // 2
+    finally:
+        scheduler.shutdown()
+
+
+def test_scheduler_fixed_connections():
+    """Requested connections bound the requests in flight and aren't tuned."""
+    scheduler = DownloadScheduler(max_connections=1, no_progress=True)
+    try:
+        assert not scheduler.adaptive
+        entered = threading.Event()
+
+        def hold_connection():
+            with scheduler.connection():
+                entered.set()
+
+        with scheduler.connection():
+            blocked = threading.Thread(target=hold_connection)
+            blocked.start()
+            assert not entered.wait(timeout=0.1)
+        blocked.join(timeout=1)
+        assert entered.is_set()
+        scheduler.tune(10 * MB)
+        scheduler.throttled()
+        assert scheduler.connections == 1
+        scheduler.cancel()
+        with pytest.raises(DownloadCancelled):
+            with scheduler.connection():
+                pass
+    finally:
+        scheduler.shutdown()
+
+
+def test_download_file_with_scheduler(mocker):
+    """Ranges of large files run on the shared pool and report progress."""
+    content = bytes(range(256)) * 4096
+    mocked_get = mocker.patch.object(
+        requests.Session,
+        "get",
+        side_effect=lambda url, headers=None, **kwargs: MockRangeResponse(
+            content, headers
+        ),
+    )
+    mocker.patch("gencove.command.download.utils.MIN_BYTES_PER_PART", len(content) // 4)
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        scheduler = DownloadScheduler(max_connections=2, no_progress=True)
+        try:
+            download_file(
+                "file.bin", "https://example.com/file.bin", False, True, scheduler
+            )
+        finally:
+            scheduler.shutdown()
+
+        with open("file.bin", "rb") as downloaded_file:
+            assert downloaded_file.read() == content
+    # the initial request and one range for each of the connections
+    assert mocked_get.call_count == 3
+    assert scheduler.files_done == 1
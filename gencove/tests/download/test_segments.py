@@ -0,0 +1,87 @@
+"""Tests for the segments shared by range workers."""
+# pylint: disable=import-error
+
+from gencove.command.download.constants import HEDGE_AFTER, MIN_SPLIT_SIZE
+from gencove.command.download.segments import SegmentQueue
+
+
+def test_segment_queue_hands_out_segments_in_order():
+    """Segments are taken from the queue before any work is stolen."""
+    segments = SegmentQueue([(0, 99), (100, 199)])
+
+    first = segments.next()
+    second = segments.next()
+
+    assert (first.start, first.end) == (0, 99)
+    assert (second.start, second.end) == (100, 199)
+    # both are too small to split and too young to hedge
+    assert segments.next() is None
+
+
+def test_segment_queue_splits_largest_segment():
+    """An idle worker takes the second half of what is left of a segment."""
+    size = 8 * MIN_SPLIT_SIZE
+    segments = SegmentQueue([(0, size - 1)])
+    victim = segments.next()
+    segments.advance(victim, 2 * MIN_SPLIT_SIZE)
+
+    stolen = segments.next()
+
+    assert (stolen.start, stolen.end) == (5 * MIN_SPLIT_SIZE, size - 1)
+    assert victim.end == 5 * MIN_SPLIT_SIZE - 1
+    # the victim stops writing at its new end
+    segments.advance(victim, 3 * MIN_SPLIT_SIZE - 10)
+    assert segments.allowed(victim, 100) == 10
+    segments.advance(victim, 10)
+    assert segments.finish(victim) == (0, 5 * MIN_SPLIT_SIZE - 1)
+
+
+def test_segment_queue_hedges_slow_segment():
+    """The rest of a slow segment gets a duplicate request, and the first
+    request to finish ends the other one.
+    """
+    segments = SegmentQueue([(0, 999)])
+    slow = segments.next()
+    segments.advance(slow, 100)
+    slow.started -= HEDGE_AFTER
+
+    hedge = segments.next()
+
+    assert (hedge.start, hedge.end) == (100, 999)
+    assert hedge.partner is slow
+    # a hedged pair is neither split nor hedged again
+    assert segments.next() is None
+
+    segments.advance(hedge, 900)
+    assert segments.finish(hedge) == (100, 999)
+    assert segments.allowed(slow, 100) == 0
+    assert segments.covered(slow)
+    assert segments.finish(slow) == (0, 99)
+
+
+def test_segment_queue_close():
+    """No segments are handed out after the download failed."""
+    segments = SegmentQueue([(0, 99)])
+    segments.close()
+
+    assert segments.next() is None
+
+
+def test_segment_queue_written_until():
+    """The written prefix of a file ends at the first byte left to write."""
+    segments = SegmentQueue([(0, 99), (100, 199), (300, 399)])
+    first = segments.next()
+    second = segments.next()
+    segments.advance(second, 100)
+    segments.finish(second)
+    assert segments.written_until(400) == 0
+
+    segments.advance(first, 50)
+    assert segments.written_until(400) == 50
+    segments.advance(first, 50)
+    segments.finish(first)
+    # 200-299 was written before
+    assert segments.written_until(400) == 300
+    last = segments.next()
+    segments.advance(last, 100)
+    assert segments.written_until(400) == 400
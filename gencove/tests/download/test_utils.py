@@ -1,12 +1,22 @@
 """Tests for download utilities."""
 # pylint: disable=wrong-import-order, import-error, protected-access
 
+import hashlib
+import io
 import os
 
 from click.testing import CliRunner
 
-from gencove.command.download.constants import MEGABYTE
+from gencove.command.download import session as session_module
+from gencove.command.download.constants import (
+    CHECKSUM_MISMATCH_TRIES,
+    DEFAULT_POOL_SIZE,
+    MEGABYTE,
+)
+from gencove.command.download.exceptions import ChecksumMismatch
+from gencove.command.download.sidecar import RangeSidecar
 from gencove.command.download.utils import (
+    _RangeFile,
     _ThreadSafeCounter,
     _build_ranges,
     _create_filepath,
@@ -14,14 +24,21 @@ from gencove.command.download.utils import (
     _extract_total_size,
     _finalize_download,
     _get_prefix_parts,
+    _preallocate,
     deliverable_type_from_filename,
+    download_file,
     get_download_template_format_params,
     get_filename_from_download_url,
 )
 from gencove.constants import DownloadTemplateParts
+from gencove.tests.utils import MockRangeResponse
 
 from pydantic import HttpUrl
 
+import pytest
+
+import requests
+
 
 def test_get_filename_from_download_url_with_query_param():
     """Test extracting filename from URL with response-content-disposition."""
@@ -235,3 +252,231 @@ def test_get_download_template_format_params_with_special_chars():
         result[DownloadTemplateParts.GENCOVE_ID.value]
         == "11111111-1111-1111-1111-111111111111"
     )
+
+
+CONTENT = bytes(range(256)) * 64
+
+
+def _mock_get(mocker, etag="etag", fail_range=None):
+    """Patch requests with responses of CONTENT, failing one of the ranges."""
+    mocker.patch("gencove.command.download.utils.MIN_BYTES_PER_PART", len(CONTENT) // 4)
+    requested = []
+
+    def get(url, headers=None, **kwargs):  # pylint: disable=unused-argument
+        requested.append(headers and headers["Range"])
+        if headers and headers["Range"] == fail_range:
+            raise requests.exceptions.ContentDecodingError("Connection dropped")
+        return MockRangeResponse(CONTENT, headers, etag)
+
+    mocker.patch.object(requests.Session, "get", side_effect=get)
+    return requested
+
+
+def test_download_file_resumes_partial_download(mocker):
+    """Only the ranges missing from a partial download are fetched again."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        _mock_get(mocker, fail_range="bytes=8192-12287")
+        with pytest.raises(requests.exceptions.ContentDecodingError):
+            download_file("file.bin", "https://example.com/file.bin", False, True)
+
+        assert os.path.getsize("file.bin.tmp") == len(CONTENT)
+        sidecar = RangeSidecar("file.bin.tmp")
+        state = sidecar.load()
+        assert state["size"] == len(CONTENT)
+        assert state["etag"] == "etag"
+        # ranges that were being fetched when the download failed may be done
+        missing = sidecar.resume(len(CONTENT), "etag")
+        assert any(start <= 8192 and end >= 12287 for start, end in missing)
+        missing_bytes = sum(end - start + 1 for start, end in missing)
+        assert missing_bytes < len(CONTENT)
+
+        requested = _mock_get(mocker)
+        download_file("file.bin", "https://example.com/file.bin", False, True)
+
+        assert requested[0] is None
+        requested_ranges = [
+            [int(byte) for byte in header.partition("=")[2].split("-")]
+            for header in requested[1:]
+        ]
+        assert sum(end - start + 1 for start, end in requested_ranges) == (
+            missing_bytes
+        )
+        with open("file.bin", "rb") as downloaded_file:
+            assert downloaded_file.read() == CONTENT
+        assert not os.path.exists("file.bin.tmp")
+        assert RangeSidecar("file.bin.tmp").load() is None
+
+
+def test_download_file_discards_partial_download_of_changed_object(mocker):
+    """A partial download is started over if the remote object changed."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        _mock_get(mocker, fail_range="bytes=8192-12287")
+        with pytest.raises(requests.exceptions.ContentDecodingError):
+            download_file("file.bin", "https://example.com/file.bin", False, True)
+
+        requested = _mock_get(mocker, etag="changed")
+        download_file("file.bin", "https://example.com/file.bin", False, True)
+
+        assert len(requested) == 5
+        with open("file.bin", "rb") as downloaded_file:
+            assert downloaded_file.read() == CONTENT
+
+
+def test_preallocate():
+    """Temporary files are created with their full size allocated."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        _preallocate("file.bin.tmp", 1024 * 1024)
+
+        assert os.path.getsize("file.bin.tmp") == 1024 * 1024
+        if hasattr(os, "posix_fallocate"):
+            assert os.stat("file.bin.tmp").st_blocks * 512 >= 1024 * 1024
+
+
+@pytest.mark.parametrize("pwrite", [True, False], ids=["pwrite", "seek"])
+def test_range_file_write_at(monkeypatch, pwrite):
+    """Ranges are written at their offsets through a shared descriptor."""
+    if not pwrite:
+        monkeypatch.delattr(os, "pwrite", raising=False)
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        _preallocate("file.bin.tmp", 8)
+        with _RangeFile("file.bin.tmp") as range_file:
+            range_file.write_at(b"CCDD", 4)
+            range_file.write_at(b"AABB", 0)
+
+        with open("file.bin.tmp", "rb") as tmp_file:
+            assert tmp_file.read() == b"AABBCCDD"
+
+
+def test_download_file_reuses_session(mocker):
+    """Files and their ranges are fetched through one pooled session."""
+    requested = _mock_get(mocker)
+    sessions = set()
+    create_session = session_module.create_session
+
+    def track_session(*args, **kwargs):
+        session = create_session(*args, **kwargs)
+        sessions.add(session)
+        return session
+
+    mocker.patch.object(session_module, "create_session", side_effect=track_session)
+    session_module.get_session.cache_clear()
+    runner = CliRunner()
+    try:
+        with runner.isolated_filesystem():
+            download_file("file1.bin", "https://example.com/file1.bin", False, True)
+            download_file("file2.bin", "https://example.com/file2.bin", False, True)
+    finally:
+        session_module.get_session.cache_clear()
+
+    assert len(requested) == 10
+    assert len(sessions) == 1
+    (session,) = sessions
+    assert (
+        session.get_adapter("https://example.com").poolmanager.connection_pool_kw[
+            "maxsize"
+        ]
+        == DEFAULT_POOL_SIZE
+    )
+
+
+def _forbidden_response():
+    """Response of a request to an expired presigned url."""
+    response = requests.Response()
+    response.status_code = 403
+    response.raw = io.BytesIO()
+    return response
+
+
+def test_download_file_refreshes_expired_url(mocker):
+    """Ranges rejected with 403 continue with a fresh url of the file."""
+    mocker.patch("gencove.command.download.utils.MIN_BYTES_PER_PART", len(CONTENT) // 4)
+    requested = []
+
+    def get(url, headers=None, **kwargs):  # pylint: disable=unused-argument
+        requested.append((url, headers and headers["Range"]))
+        if headers and url.endswith("expired"):
+            return _forbidden_response()
+        return MockRangeResponse(CONTENT, headers)
+
+    mocker.patch.object(requests.Session, "get", side_effect=get)
+    refresh_url = mocker.Mock(return_value="https://example.com/file.bin?fresh")
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        download_file(
+            "file.bin",
+            "https://example.com/file.bin?expired",
+            False,
+            True,
+            refresh_url=refresh_url,
+        )
+
+        with open("file.bin", "rb") as downloaded_file:
+            assert downloaded_file.read() == CONTENT
+    refresh_url.assert_called_once_with()
+    fresh_ranges = [
+        headers for url, headers in requested if url.endswith("fresh") and headers
+    ]
+    assert len(fresh_ranges) == 4
+
+
+def test_download_file_expired_url_without_refresh(mocker):
+    """A 403 is not retried when the url can't be refreshed."""
+    get = mocker.patch.object(
+        requests.Session, "get", return_value=_forbidden_response()
+    )
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with pytest.raises(requests.exceptions.HTTPError):
+            download_file("file.bin", "https://example.com/file.bin", False, True)
+    get.assert_called_once()
+
+
+@pytest.mark.parametrize("parts", [1, 4], ids=["stream", "ranges"])
+def test_download_file_verifies_checksum(mocker, parts):
+    """Files are hashed while they are written and checked once complete."""
+    requested = _mock_get(mocker)
+    mocker.patch(
+        "gencove.command.download.utils.MIN_BYTES_PER_PART", len(CONTENT) // parts
+    )
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        download_file(
+            "file.bin",
+            "https://example.com/file.bin",
+            False,
+            True,
+            checksum_sha256=hashlib.sha256(CONTENT).hexdigest(),
+        )
+
+        with open("file.bin", "rb") as downloaded_file:
+            assert downloaded_file.read() == CONTENT
+    assert len(requested) == (1 if parts == 1 else parts + 1)
+
+
+@pytest.mark.parametrize("parts", [1, 4], ids=["stream", "ranges"])
+def test_download_file_checksum_mismatch(mocker, parts):
+    """Files that don't match their checksum are downloaded again."""
+    requested = _mock_get(mocker)
+    mocker.patch(
+        "gencove.command.download.utils.MIN_BYTES_PER_PART", len(CONTENT) // parts
+    )
+    mocker.patch("time.sleep")
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with pytest.raises(ChecksumMismatch):
+            download_file(
+                "file.bin",
+                "https://example.com/file.bin",
+                False,
+                True,
+                checksum_sha256=hashlib.sha256(b"other").hexdigest(),
+            )
+
+        assert not os.path.exists("file.bin")
+        assert not os.path.exists("file.bin.tmp")
+        assert not os.path.exists(RangeSidecar("file.bin.tmp").path)
+    assert len(requested) == CHECKSUM_MISMATCH_TRIES * (1 if parts == 1 else parts + 1)
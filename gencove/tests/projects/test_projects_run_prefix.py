@@ -8,6 +8,7 @@ from click.testing import CliRunner
 from gencove.client import (
     APIClient,
     APIClientError,
+    APIClientTooManyRequestsError,
 )  # noqa: I100
 from gencove.command.projects.cli import run_prefix
 from gencove.models import SampleSheet, UploadSamples
@@ -353,6 +354,7 @@ def test_run_prefix__filter_success(mocker):
     mocked_add_samples_to_project = mocker.patch.object(
         APIClient,
         "add_samples_to_project",
+        return_value=UploadSamples(**{}),
     )
 
     res = runner.invoke(
@@ -446,3 +448,162 @@ def test_run_prefix__success(mocker):
     mocked_add_samples_to_project.assert_called_once()
     assert "Number of samples assigned to the project" in res.output
     assert "Assigning metadata to the uploaded samples." not in res.output
+
+
+def test_run_prefix__resumes_assigning(mocker):
+    """Test that batches assigned before a failure are skipped when
+    running the command again.
+    """
+    runner = CliRunner()
+    mocker.patch("gencove.command.utils.ASSIGN_BATCH_SIZE", 1)
+    mocker.patch.object(APIClient, "login", return_value=None)
+    mocker.patch.object(
+        APIClient,
+        "get_sample_sheet",
+        return_value=SampleSheet(**MOCKED_UPLOADS),
+    )
+    assigned = []
+    failures = [APIClientError(message="", status_code=400)]
+
+    def add_samples_to_project(samples, project_id, metadata=None):
+        # pylint: disable=unused-argument
+        if samples[0].client_id == "clientid2" and failures:
+            raise failures.pop()
+        assigned.extend(sample.client_id for sample in samples)
+        return UploadSamples(**{})
+
+    mocked_add_samples_to_project = mocker.patch.object(
+        APIClient,
+        "add_samples_to_project",
+        side_effect=add_samples_to_project,
+    )
+    mocker.patch("gencove.command.utils.ASSIGN_WORKERS", 1)
+    project_id = str(uuid4())
+    args = [project_id, "gncv://batch", "--email", "foo@bar.com", "--password", "123"]
+
+    res = runner.invoke(run_prefix, args)
+    assert res.exit_code == 1
+    assert assigned == ["clientid1"]
+    assert "Run the command again to assign the rest of the samples." in res.output
+
+    res = runner.invoke(run_prefix, args)
+    assert res.exit_code == 0
+    assert assigned == ["clientid1", "clientid2"]
+    assert mocked_add_samples_to_project.call_count == 3
+
+
+def _mock_sample_sheet(mocker, assigned_results=()):
+    """Mock the unassigned sample sheet and the samples listed as assigned."""
+
+    def get_sample_sheet(*args, assigned_status="all", **kwargs):
+        # pylint: disable=unused-argument
+        if assigned_status == "assigned":
+            return SampleSheet(meta=dict(next=None), results=list(assigned_results))
+        return SampleSheet(**MOCKED_UPLOADS)
+
+    return mocker.patch.object(
+        APIClient, "get_sample_sheet", side_effect=get_sample_sheet
+    )
+
+
+def test_run_prefix__retries_failed_batch(mocker):
+    """Test that a batch failing with a server error is sent again once the
+    sample sheet shows it wasn't assigned.
+    """
+    runner = CliRunner()
+    mocker.patch.object(APIClient, "login", return_value=None)
+    mocked_get_sample_sheet = _mock_sample_sheet(mocker)
+    mocker.patch("gencove.command.utils.time.sleep")
+    mocked_add_samples_to_project = mocker.patch.object(
+        APIClient,
+        "add_samples_to_project",
+        side_effect=[
+            APIClientError(message="", status_code=503),
+            UploadSamples(**{}),
+        ],
+    )
+
+    res = runner.invoke(
+        run_prefix,
+        [
+            str(uuid4()),
+            "gncv://batch",
+            "--email",
+            "foo@bar.com",
+            "--password",
+            "123",
+        ],
+    )
+    assert res.exit_code == 0
+    assert mocked_add_samples_to_project.call_count == 2
+    assert mocked_get_sample_sheet.call_args[1] == {
+        "gncv_path": "gncv://batch",
+        "assigned_status": "assigned",
+        "next_link": None,
+    }
+    assert "Assigned all samples to a project." in res.output
+
+
+def test_run_prefix__failed_batch_partly_assigned(mocker):
+    """Test that samples a failed request assigned are not sent again."""
+    runner = CliRunner()
+    mocker.patch.object(APIClient, "login", return_value=None)
+    _mock_sample_sheet(mocker, assigned_results=MOCKED_UPLOADS["results"][:1])
+    mocker.patch("gencove.command.utils.time.sleep")
+    mocked_add_samples_to_project = mocker.patch.object(
+        APIClient,
+        "add_samples_to_project",
+        side_effect=[
+            APIClientError(message="", status_code=502),
+            UploadSamples(**{}),
+        ],
+    )
+
+    res = runner.invoke(
+        run_prefix,
+        [
+            str(uuid4()),
+            "gncv://batch",
+            "--email",
+            "foo@bar.com",
+            "--password",
+            "123",
+        ],
+    )
+    assert res.exit_code == 0
+    resent = mocked_add_samples_to_project.call_args_list[1][0][0]
+    assert [sample.client_id for sample in resent] == ["clientid2"]
+
+
+def test_run_prefix__failed_batch_tries_are_capped(mocker):
+    """Test that 429s and server errors share a single number of tries."""
+    runner = CliRunner()
+    mocker.patch.object(APIClient, "login", return_value=None)
+    _mock_sample_sheet(mocker)
+    mocker.patch("gencove.command.utils.time.sleep")
+    mocker.patch("gencove.command.utils.ASSIGN_MAX_TRIES", 4)
+    mocked_add_samples_to_project = mocker.patch.object(
+        APIClient,
+        "add_samples_to_project",
+        side_effect=[
+            APIClientTooManyRequestsError(message=""),
+            APIClientError(message="", status_code=500),
+            APIClientTooManyRequestsError(message=""),
+            APIClientError(message="", status_code=500),
+            UploadSamples(**{}),
+        ],
+    )
+
+    res = runner.invoke(
+        run_prefix,
+        [
+            str(uuid4()),
+            "gncv://batch",
+            "--email",
+            "foo@bar.com",
+            "--password",
+            "123",
+        ],
+    )
+    assert res.exit_code == 1
+    assert mocked_add_samples_to_project.call_count == 4
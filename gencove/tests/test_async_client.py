@@ -0,0 +1,79 @@
+"""Test cases for the asyncio API client."""
+# pylint: disable=import-error
+
+import asyncio
+import threading
+import time
+
+from gencove.async_client import AsyncAPIClient
+from gencove.client import APIClient, APIClientError
+from gencove.models import AccessJWT
+
+import pytest  # pylint: disable=wrong-import-order
+
+
+def test_map_bounds_requests_in_flight(mocker):
+    """Calls run concurrently, up to the in-flight limit, in order."""
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def get_metadata(sample_id):
+        with lock:
+            in_flight.append(sample_id)
+            peak.append(len(in_flight))
+        time.sleep(0.02)
+        with lock:
+            in_flight.remove(sample_id)
+        return f"metadata {sample_id}"
+
+    mocker.patch.object(APIClient, "get_metadata", side_effect=get_metadata)
+
+    async def fetch():
+        async with AsyncAPIClient(max_in_flight=4) as api_client:
+            return await api_client.map(
+                "get_metadata", [(index,) for index in range(20)]
+            )
+
+    assert asyncio.run(fetch()) == [f"metadata {index}" for index in range(20)]
+    assert max(peak) == 4
+
+
+def test_concurrent_calls_refresh_once(mocker):
+    """Requests rejected with the same expired token refresh it once."""
+    api_client = APIClient()
+    # pylint: disable=protected-access
+    api_client._set_jwt("expired", "refresh")
+    barrier = threading.Barrier(5)
+
+    def request(endpoint, custom_headers, **kwargs):  # pylint: disable=unused-argument
+        if custom_headers["Authorization"] == "Bearer expired":
+            barrier.wait(timeout=5)
+            raise APIClientError("Unauthorized", 401)
+        return "checksum"
+
+    mocker.patch.object(api_client, "_request", side_effect=request)
+    refresh_token = mocker.patch.object(
+        api_client, "refresh_token", return_value=AccessJWT(access="fresh")
+    )
+
+    async def fetch():
+        async with AsyncAPIClient(api_client=api_client, max_in_flight=5) as client:
+            return await client.map(
+                "get_file_checksum", [(index,) for index in range(5)]
+            )
+
+    assert asyncio.run(fetch()) == ["checksum"] * 5
+    refresh_token.assert_called_once_with("refresh")
+
+
+def test_only_lookups_are_exposed():
+    """Only the lookup endpoints of the client are coroutines."""
+    api_client = AsyncAPIClient()
+    try:
+        assert asyncio.iscoroutinefunction(api_client.get_sample_details)
+        for name in ("_request", "login", "refresh_token", "set_api_key"):
+            with pytest.raises(AttributeError):
+                getattr(api_client, name)
+    finally:
+        api_client.close()
@@ -0,0 +1,79 @@
+"""Test cases for the API client."""
+# pylint: disable=import-error
+
+import threading
+
+from gencove.client import APIClient, APIClientError, get_api_session
+from gencove.constants import API_POOL_SIZE, ApiEndpoints
+
+import requests  # pylint: disable=wrong-import-order
+
+
+def _pool_size(session):
+    return session.get_adapter(
+        "https://api.gencove.com"
+    ).poolmanager.connection_pool_kw["maxsize"]
+
+
+def test_clients_share_pooled_session(monkeypatch):
+    """API clients of all commands send requests through one session."""
+    monkeypatch.delenv("GENCOVE_API_POOL_SIZE", raising=False)
+    session = APIClient().session
+
+    assert APIClient("https://api-dev.gencove.com").session is session
+    assert _pool_size(session) == API_POOL_SIZE
+    assert "gzip" in session.headers["Accept-Encoding"]
+
+    monkeypatch.setenv("GENCOVE_API_POOL_SIZE", "32")
+    assert _pool_size(get_api_session()) == 32
+    assert _pool_size(APIClient(pool_size=4).session) == 4
+
+
+def test_request_uses_session(mocker):
+    """Requests are sent through the session of the client."""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b'{"results": []}'  # pylint: disable=protected-access
+    client = APIClient()
+    get = mocker.patch.object(client.session, "get", return_value=response)
+
+    # pylint: disable=protected-access
+    assert client._get("/api/v2/projects/") == {"results": []}
+    assert client._get("/api/v2/projects/") == {"results": []}
+
+    assert get.call_count == 2
+    assert get.call_args[1]["url"] == "https://api.gencove.com/api/v2/projects/"
+
+
+def test_rejected_refresh_token_raises(mocker):
+    """A rejected refresh token fails the request instead of refreshing again."""
+    client = APIClient()
+    client._set_jwt("access", "refresh")  # pylint: disable=protected-access
+
+    def _request(endpoint, *args, **kwargs):  # pylint: disable=unused-argument
+        if endpoint == ApiEndpoints.REFRESH_JWT.value:
+            raise APIClientError("Token is invalid or expired", 401)
+        raise APIClientError("Authentication credentials expired", 401)
+
+    mocked_request = mocker.patch.object(client, "_request", side_effect=_request)
+    errors = []
+
+    def _get():
+        try:
+            client._get(  # pylint: disable=protected-access
+                "/api/v2/projects/", authorized=True
+            )
+        except APIClientError as err:
+            errors.append(err)
+
+    # a refresh that refreshes itself again would block the thread forever
+    thread = threading.Thread(target=_get, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert errors[0].message == "Token is invalid or expired"
+    assert [call[0][0] for call in mocked_request.call_args_list] == [
+        "/api/v2/projects/",
+        ApiEndpoints.REFRESH_JWT.value,
+    ]
@@ -0,0 +1,104 @@
+"""Tests for listing all pages of paginated endpoints."""
+# pylint: disable=import-error
+
+import threading
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+from gencove.models import ResponseMeta
+from gencove.pagination import get_offset_link, paginate
+
+LINK = "https://api.gencove.com/api/v2/projects/?limit=2&offset={offset}"
+
+
+# pylint: disable=too-few-public-methods
+class FakeListing:
+    """Endpoint listing items two at a time, like the API pages them."""
+
+    def __init__(self, ids, count=True):
+        self.items = [SimpleNamespace(id=item_id) for item_id in ids]
+        self.count = count
+        self.offsets = []
+        self.threads = set()
+        self.on_request = None
+
+    def get_page(self, next_link=None):
+        """Page the link points to."""
+        offset = 0
+        if next_link:
+            offset = int(parse_qs(urlparse(next_link).query)["offset"][0])
+        self.offsets.append(offset)
+        self.threads.add(threading.get_ident())
+        next_offset = offset + 2
+        page = SimpleNamespace(
+            meta=ResponseMeta(
+                count=len(self.items) if self.count else None,
+                next=(
+                    LINK.format(offset=next_offset)
+                    if next_offset < len(self.items)
+                    else None
+                ),
+            ),
+            results=self.items[offset:next_offset],
+        )
+        if self.on_request:
+            self.on_request(offset)
+        return page
+
+
+def _ids(pages):
+    return [item.id for page in pages for item in page]
+
+
+def test_get_offset_link():
+    """Only the offset of the link is replaced."""
+    link = get_offset_link(LINK.format(offset=2) + "&search=abc", 8)
+    assert parse_qs(urlparse(link).query) == {
+        "limit": ["2"],
+        "offset": ["8"],
+        "search": ["abc"],
+    }
+
+
+def test_paginate_fans_out():
+    """Pages after the first are requested at their offsets on threads."""
+    listing = FakeListing(range(9))
+
+    pages = list(paginate(listing.get_page, workers=3))
+
+    assert _ids(pages) == list(range(9))
+    assert [len(page) for page in pages] == [2, 2, 2, 2, 1]
+    assert sorted(listing.offsets) == [0, 2, 4, 6, 8]
+    assert len(listing.threads) > 1
+
+
+def test_paginate_sequential_without_count():
+    """Listings that don't report their count are followed page by page."""
+    listing = FakeListing(range(5), count=False)
+
+    assert _ids(paginate(listing.get_page)) == list(range(5))
+    assert listing.offsets == [0, 2, 4]
+
+
+def test_paginate_empty():
+    """An empty listing yields a single empty page."""
+    assert list(paginate(FakeListing([]).get_page)) == [[]]
+
+
+def test_paginate_shifted_listing():
+    """Items that move while the listing is paged are listed once."""
+    listing = FakeListing(range(8))
+
+    def move_last_to_front(offset):
+        # the last item is modified once the first page was listed
+        if offset == 0 and listing.items[0].id == 0:
+            listing.items.insert(0, listing.items.pop())
+
+    listing.on_request = move_last_to_front
+
+    ids = _ids(paginate(listing.get_page, workers=3))
+
+    assert sorted(ids) == list(range(8))
+    # the moved item was missed by the pages and is listed again last
+    assert ids[-1] == 7
+    assert listing.offsets.count(0) == 2
@@ -0,0 +1,108 @@
+"""Tests for the on-disk cache of API responses."""
+# pylint: disable=import-error,protected-access
+
+import os
+
+from click.testing import CliRunner
+
+from gencove.cli import cli
+from gencove.client import APIClient
+from gencove.command.base import Command
+from gencove.constants import ApiEndpoints, Credentials, Optionals
+from gencove.response_cache import ResponseCache, get_endpoint_ttl
+
+FILE_TYPES = {
+    "meta": {"count": 1, "next": None, "previous": None},
+    "results": [{"key": "impute-vcf", "description": "Imputed VCF"}],
+}
+
+
+def _api_client(mocker, cache_path="responses", api_key="key"):
+    api_client = APIClient()
+    api_client.set_api_key(api_key)
+    api_client.response_cache = ResponseCache(cache_path)
+    mocked_request = mocker.patch.object(
+        api_client, "_request", return_value=FILE_TYPES
+    )
+    return api_client, mocked_request
+
+
+def test_get_endpoint_ttl():
+    """Only slow changing endpoints are cached, with their ids filled in."""
+    assert get_endpoint_ttl(ApiEndpoints.FILE_TYPES.value)
+    assert get_endpoint_ttl("/api/v2/pipeline-capabilities/1234")
+    assert get_endpoint_ttl("/api/v2/pipeline/1234")
+    assert get_endpoint_ttl("/api/v2/project-samples/1234") is None
+    assert get_endpoint_ttl("/api/v2/pipeline-capabilities/1234/extra") is None
+
+
+def test_responses_are_cached(mocker):
+    """A response is reused for the same endpoint, parameters and user."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        api_client, mocked_request = _api_client(mocker)
+
+        first = api_client.get_file_types(project_id="1234")
+        assert api_client.get_file_types(project_id="1234") == first
+        assert mocked_request.call_count == 1
+
+        api_client.get_file_types(project_id="5678")
+        assert mocked_request.call_count == 2
+
+        other_user, other_request = _api_client(mocker, api_key="other")
+        other_user.get_file_types(project_id="1234")
+        other_request.assert_called_once()
+
+
+def test_expired_responses_are_fetched(mocker):
+    """A response is sent again once its TTL passed."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        api_client, mocked_request = _api_client(mocker)
+        mocked_time = mocker.patch("gencove.response_cache.time.time")
+        mocked_time.return_value = 1000
+
+        api_client.get_file_types()
+        mocked_time.return_value += get_endpoint_ttl(ApiEndpoints.FILE_TYPES.value)
+        api_client.get_file_types()
+
+        assert mocked_request.call_count == 2
+
+
+def test_writes_invalidate_their_resource(mocker):
+    """Writing to a resource removes its cached responses only."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        api_client, mocked_request = _api_client(mocker)
+        api_client._get("/api/v2/pipeline/1234", authorized=True)
+        api_client.get_file_types()
+
+        api_client._post("/api/v2/pipeline/", {"name": "pipeline"}, authorized=True)
+        api_client._get("/api/v2/pipeline/1234", authorized=True)
+        api_client.get_file_types()
+
+        assert [call[0][0] for call in mocked_request.call_args_list] == [
+            "/api/v2/pipeline/1234",
+            ApiEndpoints.FILE_TYPES.value,
+            "/api/v2/pipeline/",
+            "/api/v2/pipeline/1234",
+        ]
+
+
+def test_commands_use_cache_unless_turned_off(monkeypatch):
+    """Commands cache responses in the state directory by default."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        monkeypatch.setenv("GENCOVE_HOME", os.getcwd())
+        monkeypatch.delenv("GENCOVE_NO_CACHE")
+        credentials = Credentials(email="", password="", api_key="key")
+
+        command = Command(credentials, Optionals())
+        assert command.api_client.response_cache.path == os.path.join(
+            os.getcwd(), "responses"
+        )
+
+        res = runner.invoke(cli, ["--no-cache", "projects", "--help"])
+        assert res.exit_code == 0
+        assert os.environ["GENCOVE_NO_CACHE"] == "1"
+        assert Command(credentials, Optionals()).api_client.response_cache is None
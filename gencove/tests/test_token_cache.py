@@ -0,0 +1,199 @@
+"""Tests for the on-disk token cache."""
+# pylint: disable=import-error
+
+import base64
+import json
+import os
+import stat
+import time
+
+from click.testing import CliRunner
+
+from gencove.client import APIClient, APIClientError
+from gencove.constants import ApiEndpoints, Credentials
+from gencove.token_cache import TokenCache, get_jwt_expiry, is_jwt_valid
+from gencove.utils import login
+
+
+def make_jwt(expires_in):
+    """Unsigned JWT that expires in a number of seconds."""
+    payload = json.dumps({"exp": int(time.time()) + expires_in}).encode()
+    return ".".join(
+        [
+            "eyJhbGciOiJIUzI1NiJ9",
+            base64.urlsafe_b64encode(payload).rstrip(b"=").decode(),
+            "signature",
+        ]
+    )
+
+
+def _mock_request(mocker, refresh_error=None):
+    """Mock the API, issuing new tokens when logging in or refreshing."""
+
+    def _request(endpoint, *args, **kwargs):  # pylint: disable=unused-argument
+        if endpoint == ApiEndpoints.GET_JWT.value:
+            return {"access": make_jwt(300), "refresh": make_jwt(3600)}
+        if endpoint == ApiEndpoints.REFRESH_JWT.value:
+            if refresh_error:
+                raise refresh_error
+            return {"access": make_jwt(300)}
+        return {}
+
+    return mocker.patch.object(APIClient, "_request", side_effect=_request)
+
+
+def test_get_jwt_expiry():
+    """Expiry is read from the payload of the token."""
+    assert abs(get_jwt_expiry(make_jwt(100)) - time.time() - 100) <= 1
+    assert get_jwt_expiry("not a jwt") is None
+    assert get_jwt_expiry(None) is None
+    assert is_jwt_valid(make_jwt(120))
+    assert not is_jwt_valid(make_jwt(30))
+
+
+def test_token_cache_is_private():
+    """Tokens are saved per host and user in a file only the user can read."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        cache = TokenCache(os.path.join("state", "tokens.json"))
+        cache.save("https://api.gencove.com", "Foo@bar.com", "access", "refresh")
+        cache.save("https://api.gencove.com", "baz@bar.com", "access2", "refresh2")
+
+        assert cache.load("https://api.gencove.com/", "foo@bar.com") == (
+            "access",
+            "refresh",
+        )
+        assert cache.load("https://other.gencove.com", "foo@bar.com") is None
+        assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+        cache.remove("https://api.gencove.com", "foo@bar.com")
+        assert cache.load("https://api.gencove.com", "foo@bar.com") is None
+        assert cache.load("https://api.gencove.com", "baz@bar.com")
+
+
+def test_login_reuses_cached_tokens(mocker, monkeypatch):
+    """A second login uses the cached tokens without any request."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        monkeypatch.setenv("GENCOVE_HOME", os.getcwd())
+        monkeypatch.setenv("GENCOVE_TOKEN_CACHE", "1")
+        mocked_request = _mock_request(mocker)
+        credentials = Credentials(email="foo@bar.com", password="123456", api_key="")
+
+        assert login(APIClient(), credentials)
+        assert mocked_request.call_count == 1
+
+        api_client = APIClient()
+        assert login(
+            api_client, Credentials(email="foo@bar.com", password="", api_key="")
+        )
+        assert mocked_request.call_count == 1
+        # pylint: disable=protected-access
+        assert (
+            api_client._jwt_token
+            == TokenCache("tokens.json").load(api_client.host, "foo@bar.com")[0]
+        )
+
+
+def test_login_refreshes_expiring_token(mocker, monkeypatch):
+    """A cached access token that is about to expire is refreshed."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        monkeypatch.setenv("GENCOVE_HOME", os.getcwd())
+        monkeypatch.setenv("GENCOVE_TOKEN_CACHE", "1")
+        api_client = APIClient()
+        expiring = make_jwt(10)
+        TokenCache("tokens.json").save(
+            api_client.host, "foo@bar.com", expiring, make_jwt(3600)
+        )
+        mocked_request = _mock_request(mocker)
+
+        assert login(
+            api_client, Credentials(email="foo@bar.com", password="", api_key="")
+        )
+
+        mocked_request.assert_called_once()
+        assert mocked_request.call_args[0][0] == ApiEndpoints.REFRESH_JWT.value
+        cached_access, _ = TokenCache("tokens.json").load(
+            api_client.host, "foo@bar.com"
+        )
+        assert cached_access != expiring
+        assert is_jwt_valid(cached_access)
+
+
+def test_login_rejected_refresh_logs_in(mocker, monkeypatch):
+    """Cached tokens that are rejected are replaced by logging in."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        monkeypatch.setenv("GENCOVE_HOME", os.getcwd())
+        monkeypatch.setenv("GENCOVE_TOKEN_CACHE", "1")
+        api_client = APIClient()
+        refresh = make_jwt(7200)
+        TokenCache("tokens.json").save(
+            api_client.host, "foo@bar.com", make_jwt(10), refresh
+        )
+        mocked_request = _mock_request(
+            mocker, refresh_error=APIClientError("Token is invalid", 401)
+        )
+        credentials = Credentials(email="foo@bar.com", password="123456", api_key="")
+
+        assert login(api_client, credentials)
+
+        assert [call[0][0] for call in mocked_request.call_args_list] == [
+            ApiEndpoints.REFRESH_JWT.value,
+            ApiEndpoints.GET_JWT.value,
+        ]
+        _, cached_refresh = TokenCache("tokens.json").load(
+            api_client.host, "foo@bar.com"
+        )
+        assert cached_refresh != refresh
+
+
+def test_login_without_token_cache(mocker, monkeypatch):
+    """Tokens aren't cached unless it is opted into."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        monkeypatch.setenv("GENCOVE_HOME", os.getcwd())
+        monkeypatch.delenv("GENCOVE_TOKEN_CACHE", raising=False)
+        _mock_request(mocker)
+        credentials = Credentials(email="foo@bar.com", password="123456", api_key="")
+
+        assert login(APIClient(), credentials)
+        assert not os.path.exists("tokens.json")
+
+
+def test_login_prompted_email_uses_cache(mocker, monkeypatch):
+    """A prompted email is looked up in the cache before the password."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        monkeypatch.setenv("GENCOVE_HOME", os.getcwd())
+        monkeypatch.setenv("GENCOVE_TOKEN_CACHE", "1")
+        api_client = APIClient()
+        TokenCache("tokens.json").save(
+            api_client.host, "foo@bar.com", make_jwt(300), make_jwt(3600)
+        )
+        mocked_request = _mock_request(mocker)
+        mocked_prompt = mocker.patch(
+            "gencove.utils.click.prompt", return_value="foo@bar.com"
+        )
+
+        assert login(api_client, Credentials(email="", password="", api_key=""))
+
+        mocked_prompt.assert_called_once_with("Email", type=str, err=True)
+        mocked_request.assert_not_called()
+
+
+def test_request_refreshes_expiring_token(mocker):
+    """An access token about to expire is refreshed before a request."""
+    api_client = APIClient()
+    expiring = make_jwt(10)
+    api_client._set_jwt(expiring, make_jwt(3600))  # pylint: disable=protected-access
+    mocked_request = _mock_request(mocker)
+
+    api_client._get("/api/v2/projects/", authorized=True)  # pylint: disable=W0212
+
+    assert [call[0][0] for call in mocked_request.call_args_list] == [
+        ApiEndpoints.REFRESH_JWT.value,
+        "/api/v2/projects/",
+    ]
+    authorization = mocked_request.call_args[1]["custom_headers"]["Authorization"]
+    assert authorization != f"Bearer {expiring}"
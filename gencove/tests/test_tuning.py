@@ -0,0 +1,30 @@
+"""Tests for tuning transfers in flight from their throughput."""
+# pylint: disable=import-error
+
+from gencove.constants import AUTO_TUNE_INTERVAL
+from gencove.tuning import ThroughputTuner
+from gencove.utils import MB
+
+
+def test_tuner_measures_intervals(mocker):
+    """The value is tuned once an interval of transfers is over."""
+    mocked_time = mocker.patch("gencove.tuning.time.monotonic", return_value=100)
+    tuner = ThroughputTuner(4, 2, 8, "Test")
+
+    assert not tuner.transferred(10 * MB)
+    mocked_time.return_value += AUTO_TUNE_INTERVAL
+    assert tuner.transferred(10 * MB)
+    assert tuner.value == 5
+
+
+def test_tuner_reset_stays_in_bounds():
+    """A reset value is kept within the bounds and tuning starts over."""
+    tuner = ThroughputTuner(4, 2, 8, "Test")
+    tuner.tune(20 * MB)
+    tuner.tune(10 * MB)
+    assert tuner.value == 4
+
+    tuner.reset(1, "throttled")
+    assert tuner.value == 2
+    tuner.tune(MB)
+    assert tuner.value == 3
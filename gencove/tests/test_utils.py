@@ -11,7 +11,7 @@ from click.testing import CliRunner
 
 from faker import Faker
 
-from gencove.client import APIClient, APIClientError
+from gencove.client import APIClient, APIClientError, APIClientTooManyRequestsError
 from gencove.command.download.utils import (
     _get_prefix_parts,
     build_file_path,
@@ -26,6 +26,8 @@ from gencove.command.upload.utils import (
     valid_fastq_file_name_in_url,
 )
 from gencove.command.utils import (
+    AssignCheckpoint,
+    TooManyRequestsThrottle,
     is_valid_uuid,
     user_has_aws_in_path,
     validate_uuid,
@@ -672,3 +674,55 @@ def test_user_has_aws_in_path(mocker):
 
     mocker.patch("gencove.command.utils.shutil.which", return_value=False)
     assert not user_has_aws_in_path(raise_exception=False)
+
+
+def test_too_many_requests_throttle(mocker):
+    """Test that 429s pause the calls for longer each time."""
+    mocked_sleep = mocker.patch("gencove.command.utils.time.sleep")
+    mocker.patch("gencove.command.utils.time.monotonic", return_value=100)
+    func = mocker.Mock(
+        side_effect=[
+            APIClientTooManyRequestsError("Too Many Requests"),
+            APIClientTooManyRequestsError("Too Many Requests"),
+            "result",
+        ]
+    )
+    throttle = TooManyRequestsThrottle(initial_delay=1, max_delay=60)
+
+    assert throttle.call(func, "foo", bar="baz") == "result"
+    assert func.call_count == 3
+    func.assert_called_with("foo", bar="baz")
+    assert [call[0][0] for call in mocked_sleep.call_args_list] == [1, 2]
+
+
+def test_too_many_requests_throttle_gives_up(mocker):
+    """Test that the 429 is raised once all tries are used."""
+    mocker.patch("gencove.command.utils.time.sleep")
+    func = mocker.Mock(side_effect=APIClientTooManyRequestsError("Too Many Requests"))
+    throttle = TooManyRequestsThrottle(max_tries=3)
+
+    with pytest.raises(APIClientTooManyRequestsError):
+        throttle.call(func)
+    assert func.call_count == 3
+
+
+def test_assign_checkpoint_scope():
+    """Checkpoints are kept per scope and only batches of the uploads being
+    assigned are loaded.
+    """
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        assert (
+            AssignCheckpoint("project", "gncv://a/").path
+            != AssignCheckpoint("project", "gncv://b/").path
+        )
+        checkpoint = AssignCheckpoint(
+            "project", path=os.path.join("state", "checkpoint.jsonl")
+        )
+        checkpoint.record(["1", "2"], [{"client_id": "one"}])
+        checkpoint.record(["3"], [{"client_id": "three"}])
+
+        done_uploads, assigned = checkpoint.load({"1", "2", "4"})
+        assert done_uploads == {"1", "2"}
+        assert [sample.client_id for sample in assigned] == ["one"]
+        assert checkpoint.load()[0] == {"1", "2", "3"}
@@ -2,7 +2,10 @@
 
 # pylint: disable=too-many-lines, import-error
 
+import base64
 import csv
+import gzip
+import hashlib
 import json
 import operator
 import os
@@ -12,6 +15,7 @@ from click.testing import CliRunner
 
 from gencove.cli import upload
 from gencove.client import APIClient, APIClientError, APIClientTimeout
+from gencove.command.upload.multipart import PartExecutor
 from gencove.command.upload.utils import upload_file
 from gencove.constants import ApiEndpoints, UPLOAD_PREFIX
 from gencove.models import SampleSheet, UploadSamples, UploadURLImport, UploadsPostData
@@ -169,6 +173,30 @@ def test_upload_invalid_destination(
             assert vcr.play_count == 1
 
 
+@pytest.mark.parametrize("part_size", ["4", "5121"])
+def test_upload_part_size_out_of_range(mocker, part_size):
+    """Test that part sizes S3 doesn't accept are rejected."""
+    mocked_login = mocker.patch.object(APIClient, "login")
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        os.mkdir("cli_test_data")
+        res = runner.invoke(
+            upload,
+            [
+                "cli_test_data",
+                "--email",
+                "foo@bar.com",
+                "--password",
+                "123",
+                "--part-size",
+                part_size,
+            ],
+        )
+    assert res.exit_code == 2
+    assert "--part-size" in res.output
+    mocked_login.assert_not_called()
+
+
 @pytest.mark.vcr
 @assert_authorization
 def test_upload_invalid_source(
@@ -471,6 +499,7 @@ def test_upload_and_run_immediately_something_went_wrong(
             return_value=SampleSheet(**{"meta": {"next": None}, "results": []}),
         )
         mocked_assign_sample = mocker.patch.object(APIClient, "add_samples_to_project")
+        mocked_sleep = mocker.patch("gencove.command.upload.main.sleep")
 
         res = runner.invoke(
             upload,
@@ -489,6 +518,7 @@ def test_upload_and_run_immediately_something_went_wrong(
         mocked_upload_file.assert_called_once()
         mocked_get_sample_sheet.assert_called()
         mocked_assign_sample.assert_not_called()
+        assert sum(call[0][0] for call in mocked_sleep.call_args_list) >= 300
 
 
 @pytest.mark.vcr
@@ -1254,3 +1284,491 @@ def test_upload_url_destination(credentials, vcr, recording, mocker):
     assert not res.exception
     assert res.exit_code == 0
     assert "uploaded to: gncv://cli-url-" in res.output
+
+
+def test_upload_parallel_uploads(mocker):
+    """Test that several files are uploaded at once and that checksums
+    computed while sending them are saved to the manifest.
+    """
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        os.mkdir("cli_test_data")
+        for index in range(3):
+            with open(
+                f"cli_test_data/test{index}.fastq.gz", "w", encoding="utf-8"
+            ) as fastq_file:
+                fastq_file.write("AAABBB")
+
+        mocker.patch.object(APIClient, "login")
+        mocked_get_upload_details = mocker.patch.object(
+            APIClient,
+            "get_upload_details",
+            side_effect=lambda gncv_path: UploadsPostData(
+                id=str(uuid4()),
+                destination_path=gncv_path,
+                last_status={"id": str(uuid4()), "status": "started"},
+                s3={"bucket": "test", "object_name": gncv_path},
+            ),
+        )
+        mocked_s3_client = mocker.patch(
+            "gencove.command.upload.main.get_s3_client_refreshable"
+        ).return_value
+        mocked_part_executor = mocker.patch(
+            "gencove.command.upload.scheduler.PartExecutor",
+            wraps=PartExecutor,
+        )
+
+        res = runner.invoke(
+            upload,
+            [
+                "cli_test_data",
+                "gncv://parallel",
+                "--email",
+                "foo@bar.com",
+                "--password",
+                "123",
+                "--parallel-uploads",
+                "2",
+                "--checksum-manifest",
+                "checksums.jsonl",
+                "--no-progress",
+            ],
+        )
+
+        assert not res.exception
+        assert res.exit_code == 0
+        assert mocked_get_upload_details.call_count == 3
+        mocked_part_executor.assert_called_once()
+        assert mocked_s3_client.put_object.call_count == 3
+        uploaded_keys = set()
+        for call in mocked_s3_client.put_object.call_args_list:
+            assert call[1]["ContentMD5"] == base64.b64encode(
+                hashlib.md5(b"AAABBB").digest()
+            ).decode("ascii")
+            uploaded_keys.add(call[1]["Key"])
+        assert uploaded_keys == {
+            f"gncv://parallel/test{index}.fastq.gz" for index in range(3)
+        }
+        with open("checksums.jsonl", encoding="utf-8") as manifest_file:
+            records = [json.loads(line) for line in manifest_file]
+        assert {record["gncv_path"] for record in records} == uploaded_keys
+        for record in records:
+            assert record["sha256"] == hashlib.sha256(b"AAABBB").hexdigest()
+            assert record["size"] == 6
+        assert "Finished 3 of 3 uploads" in res.output
+        assert "All files were successfully uploaded." in res.output
+        assert "Checksums of uploaded files saved to checksums.jsonl" in res.output
+
+
+def test_upload_preflight_skips_uploaded_files(mocker):
+    """Test that upload details are fetched for every file before uploading
+    and that files that were already uploaded are skipped.
+    """
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        os.mkdir("cli_test_data")
+        for index in range(3):
+            with open(
+                f"cli_test_data/test{index}.fastq.gz", "w", encoding="utf-8"
+            ) as fastq_file:
+                fastq_file.write("AAABBB")
+
+        mocker.patch.object(APIClient, "login")
+        mocked_get_upload_details = mocker.patch.object(
+            APIClient,
+            "get_upload_details",
+            side_effect=lambda gncv_path: UploadsPostData(
+                id=str(uuid4()),
+                destination_path=gncv_path,
+                last_status={
+                    "id": str(uuid4()),
+                    "status": "succeeded" if "test1" in gncv_path else "started",
+                },
+                s3={"bucket": "test", "object_name": gncv_path},
+            ),
+        )
+        mocker.patch("gencove.command.upload.main.get_s3_client_refreshable")
+        mocked_upload_file = mocker.patch("gencove.command.upload.main.upload_file")
+
+        res = runner.invoke(
+            upload,
+            [
+                "cli_test_data",
+                "gncv://preflight",
+                "--email",
+                "foo@bar.com",
+                "--password",
+                "123",
+                "--no-progress",
+            ],
+        )
+
+        assert not res.exception
+        assert res.exit_code == 0
+        assert mocked_get_upload_details.call_count == 3
+        assert {call[1]["file_name"] for call in mocked_upload_file.call_args_list} == {
+            "cli_test_data/test0.fastq.gz",
+            "cli_test_data/test2.fastq.gz",
+        }
+        assert "Checking upload status of 3 files" in res.output
+        assert "1 of 3 files were already uploaded" in res.output
+        assert "File was already uploaded: test1.fastq.gz" in res.output
+
+
+def test_upload_url_imports_in_parallel(mocker):
+    """Test that URL imports of a map file are requested concurrently and
+    that a failed import is reported without stopping the others.
+    """
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        map_file_path = "test_map.fastq-map.csv"
+        with open(map_file_path, "w", encoding="utf-8") as map_file:
+            writer = csv.writer(map_file)
+            writer.writerow(["client_id", "r_notation", "path"])
+            for client_id in ("foo", "bar", "baz"):
+                writer.writerow(
+                    [client_id, "r1", f"https://example.com/{client_id}_R1.fastq.gz"]
+                )
+
+        mocker.patch.object(APIClient, "login")
+        mocker.patch("gencove.command.upload.main.get_s3_client_refreshable")
+        upload_ids = {}
+
+        def import_fastqs_from_url(gncv_file_path, url):
+            if "bar" in url:
+                raise APIClientError("Invalid URL.", 400)
+            upload_ids[url] = str(uuid4())
+            return UploadURLImport(
+                id=upload_ids[url],
+                destination_path=gncv_file_path,
+                source_url=url,
+            )
+
+        mocked_import_fastqs_from_url = mocker.patch.object(
+            APIClient,
+            "import_fastqs_from_url",
+            side_effect=import_fastqs_from_url,
+        )
+        res = runner.invoke(
+            upload,
+            [
+                map_file_path,
+                "gncv://cli-url/",
+                "--email",
+                "foo@bar.com",
+                "--password",
+                "123",
+                "--url-import-workers",
+                "2",
+            ],
+        )
+
+    assert res.exit_code == 1
+    assert mocked_import_fastqs_from_url.call_count == 3
+    assert "client_id\tr_notation\tupload_id" in res.output
+    assert f"foo\tR1\t{upload_ids['https://example.com/foo_R1.fastq.gz']}" in res.output
+    assert "bar\tR1\tfailed: Invalid URL." in res.output
+    assert "1 of 3 URL imports failed" in res.output
+
+
+def test_upload_and_run_immediately_polls_missing_samples(mocker, project_id):
+    """Test that samples are matched as soon as they show up in the sample
+    sheet and that later polls only search for the missing uploads.
+    """
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        os.mkdir("cli_test_data")
+        for index in range(2):
+            with open(
+                f"cli_test_data/test{index}.fastq.gz", "w", encoding="utf-8"
+            ) as fastq_file:
+                fastq_file.write("AAABBB")
+
+        mocker.patch.object(APIClient, "login")
+        mocker.patch("gencove.command.upload.main.get_s3_client_refreshable")
+        mocker.patch("gencove.command.upload.main.upload_file", return_value=True)
+        upload_ids = {}
+
+        def get_upload_details(gncv_path):
+            upload_ids[gncv_path] = str(uuid4())
+            return UploadsPostData(
+                id=upload_ids[gncv_path],
+                destination_path=gncv_path,
+                last_status={"id": str(uuid4()), "status": "started"},
+                s3={"bucket": "test", "object_name": gncv_path},
+            )
+
+        mocker.patch.object(
+            APIClient, "get_upload_details", side_effect=get_upload_details
+        )
+
+        polls = iter(
+            [
+                ["gncv://poll/test0.fastq.gz"],
+                [],
+                ["gncv://poll/test1.fastq.gz"],
+            ]
+        )
+
+        def get_sample_sheet(*args, **kwargs):  # pylint: disable=unused-argument
+            # samples without fastqs are listed too and are skipped
+            return SampleSheet(
+                meta={"next": None},
+                results=[{"client_id": "no-fastqs"}]
+                + [
+                    {
+                        "client_id": gncv_path,
+                        "fastq": {"r1": {"upload": upload_ids[gncv_path]}},
+                    }
+                    for gncv_path in next(polls)
+                ],
+            )
+
+        mocked_get_sample_sheet = mocker.patch.object(
+            APIClient, "get_sample_sheet", side_effect=get_sample_sheet
+        )
+        mocked_sleep = mocker.patch("gencove.command.upload.main.sleep")
+        mocked_assign_sample = mocker.patch.object(
+            APIClient, "add_samples_to_project", return_value=UploadSamples()
+        )
+
+        res = runner.invoke(
+            upload,
+            [
+                "cli_test_data",
+                "gncv://poll",
+                "--email",
+                "foo@bar.com",
+                "--password",
+                "123",
+                "--run-project-id",
+                project_id,
+                "--no-progress",
+            ],
+        )
+
+    assert not res.exception
+    assert res.exit_code == 0
+    searches = [call[0][0] for call in mocked_get_sample_sheet.call_args_list]
+    assert searches == [
+        "gncv://poll/test0.fastq.gz",
+        "gncv://poll/test1.fastq.gz",
+        "gncv://poll/test1.fastq.gz",
+    ]
+    mocked_sleep.assert_called_once_with(1)
+    samples = mocked_assign_sample.call_args[0][0]
+    assert [sample.client_id for sample in samples] == [
+        "gncv://poll/test0.fastq.gz",
+        "gncv://poll/test1.fastq.gz",
+    ]
+
+
+def test_upload_and_run_immediately_resumes_assigning(mocker, project_id):
+    """Test that running the command again after a failed assignment doesn't
+    wait for the uploads assigned by the first run, which have left the
+    unassigned sample sheet, and still reports their samples.
+    """
+    # pylint: disable=too-many-locals
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        os.mkdir("cli_test_data")
+        for index in range(2):
+            with open(
+                f"cli_test_data/test{index}.fastq.gz", "w", encoding="utf-8"
+            ) as fastq_file:
+                fastq_file.write("AAABBB")
+
+        mocker.patch.object(APIClient, "login")
+        mocker.patch("gencove.command.upload.main.get_s3_client_refreshable")
+        mocker.patch("gencove.command.upload.main.upload_file", return_value=True)
+        mocker.patch("gencove.command.utils.ASSIGN_BATCH_SIZE", 1)
+        mocker.patch("gencove.command.utils.ASSIGN_WORKERS", 1)
+        upload_ids = {}
+
+        def get_upload_details(gncv_path):
+            upload_ids.setdefault(gncv_path, str(uuid4()))
+            return UploadsPostData(
+                id=upload_ids[gncv_path],
+                destination_path=gncv_path,
+                last_status={"id": str(uuid4()), "status": "started"},
+                s3={"bucket": "test", "object_name": gncv_path},
+            )
+
+        mocker.patch.object(
+            APIClient, "get_upload_details", side_effect=get_upload_details
+        )
+        assigned = []
+
+        def get_sample_sheet(gncv_path, *args, **kwargs):
+            # pylint: disable=unused-argument
+            return SampleSheet(
+                meta={"next": None},
+                results=[
+                    {
+                        "client_id": path,
+                        "fastq": {"r1": {"upload": upload_id}},
+                    }
+                    for path, upload_id in upload_ids.items()
+                    if path.startswith(gncv_path) and path not in assigned
+                ],
+            )
+
+        mocked_get_sample_sheet = mocker.patch.object(
+            APIClient, "get_sample_sheet", side_effect=get_sample_sheet
+        )
+        failures = [APIClientError(message="", status_code=400)]
+
+        def add_samples_to_project(samples, *args, **kwargs):
+            # pylint: disable=unused-argument
+            if assigned and failures:
+                raise failures.pop()
+            assigned.extend(sample.client_id for sample in samples)
+            return UploadSamples(
+                uploads=[
+                    {"client_id": sample.client_id, "sample": str(uuid4())}
+                    for sample in samples
+                ]
+            )
+
+        mocker.patch.object(
+            APIClient, "add_samples_to_project", side_effect=add_samples_to_project
+        )
+        mocked_sleep = mocker.patch("gencove.command.upload.main.sleep")
+        args = [
+            "cli_test_data",
+            "gncv://resume",
+            "--email",
+            "foo@bar.com",
+            "--password",
+            "123",
+            "--run-project-id",
+            project_id,
+            "--no-progress",
+            "--output",
+            "output.json",
+        ]
+
+        res = runner.invoke(upload, args)
+        assert res.exit_code == 1
+        assert len(assigned) == 1
+        assert "Run the command again" in res.output
+
+        mocked_get_sample_sheet.reset_mock()
+        res = runner.invoke(upload, args)
+        assert res.exit_code == 0
+        assert "Skipping 1 uploads assigned by a previous run" in res.output
+        searches = [call[0][0] for call in mocked_get_sample_sheet.call_args_list]
+        assert searches == [path for path in upload_ids if path not in assigned[:1]]
+        mocked_sleep.assert_not_called()
+        assert sorted(assigned) == sorted(upload_ids)
+        with open("output.json", encoding="utf-8") as output_file:
+            output = json.load(output_file)
+        assert sorted(sample["client_id"] for sample in output) == sorted(upload_ids)
+
+
+def test_upload_and_run_immediately_missing_samples_time_out(mocker, project_id):
+    """Test that uploads that never show up in the sample sheet are reported
+    once polling gives up, and that nothing is assigned.
+    """
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        os.mkdir("cli_test_data")
+        with open("cli_test_data/test.fastq.gz", "w", encoding="utf-8") as fastq_file:
+            fastq_file.write("AAABBB")
+
+        mocker.patch.object(APIClient, "login")
+        mocker.patch("gencove.command.upload.main.get_s3_client_refreshable")
+        mocker.patch("gencove.command.upload.main.upload_file", return_value=True)
+        mocker.patch.object(
+            APIClient,
+            "get_upload_details",
+            side_effect=lambda gncv_path: UploadsPostData(
+                id=str(uuid4()),
+                destination_path=gncv_path,
+                last_status={"id": str(uuid4()), "status": "started"},
+                s3={"bucket": "test", "object_name": gncv_path},
+            ),
+        )
+        mocker.patch.object(
+            APIClient,
+            "get_sample_sheet",
+            return_value=SampleSheet(
+                meta={"next": None}, results=[{"client_id": "no-fastqs"}]
+            ),
+        )
+        mocked_sleep = mocker.patch("gencove.command.upload.main.sleep")
+        mocked_assign_sample = mocker.patch.object(APIClient, "add_samples_to_project")
+
+        res = runner.invoke(
+            upload,
+            [
+                "cli_test_data",
+                "gncv://timeout",
+                "--email",
+                "foo@bar.com",
+                "--password",
+                "123",
+                "--run-project-id",
+                project_id,
+                "--no-progress",
+            ],
+        )
+
+    assert res.exit_code == 1
+    assert mocked_sleep.called
+    assert "No samples were found for 1 uploads" in res.output
+    assert "gncv://timeout/test.fastq.gz" in res.output
+    mocked_assign_sample.assert_not_called()
+
+
+def test_upload_validate_fastqs(mocker, project_id):
+    """Test that FASTQ files are validated while uploading and that nothing
+    is assigned when R1 and R2 have different numbers of reads.
+    """
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        os.mkdir("cli_test_data")
+        for r_notation, reads in (("R1", 2), ("R2", 1)):
+            with gzip.open(
+                f"cli_test_data/sample_{r_notation}.fastq.gz", "wb"
+            ) as fastq_file:
+                fastq_file.write(b"@read\nACGT\n+\nIIII\n" * reads)
+
+        mocker.patch.object(APIClient, "login")
+        mocker.patch("gencove.command.upload.main.get_s3_client_refreshable")
+        mocker.patch.object(
+            APIClient,
+            "get_upload_details",
+            side_effect=lambda gncv_path: UploadsPostData(
+                id=str(uuid4()),
+                destination_path=gncv_path,
+                last_status={"id": str(uuid4()), "status": "started"},
+                s3={"bucket": "test", "object_name": gncv_path},
+            ),
+        )
+        mocked_upload_file = mocker.patch(
+            "gencove.command.upload.main.upload_file", return_value=True
+        )
+        mocked_get_sample_sheet = mocker.patch.object(APIClient, "get_sample_sheet")
+
+        res = runner.invoke(
+            upload,
+            [
+                "cli_test_data",
+                "gncv://validate",
+                "--email",
+                "foo@bar.com",
+                "--password",
+                "123",
+                "--run-project-id",
+                project_id,
+                "--validate-fastqs",
+                "--no-progress",
+            ],
+        )
+
+    assert res.exit_code == 1
+    assert mocked_upload_file.call_count == 2
+    mocked_get_sample_sheet.assert_not_called()
+    assert "Validating 2 FASTQ files" in res.output
+    assert "sample_R1.fastq.gz has 2 reads but sample_R2.fastq.gz has 1" in res.output
@@ -0,0 +1,89 @@
+"""Tests for the reader that concatenates several files."""
+# pylint: disable=import-error
+
+import os
+
+from click.testing import CliRunner
+
+from gencove.command.upload.multi_file_reader import MultiFileReader
+
+import pytest  # pylint: disable=wrong-import-order
+
+CONTENTS = [b"AAAA", b"", b"CCCCCC", b"GG"]
+
+
+def _write_files():
+    paths = []
+    for index, content in enumerate(CONTENTS):
+        path = f"lane{index}.fastq.gz"
+        with open(path, "wb") as lane_file:
+            lane_file.write(content)
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize("read_ahead", [False, True])
+def test_multi_file_reader_read(read_ahead):
+    """Chunks span file boundaries and reading stops at the end."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with MultiFileReader(
+            _write_files(), read_ahead=read_ahead, buffer_size=3
+        ) as reader:
+            assert reader.get_size() == 12
+            assert reader.read(3) == b"AAA"
+            assert reader.read(5) == b"ACCCC"
+            assert reader.tell() == 8
+            assert reader.read() == b"CCGG"
+            assert reader.read(10) == b""
+
+
+@pytest.mark.parametrize("read_ahead", [False, True])
+def test_multi_file_reader_readinto(read_ahead):
+    """Data is read into a reused buffer."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        buffer = bytearray(5)
+        chunks = []
+        with MultiFileReader(
+            _write_files(), read_ahead=read_ahead, buffer_size=4
+        ) as reader:
+            while True:
+                length = reader.readinto(buffer)
+                if not length:
+                    break
+                chunks.append(bytes(buffer[:length]))
+        assert chunks == [b"AAAAC", b"CCCCC", b"GG"]
+
+
+@pytest.mark.parametrize("read_ahead", [False, True])
+def test_multi_file_reader_seek(read_ahead):
+    """Seeking allows a part to be read again from its own offset."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with MultiFileReader(
+            _write_files(), read_ahead=read_ahead, buffer_size=2
+        ) as reader:
+            assert reader.seekable()
+            assert reader.seek(0, os.SEEK_END) == 12
+            assert reader.seek(2) == 2
+            assert reader.read(4) == b"AACC"
+            assert reader.seek(-4, os.SEEK_CUR) == 2
+            assert reader.read(4) == b"AACC"
+            assert reader.seek(-2, os.SEEK_END) == 10
+            assert reader.read() == b"GG"
+            with pytest.raises(ValueError):
+                reader.seek(-1)
+
+
+def test_multi_file_reader_truncated_file():
+    """A file shrinking during the upload is reported."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        paths = _write_files()
+        reader = MultiFileReader(paths)
+        with open(paths[0], "wb") as lane_file:
+            lane_file.write(b"AA")
+        with pytest.raises(IOError):
+            reader.read()
+        reader.close()
@@ -0,0 +1,413 @@
+"""Tests for resumable multipart uploads."""
+# pylint: disable=import-error
+
+import base64
+import hashlib
+import json
+import threading
+from types import SimpleNamespace
+
+from botocore.exceptions import ClientError
+
+from click.testing import CliRunner
+
+from gencove.command.upload.constants import (
+    AUTO_INITIAL_CONCURRENCY,
+    AUTO_MAX_CONCURRENCY,
+    AUTO_MIN_CONCURRENCY,
+    MAX_AUTO_PART_SIZE,
+    MIN_PART_SIZE,
+)
+from gencove.command.upload.journal import UploadJournal
+from gencove.command.upload.manifest import ChecksumManifest
+from gencove.command.upload.multipart import (
+    BufferReader,
+    PartExecutor,
+    ResumableUpload,
+    get_md5,
+    get_part_size,
+)
+from gencove.utils import GB, MB
+
+import pytest  # pylint: disable=wrong-import-order
+
+GNCV_PATH = "gncv://cli-test/sample_R1.fastq.gz"
+
+
+def _mock_s3_client(mocker, uploaded_parts=None, fail_part=None):
+    """S3 client mock that records the body of every uploaded part."""
+    s3_client = mocker.Mock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "new-upload"}
+    s3_client.list_parts.return_value = {"Parts": uploaded_parts or []}
+    bodies = {}
+
+    def upload_part(**kwargs):
+        if kwargs["PartNumber"] == fail_part:
+            raise ClientError({"Error": {"Code": "500"}}, "UploadPart")
+        bodies[kwargs["PartNumber"]] = kwargs["Body"].read()
+        return {"ETag": f"etag{kwargs['PartNumber']}"}
+
+    s3_client.upload_part.side_effect = upload_part
+    return s3_client, bodies
+
+
+def _write_files():
+    with open("lane1.fastq.gz", "wb") as lane_file:
+        lane_file.write(b"AAAAAA")
+    with open("lane2.fastq.gz", "wb") as lane_file:
+        lane_file.write(b"CCCC")
+    return ["lane1.fastq.gz", "lane2.fastq.gz"]
+
+
+def test_resumable_upload_new(mocker):
+    """Parts are uploaded, completed in order and the journal is cleared."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        files = _write_files()
+        journal = UploadJournal("journal")
+        s3_client, bodies = _mock_s3_client(mocker)
+        progress = []
+
+        ResumableUpload(
+            s3_client,
+            files,
+            "bucket",
+            "key",
+            journal.entry(GNCV_PATH),
+            part_size=4,
+            callback=progress.append,
+        ).run(max_concurrency=2)
+
+        assert bodies == {1: b"AAAA", 2: b"AACC", 3: b"CC"}
+        assert sum(progress) == 10
+        s3_client.complete_multipart_upload.assert_called_once_with(
+            Bucket="bucket",
+            Key="key",
+            UploadId="new-upload",
+            MultipartUpload={
+                "Parts": [
+                    {"ETag": "etag1", "PartNumber": 1},
+                    {"ETag": "etag2", "PartNumber": 2},
+                    {"ETag": "etag3", "PartNumber": 3},
+                ]
+            },
+        )
+        assert journal.load(GNCV_PATH) is None
+
+
+def test_resumable_upload_failure_keeps_journal(mocker):
+    """A failed upload leaves its UploadId and completed parts behind."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        files = _write_files()
+        journal = UploadJournal("journal")
+        s3_client, _ = _mock_s3_client(mocker, fail_part=2)
+
+        with pytest.raises(ClientError):
+            ResumableUpload(
+                s3_client,
+                files,
+                "bucket",
+                "key",
+                journal.entry(GNCV_PATH),
+                part_size=4,
+            ).run(max_concurrency=1)
+
+        state = journal.load(GNCV_PATH)
+        assert state["upload_id"] == "new-upload"
+        assert state["parts"]["1"] == "etag1"
+        assert "2" not in state["parts"]
+        s3_client.complete_multipart_upload.assert_not_called()
+
+
+def test_resumable_upload_resumes(mocker):
+    """Only the parts S3 doesn't have are sent when resuming."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        files = _write_files()
+        journal = UploadJournal("journal")
+        upload = ResumableUpload(
+            mocker.Mock(), files, "bucket", "key", journal.entry(GNCV_PATH), 4
+        )
+        journal.entry(GNCV_PATH).start("old-upload", upload.source)
+        s3_client, bodies = _mock_s3_client(
+            mocker,
+            uploaded_parts=[
+                {"PartNumber": 1, "ETag": "old1", "Size": 4},
+                # partially written parts are sent again
+                {"PartNumber": 3, "ETag": "old3", "Size": 1},
+            ],
+        )
+        progress = []
+
+        ResumableUpload(
+            s3_client,
+            files,
+            "bucket",
+            "key",
+            journal.entry(GNCV_PATH),
+            part_size=4,
+            callback=progress.append,
+        ).run(max_concurrency=2)
+
+        s3_client.create_multipart_upload.assert_not_called()
+        assert bodies == {2: b"AACC", 3: b"CC"}
+        assert sum(progress) == 10
+        parts = s3_client.complete_multipart_upload.call_args[1]["MultipartUpload"]
+        assert parts["Parts"][0] == {"ETag": "old1", "PartNumber": 1}
+        assert s3_client.complete_multipart_upload.call_args[1]["UploadId"] == (
+            "old-upload"
+        )
+
+
+def test_resumable_upload_changed_files_start_over(mocker):
+    """An upload of files that changed since is aborted and started again."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        files = _write_files()
+        journal = UploadJournal("journal")
+        upload = ResumableUpload(
+            mocker.Mock(), files, "bucket", "key", journal.entry(GNCV_PATH), 4
+        )
+        journal.entry(GNCV_PATH).start("old-upload", upload.source)
+        with open(files[1], "ab") as lane_file:
+            lane_file.write(b"GG")
+        s3_client, bodies = _mock_s3_client(mocker)
+
+        ResumableUpload(
+            s3_client, files, "bucket", "key", journal.entry(GNCV_PATH), 4
+        ).run()
+
+        s3_client.abort_multipart_upload.assert_called_once_with(
+            Bucket="bucket", Key="key", UploadId="old-upload"
+        )
+        s3_client.list_parts.assert_not_called()
+        assert b"".join(bodies[number] for number in sorted(bodies)) == (
+            b"AAAAAACCCCGG"
+        )
+
+
+def test_upload_checksums(mocker):
+    """Checksums come from the data that is sent and are saved."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        files = _write_files()
+        journal = UploadJournal("journal")
+        manifest = ChecksumManifest("checksums.jsonl")
+        s3_client, bodies = _mock_s3_client(mocker)
+
+        upload = ResumableUpload(
+            s3_client,
+            files,
+            "bucket",
+            "key",
+            journal.entry(GNCV_PATH),
+            part_size=4,
+            manifest=manifest,
+        )
+        upload.run()
+
+        assert upload.sha256 == hashlib.sha256(b"AAAAAACCCC").hexdigest()
+        for call in s3_client.upload_part.call_args_list:
+            part_md5 = hashlib.md5(bodies[call[1]["PartNumber"]]).digest()
+            assert call[1]["ContentMD5"] == base64.b64encode(part_md5).decode()
+        with open("checksums.jsonl", encoding="utf-8") as manifest_file:
+            (record,) = [json.loads(line) for line in manifest_file]
+        assert record["gncv_path"] == GNCV_PATH
+        assert record["sha256"] == upload.sha256
+        assert record["size"] == 10
+        assert record["parts_md5"] == [
+            hashlib.md5(data).hexdigest() for data in (b"AAAA", b"AACC", b"CC")
+        ]
+
+
+def test_upload_single_part(mocker):
+    """Data that fits in one part is streamed from the files in a single
+    request, after it was checksummed in small chunks.
+    """
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        files = _write_files()
+        journal = UploadJournal("journal")
+        manifest = ChecksumManifest("checksums.jsonl")
+        s3_client, _ = _mock_s3_client(mocker)
+        mocker.patch("gencove.command.upload.multipart.HASH_CHUNK_SIZE", 3)
+        bodies = []
+        s3_client.put_object.side_effect = lambda **kwargs: bodies.append(
+            (kwargs["Body"].read(), kwargs["ContentMD5"])
+        )
+        progress = []
+
+        upload = ResumableUpload(
+            s3_client,
+            files,
+            "bucket",
+            "key",
+            journal.entry(GNCV_PATH),
+            callback=progress.append,
+            manifest=manifest,
+        )
+        upload.run()
+
+        s3_client.create_multipart_upload.assert_not_called()
+        body = s3_client.put_object.call_args[1]["Body"]
+        # pylint: disable=protected-access
+        assert not isinstance(body._fileobj, BufferReader)
+        assert bodies == [
+            (
+                b"AAAAAACCCC",
+                base64.b64encode(hashlib.md5(b"AAAAAACCCC").digest()).decode("ascii"),
+            )
+        ]
+        assert upload.sha256 == hashlib.sha256(b"AAAAAACCCC").hexdigest()
+        assert upload.parts_md5 == [hashlib.md5(b"AAAAAACCCC").hexdigest()]
+        assert sum(progress) == 10
+        assert journal.load(GNCV_PATH) is None
+
+
+@pytest.mark.parametrize(
+    "size,part_size,expected",
+    [
+        (200 * MB, None, MIN_PART_SIZE),
+        (2 * GB, None, 32 * MB),
+        (40 * GB, None, MAX_AUTO_PART_SIZE),
+        # S3 allows at most 10000 parts
+        (1000 * GB, None, 1000 * GB // 10000 + 1),
+        (2 * GB, 16 * MB, 16 * MB),
+    ],
+)
+def test_get_part_size(size, part_size, expected):
+    """Part size follows the file size unless it is requested."""
+    assert get_part_size(size, part_size) == expected
+
+
+@pytest.mark.parametrize(
+    "request_rate,expected",
+    [
+        (0.5 * MB, MIN_PART_SIZE),
+        (2 * MB, 20 * MB),
+        (100 * MB, MAX_AUTO_PART_SIZE),
+    ],
+)
+def test_get_part_size_from_request_rate(request_rate, expected):
+    """Parts take about the same time to send once the rate is measured."""
+    assert get_part_size(2 * GB, request_rate=request_rate) == expected
+
+
+def test_resumable_upload_adapts_part_size(mocker):
+    """Part size follows the measured rate, except for resumed uploads."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        files = _write_files()
+        journal = UploadJournal("journal")
+        executor = SimpleNamespace(request_rate=2 * MB)
+        # pylint: disable=protected-access
+        upload = ResumableUpload(
+            mocker.Mock(), files, "bucket", "key", journal.entry(GNCV_PATH)
+        )
+        upload._adapt_part_size(executor)
+        assert upload.part_size == 20 * MB
+
+        started = ResumableUpload(
+            mocker.Mock(), files, "bucket", "key", journal.entry(GNCV_PATH), 4
+        )
+        journal.entry(GNCV_PATH).start("old-upload", started.source)
+        upload = ResumableUpload(
+            mocker.Mock(), files, "bucket", "key", journal.entry(GNCV_PATH)
+        )
+        upload._adapt_part_size(executor)
+        assert upload.part_size == 4
+        assert upload.num_parts == 3
+
+
+def test_part_executor_measures_requests(mocker):
+    """The rate of part requests is measured for the next uploads."""
+    mocked_time = mocker.patch(
+        "gencove.command.upload.multipart.time.monotonic", return_value=100
+    )
+    executor = PartExecutor(max_concurrency=1)
+    try:
+
+        def send():
+            mocked_time.return_value += 2
+
+        executor.submit(send, executor.reserve(4 * MB)).result()
+        assert executor.request_rate == 2 * MB
+        executor.submit(send, executor.reserve(8 * MB)).result()
+        assert executor.request_rate == 3 * MB
+    finally:
+        executor.shutdown()
+
+
+def test_part_executor_tune():
+    """Concurrency climbs while throughput improves and backs off after."""
+    executor = PartExecutor()
+    try:
+        assert executor.adaptive
+        assert executor.concurrency == AUTO_INITIAL_CONCURRENCY
+        executor.tune(10 * MB)
+        executor.tune(20 * MB)
+        assert executor.concurrency == AUTO_INITIAL_CONCURRENCY + 2
+        # small changes are noise
+        executor.tune(21 * MB)
+        assert executor.concurrency == AUTO_INITIAL_CONCURRENCY + 2
+        executor.tune(10 * MB)
+        assert executor.concurrency == AUTO_INITIAL_CONCURRENCY + 1
+        # going down keeps paying off, down to the minimum
+        for step in range(AUTO_MAX_CONCURRENCY):
+            executor.tune(2**step * 20 * MB)
+        assert executor.concurrency == AUTO_MIN_CONCURRENCY
+    finally:
+        executor.shutdown()
+
+
+def test_part_executor_fixed_concurrency():
+    """A requested concurrency bounds the parts in flight and isn't tuned."""
+    executor = PartExecutor(max_concurrency=1)
+    buffers = []
+    try:
+        assert not executor.adaptive
+        buffers.append(executor.reserve(4))
+        buffers.append(executor.reserve(4))
+        blocked = threading.Thread(target=lambda: buffers.append(executor.reserve(4)))
+        blocked.start()
+        blocked.join(timeout=0.1)
+        assert blocked.is_alive()
+        executor.release(buffers.pop(0))
+        blocked.join(timeout=1)
+        assert not blocked.is_alive()
+        executor.tune(10 * MB)
+        assert executor.concurrency == 1
+    finally:
+        for buffer in buffers:
+            executor.release(buffer)
+        executor.shutdown()
+
+
+def test_part_executor_reuses_buffers():
+    """Parts are read into the buffers of released reservations."""
+    executor = PartExecutor(max_concurrency=1)
+    try:
+        buffer = executor.reserve(8)
+        executor.release(buffer)
+        smaller = executor.reserve(4)
+        assert len(smaller) == 4
+        assert smaller.obj is buffer.obj
+        executor.release(smaller)
+        larger = executor.reserve(16)
+        assert len(larger) == 16
+        executor.release(larger)
+    finally:
+        executor.shutdown()
+
+
+def test_get_md5_without_usedforsecurity(mocker):
+    """MD5 falls back to hashlib without usedforsecurity support."""
+    md5 = hashlib.md5
+
+    def old_md5(data=b""):
+        return md5(data)
+
+    mocker.patch("gencove.command.upload.multipart.hashlib.md5", side_effect=old_md5)
+
+    assert get_md5(memoryview(b"AAAA")).hexdigest() == md5(b"AAAA").hexdigest()
@@ -0,0 +1,81 @@
+"""Tests for the concurrent upload scheduler."""
+# pylint: disable=import-error
+
+import threading
+import time
+
+from gencove.command.upload.scheduler import UploadScheduler
+
+import pytest  # pylint: disable=wrong-import-order
+
+
+def test_scheduler_single_job_runs_inline(mocker):
+    """A single job is uploaded in the calling thread with its own progress."""
+    mocked_part_executor = mocker.patch("gencove.command.upload.scheduler.PartExecutor")
+    calls = []
+
+    def upload_func(job, transfer_kwargs):
+        calls.append((job, transfer_kwargs, threading.current_thread()))
+        return job.upper()
+
+    scheduler = UploadScheduler(parallel_uploads=4)
+    assert scheduler.run(upload_func, [("foo", 3, "foo")]) == ["FOO"]
+    assert calls == [("foo", {"no_progress": False}, threading.current_thread())]
+    mocked_part_executor.assert_not_called()
+
+
+def test_scheduler_runs_jobs_concurrently(mocker):
+    """Jobs share one part executor and results keep the job order."""
+    mocked_part_executor = mocker.patch("gencove.command.upload.scheduler.PartExecutor")
+    mocked_progress_bar = mocker.patch(
+        "gencove.command.upload.scheduler.get_progress_bar"
+    )
+    mocked_progress_bar.return_value.max_value = 6
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def upload_func(job, transfer_kwargs):
+        assert transfer_kwargs["no_progress"]
+        assert transfer_kwargs["part_executor"] is mocked_part_executor.return_value
+        with lock:
+            in_flight.append(job)
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.05)
+        transfer_kwargs["callback"](1)
+        with lock:
+            in_flight.remove(job)
+        return job
+
+    jobs = [(f"job{index}", 2, f"job{index}") for index in range(3)]
+    scheduler = UploadScheduler(parallel_uploads=2)
+
+    assert scheduler.run(upload_func, jobs) == ["job0", "job1", "job2"]
+    assert max(max_in_flight) == 2
+    mocked_part_executor.assert_called_once_with(scheduler.max_concurrency)
+    mocked_part_executor.return_value.shutdown.assert_called_once()
+    mocked_progress_bar.assert_called_once_with(6, "Uploading: ")
+    # unreported bytes are accounted for once each job finishes
+    mocked_progress_bar.return_value.update.assert_called_with(6)
+    mocked_progress_bar.return_value.finish.assert_called_once()
+
+
+def test_scheduler_stops_scheduling_after_failure(mocker):
+    """Jobs that haven't started are skipped once an upload fails."""
+    mocked_part_executor = mocker.patch("gencove.command.upload.scheduler.PartExecutor")
+    started = []
+
+    def upload_func(job, transfer_kwargs):  # pylint: disable=unused-argument
+        started.append(job)
+        if job == "job0":
+            raise ValueError("Upload failed")
+        time.sleep(0.05)
+        return job
+
+    jobs = [(f"job{index}", 1, f"job{index}") for index in range(10)]
+    scheduler = UploadScheduler(parallel_uploads=2, no_progress=True)
+
+    with pytest.raises(ValueError):
+        scheduler.run(upload_func, jobs)
+    assert len(started) < len(jobs)
+    mocked_part_executor.return_value.shutdown.assert_called_once()
@@ -0,0 +1,120 @@
+"""Tests for FASTQ integrity validation."""
+# pylint: disable=import-error
+
+import gzip
+import struct
+import zlib
+
+from click.testing import CliRunner
+
+from gencove.command.upload.exceptions import FastqIntegrityError
+from gencove.command.upload.validation import (
+    BGZF_EOF,
+    FastqValidator,
+    count_reads,
+    get_pair,
+)
+from gencove.exceptions import ValidationError
+
+import pytest  # pylint: disable=wrong-import-order
+
+
+def _reads(count, start=0):
+    return b"".join(
+        b"@read%d\nACGT\n+\nIIII\n" % index for index in range(start, start + count)
+    )
+
+
+def _bgzf_block(data):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    deflated = compressor.compress(data) + compressor.flush()
+    header = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+    block_size = len(header) + 2 + len(deflated) + 8
+    return (
+        header
+        + struct.pack("<H", block_size - 1)
+        + deflated
+        + struct.pack("<II", zlib.crc32(data), len(data))
+    )
+
+
+def test_count_reads():
+    """Reads of all the files of an upload are counted."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with gzip.open("lane1.fastq.gz", "wb") as fastq_file:
+            fastq_file.write(_reads(3))
+        with gzip.open("lane2.fastq.gz", "wb") as fastq_file:
+            fastq_file.write(_reads(2, 3).rstrip(b"\n"))
+
+        assert count_reads(["lane1.fastq.gz", "lane2.fastq.gz"], chunk_size=7) == 5
+
+
+def test_count_reads_bgzf():
+    """BGZF files are read block by block and must end with the EOF block."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        blocks = _bgzf_block(_reads(2)) + _bgzf_block(_reads(2, 2))
+        with open("complete.fastq.bgz", "wb") as fastq_file:
+            fastq_file.write(blocks + BGZF_EOF)
+        with open("truncated.fastq.bgz", "wb") as fastq_file:
+            fastq_file.write(blocks)
+
+        assert count_reads(["complete.fastq.bgz"]) == 4
+        with pytest.raises(FastqIntegrityError, match="end-of-file block"):
+            count_reads(["truncated.fastq.bgz"])
+
+
+@pytest.mark.parametrize(
+    "content,error",
+    [
+        (gzip.compress(_reads(2))[:-10], "end-of-stream"),
+        (gzip.compress(_reads(2))[:-8] + b"\x00" * 8, "CRC check failed"),
+        (gzip.compress(_reads(2)[:-5]), "incomplete"),
+        (gzip.compress(b">fasta\nACGT\n"), "not in FASTQ format"),
+        (gzip.compress(b""), "no reads"),
+        (b"plain text", "Not a gzipped file"),
+    ],
+    ids=["truncated", "crc", "incomplete", "fasta", "empty", "plain"],
+)
+def test_count_reads_errors(content, error):
+    """Corrupted, truncated and malformed files are reported."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        with open("sample_R1.fastq.gz", "wb") as fastq_file:
+            fastq_file.write(content)
+
+        with pytest.raises(FastqIntegrityError, match=error):
+            count_reads(["sample_R1.fastq.gz"])
+
+
+@pytest.mark.parametrize(
+    "path,pair",
+    [
+        ("sample_R1.fastq.gz", ("sample.fastq.gz", "R1")),
+        ("dir/sample_S1_r2_001.fq.bgz", ("dir/sample_S1_001.fq.bgz", "R2")),
+        ("sample.fastq.gz", None),
+    ],
+)
+def test_get_pair(path, pair):
+    """Files of a pair share the sample part of their names."""
+    assert get_pair(path) == pair
+
+
+def test_validator_compares_pairs():
+    """R1 and R2 files with different numbers of reads are reported."""
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        for name, count in (("a_R1", 2), ("a_R2", 2), ("b_R1", 2), ("b_R2", 1)):
+            with gzip.open(f"{name}.fastq.gz", "wb") as fastq_file:
+                fastq_file.write(_reads(count))
+
+        validator = FastqValidator(workers=2)
+        validator.start(
+            [
+                (name, [f"{name}.fastq.gz"], get_pair(f"{name}.fastq.gz"))
+                for name in ("a_R1", "a_R2", "b_R1", "b_R2")
+            ]
+        )
+        with pytest.raises(ValidationError, match="found 1 problems"):
+            validator.wait()
@@ -39,3 +39,35 @@ def get_response_from_vcr_dict(vcr_dict: dict) -> Response:
     response.headers = CaseInsensitiveDict(vcr_dict["headers"])
     response._content = vcr_dict["body"]["string"]  # pylint: disable=protected-access
     return response
+
+
+class MockRangeResponse:
+    """Streaming response of `content`, or of the byte range requested."""
+
+    def __init__(self, content, headers=None, etag="etag"):
+        self.headers = CaseInsensitiveDict(
+            {"content-length": str(len(content)), "etag": etag}
+        )
+        self.status_code = 200
+        self.content = content
+        if headers and "Range" in headers:
+            start, end = map(int, headers["Range"].partition("=")[2].split("-"))
+            self.content = content[start:][: end - start + 1]
+            self.status_code = 206
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def raise_for_status(self):
+        """Successful responses only."""
+
+    def iter_content(self, chunk_size):
+        """Stream the content in chunks."""
+        for index in range(0, len(self.content), chunk_size):
+            yield self.content[index:][:chunk_size]
+
+    def close(self):
+        """Nothing to release."""
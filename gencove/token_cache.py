@@ -0,0 +1,111 @@
+"""On-disk cache of the JWTs of users who log in with email and password."""
+import base64
+import json
+import os
+import threading
+import time
+
+from gencove.constants import TOKEN_REFRESH_MARGIN
+from gencove.logger import echo_debug
+
+
+def is_token_cache_enabled():
+    """Whether tokens are cached, which is opted into with $GENCOVE_TOKEN_CACHE."""
+    return os.environ.get("GENCOVE_TOKEN_CACHE", "").lower() in ("1", "true", "yes")
+
+
+def get_jwt_expiry(token):
+    """Expiry of a JWT, read from its payload without verifying it.
+
+    Args:
+        token (str): JWT
+
+    Returns:
+        int: `exp` claim as a Unix timestamp, None if the token has none
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        expiry = json.loads(base64.urlsafe_b64decode(payload))["exp"]
+        return int(expiry)
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def is_jwt_valid(token, margin=TOKEN_REFRESH_MARGIN):
+    """Whether a JWT is valid for at least `margin` more seconds."""
+    expiry = get_jwt_expiry(token)
+    return expiry is not None and expiry - margin > time.time()
+
+
+class TokenCache:
+    """Access and refresh JWTs of each host and user, kept between runs.
+
+    Tokens are saved in a single JSON file that only the user can read,
+    replaced atomically so concurrent invocations never read a partial
+    file. A cache that can't be read or written is ignored, which only
+    means logging in again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(host, email):
+        return f"{host.rstrip('/')} {email.strip().lower()}"
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                tokens = json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as err:
+            echo_debug(f"Ignoring unreadable token cache {self.path}: {err}")
+            return {}
+        return tokens if isinstance(tokens, dict) else {}
+
+    def _write(self, tokens):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            file_descriptor = os.open(
+                tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+            )
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as cache_file:
+                json.dump(tokens, cache_file)
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            echo_debug(f"Failed to save token cache {self.path}: {err}")
+
+    def load(self, host, email):
+        """Load the tokens of a user.
+
+        Args:
+            host (str): API host the tokens were issued by
+            email (str): email of the user
+
+        Returns:
+            tuple: access and refresh token, None if there are none
+        """
+        entry = self._read().get(self._key(host, email))
+        if not isinstance(entry, dict) or not entry.get("refresh"):
+            return None
+        return entry.get("access"), entry["refresh"]
+
+    def save(self, host, email, access, refresh):
+        """Replace the tokens of a user."""
+        with self._lock:
+            tokens = self._read()
+            tokens[self._key(host, email)] = {"access": access, "refresh": refresh}
+            self._write(tokens)
+
+    def remove(self, host, email):
+        """Forget the tokens of a user, usually when they were rejected."""
+        with self._lock:
+            tokens = self._read()
+            if tokens.pop(self._key(host, email), None) is not None:
+                self._write(tokens)
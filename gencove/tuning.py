@@ -0,0 +1,80 @@
+"""Tuning of the number of transfers in flight from their throughput."""
+import time
+
+from gencove.constants import AUTO_TUNE_INTERVAL, AUTO_TUNE_TOLERANCE
+from gencove.logger import echo_debug
+from gencove.utils import MB
+
+
+class ThroughputTuner:
+    """Number of transfers in flight, tuned from the measured throughput.
+
+    Transferred bytes are measured over intervals of `AUTO_TUNE_INTERVAL`
+    seconds. The value keeps moving in the same direction while the
+    throughput improves, turns around when it drops, and stays put while it
+    changes by less than `AUTO_TUNE_TOLERANCE`.
+
+    The tuner isn't thread safe, callers hold their own lock.
+    """
+
+    def __init__(self, value, minimum, maximum, name):
+        self.value = value
+        self.minimum = minimum
+        self.maximum = maximum
+        self.name = name
+        self._direction = 1
+        self._last_rate = None
+        self._window_bytes = 0
+        self._window_start = time.monotonic()
+
+    def transferred(self, amount):
+        """Measure transferred bytes, tuning once an interval is over.
+
+        Args:
+            amount (int): bytes transferred
+
+        Returns:
+            bool: whether the interval was over and the value was tuned
+        """
+        self._window_bytes += amount
+        elapsed = time.monotonic() - self._window_start
+        if elapsed < AUTO_TUNE_INTERVAL:
+            return False
+        self.tune(self._window_bytes / elapsed)
+        self._window_bytes = 0
+        self._window_start = time.monotonic()
+        return True
+
+    def tune(self, rate):
+        """Adjust the value to the throughput of the last interval.
+
+        Args:
+            rate (float): bytes per second transferred during the interval
+        """
+        step = 0
+        if self._last_rate is None or rate > self._last_rate * (
+            1 + AUTO_TUNE_TOLERANCE
+        ):
+            step = self._direction
+        elif rate < self._last_rate * (1 - AUTO_TUNE_TOLERANCE):
+            self._direction = -self._direction
+            step = self._direction
+        self._last_rate = rate
+        self._set(self.value + step, f"{rate / MB:.1f} MB/s")
+
+    def reset(self, value, reason):
+        """Start tuning over from a value, e.g. after transfers failed.
+
+        Args:
+            value (int): new value, kept within the bounds
+            reason (str): why the value changed, for the debug log
+        """
+        self._last_rate = None
+        self._direction = 1
+        self._set(value, reason)
+
+    def _set(self, value, reason):
+        value = min(max(value, self.minimum), self.maximum)
+        if value != self.value:
+            echo_debug(f"{self.name}: {reason}, {self.value} -> {value}")
+            self.value = value
@@ -16,8 +16,10 @@ from gencove.client import APIClientError  # noqa: I100
 from gencove.constants import (
     MINIMUM_SUPPORTED_PYTHON_MAJOR,
     MINIMUM_SUPPORTED_PYTHON_MINOR,
+    TOKEN_CACHE_FILE,
 )
 from gencove.logger import echo_debug, echo_error, echo_info, echo_warning
+from gencove.token_cache import TokenCache, is_token_cache_enabled
 
 KB = 1024
 MB = KB * 1024
@@ -25,6 +27,7 @@ GB = MB * 1024
 NUM_MB_IN_CHUNK = 100
 CHUNK_SIZE = NUM_MB_IN_CHUNK * MB
 FILENAME_RE = re.compile("filename=(.+)")
+LOCAL_STATE_DIR = os.path.join(os.path.expanduser("~"), ".gencove")
 
 
 def get_boto_session_refreshable(refresh_method):
@@ -62,6 +65,21 @@ def get_s3_client_refreshable(refresh_method):
     )
 
 
+def get_local_state_dir(*parts):
+    """Return a path in the directory where the CLI keeps state between runs.
+
+    The directory defaults to ~/.gencove and can be moved with $GENCOVE_HOME.
+    It is not created here, callers create it when they first write to it.
+
+    Args:
+        parts (str): path components to append to the state directory.
+
+    Returns:
+        str: the path
+    """
+    return os.path.join(os.environ.get("GENCOVE_HOME") or LOCAL_STATE_DIR, *parts)
+
+
 def get_progress_bar(total_size, action):
     """Get progressbar.ProgressBar instance for file transfer.
 
@@ -146,14 +164,26 @@ def login(api_client, credentials):
         api_client.set_api_key(credentials.api_key)
         return True
 
-    if not credentials.email or not credentials.password:
+    prompted = False
+    if not credentials.email:
         echo_info("Login required")
-        if not credentials.email:
-            credentials.email = click.prompt("Email", type=str, err=True)
-        if not credentials.password:
-            credentials.password = click.prompt(
-                "Password", type=str, hide_input=True, err=True
-            )
+        prompted = True
+        credentials.email = click.prompt("Email", type=str, err=True)
+
+    if is_token_cache_enabled():
+        api_client.set_token_cache(
+            TokenCache(get_local_state_dir(TOKEN_CACHE_FILE)), credentials.email
+        )
+        if api_client.login_from_token_cache():
+            echo_debug("User logged in with cached tokens")
+            return True
+
+    if not credentials.password:
+        if not prompted:
+            echo_info("Login required")
+        credentials.password = click.prompt(
+            "Password", type=str, hide_input=True, err=True
+        )
     try:
         api_client.login(credentials.email, credentials.password, credentials.otp_token)
         echo_debug("User logged in successfully")